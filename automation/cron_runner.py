@@ -12,6 +12,13 @@ This script is designed to run as a daily cron job. It:
 
 Usage:
     python automation/cron_runner.py --config-file config/config.yaml
+    python automation/cron_runner.py --config-file config/config.yaml \
+        --timing-report /app/logs/timing_report.json
+
+Every run writes a JSON timing report (per-stage spans: token fetch, Nordigen
+HTTP, tagging, duplicate detection, Sheets writes, ...) and lists the slowest
+stages in the ntfy summary. With --metrics-file (or METRICS_FILE) the run also
+writes Prometheus metrics for the node_exporter textfile collector.
 
 Environment variables:
     NTFY_TOPIC: ntfy.sh topic for notifications (required)
@@ -29,10 +36,10 @@ from random import randint
 from typing import Dict, List, Any, Optional
 
 import requests
-import yaml
 
 DEFAULT_PENDING_FILE = "data/pending_reauths.json"
 REAUTH_EXPIRY_HOURS = 24
+OUTBOX_FLUSH_TIMEOUT_SECONDS = 120
 
 # Add project root to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -43,10 +50,9 @@ from src.infrastructure.bank_account_transactions_fetchers.exceptions import (
 )
 from src.application.expenses_fetcher.expenses_fetcher import ExpensesFetcher
 from src.service.configuration import configuration_parser as cfg_parser
-from src.infrastructure.bank_account_transactions_fetchers.nordigen_token_provider import (
-    NordigenTokenProvider,
-)
-from src.repository.google_sheet_repository import GoogleSheetRepository
+from src.repository.write_behind_repository import WriteBehindRepository
+from src.service.configuration.lazy_proxies import LazyRepository
+from src.infrastructure import metrics, tracing
 
 
 log = logging.getLogger(__name__)
@@ -294,6 +300,8 @@ def setup_logging(log_dir: str = "/app/logs") -> None:
 
 def load_config(config_path: str) -> Dict[str, Any]:
     """Load YAML configuration file."""
+    import yaml
+
     with open(config_path, "r") as f:
         return yaml.load(f, Loader=yaml.FullLoader)
 
@@ -329,7 +337,10 @@ def build_expense_fetcher(config: Dict[str, Any]) -> ExpensesFetcher:
     Build ExpensesFetcher from configuration.
 
     This is a simplified version that doesn't require TTY password input.
+    Accounts and repositories are validated here but only connect on first use.
     """
+    cfg_parser.configure_cache(config)
+
     if "expense_fetcher_options" in config:
         tmp_dir = config["expense_fetcher_options"].get("tmp_dir_path")
         if tmp_dir:
@@ -342,7 +353,9 @@ def build_expense_fetcher(config: Dict[str, Any]) -> ExpensesFetcher:
     if "repositories" in config:
         for repo_name, repo_config in config["repositories"].items():
             if repo_name == "googlesheet":
-                repositories[repo_name] = GoogleSheetRepository(**repo_config)
+                repositories[repo_name] = cfg_parser.parse_repository_lazily(
+                    repo_config, repo_name, None
+                )
             # Skip other repository types for automation
 
     if not repositories:
@@ -351,10 +364,14 @@ def build_expense_fetcher(config: Dict[str, Any]) -> ExpensesFetcher:
     # Build accounts
     accounts = {}
     if "accounts" in config:
+        from src.infrastructure.bank_account_transactions_fetchers.nordigen_token_provider import (
+            NordigenTokenProvider,
+        )
+
         nordigen_token_provider = NordigenTokenProvider()
         for account_name, account_config in config["accounts"].items():
             try:
-                account = cfg_parser.parse_account(
+                account = cfg_parser.parse_account_lazily(
                     account_config,
                     account_name,
                     repositories.values(),
@@ -375,10 +392,46 @@ def build_expense_fetcher(config: Dict[str, Any]) -> ExpensesFetcher:
         transactions_cfg["transfer_description"] = config["transactions"].get("transfer")
         transactions_cfg["investment_description"] = config["transactions"].get("investment")
         transactions_cfg["date_format"] = config["transactions"].get("date_format")
+        transactions_cfg["transfer_window_days"] = config["transactions"].get("transfer_window_days")
 
     return ExpensesFetcher(repositories, accounts, **transactions_cfg)
 
 
+def flush_write_behind_repositories(
+    expense_fetcher: ExpensesFetcher, timeout: float = OUTBOX_FLUSH_TIMEOUT_SECONDS
+) -> Dict[str, int]:
+    """
+    Drain the local outbox of every write-behind repository.
+
+    Args:
+        expense_fetcher: ExpensesFetcher whose repositories should be flushed
+        timeout: Seconds to keep retrying before leaving rows queued
+
+    Returns:
+        Dict mapping repository name -> rows still pending (only non-empty outboxes)
+    """
+    still_pending = {}
+    for repo_name, repository in expense_fetcher.repositories.items():
+        if isinstance(repository, LazyRepository):
+            repository = repository.built_instance
+        if not isinstance(repository, WriteBehindRepository):
+            continue
+        if not repository.flush(timeout):
+            still_pending[repo_name] = repository.pending_count()
+            log.warning(
+                f"{still_pending[repo_name]} rows for {repo_name} stay queued in "
+                f"{repository.outbox.path}"
+            )
+        dead = repository.outbox.dead_count()
+        if dead:
+            log.error(
+                f"{dead} rows for {repo_name} gave up after "
+                f"{repository.outbox.max_attempts} attempts; they are kept in "
+                f"{repository.outbox.path} until LocalOutbox.retry_dead() is called"
+            )
+    return still_pending
+
+
 def _resolve_env_var(value: Optional[str]) -> Optional[str]:
     """Resolve environment variable syntax like ${VAR_NAME}."""
     if value and value.startswith("${") and value.endswith("}"):
@@ -425,6 +478,7 @@ def send_summary_notification(
     results: Dict[str, List],
     transaction_count: int,
     pending_file: str = DEFAULT_PENDING_FILE,
+    slowest_stages: Optional[List[tracing.StageTiming]] = None,
 ) -> None:
     """
     Send summary notification based on results.
@@ -435,7 +489,11 @@ def send_summary_notification(
                  auth_expired contains (account_name, account_config) tuples
         transaction_count: Number of transactions staged
         pending_file: Path to pending re-auths JSON file
+        slowest_stages: Stages that took the most time, appended to the summary
     """
+    timing_line = (
+        f"Slowest: {tracing.format_stages(slowest_stages)}" if slowest_stages else None
+    )
     success_count = len(results["success"])
     auth_count = len(results["auth_expired"])
     error_count = len(results["errors"])
@@ -538,13 +596,18 @@ def send_summary_notification(
         if error_count:
             error_names = [e[0] for e in results["errors"]]
             lines.append(f"{error_count} errors: {', '.join(error_names)}")
+        if timing_line:
+            lines.append(timing_line)
 
         notifier.send(title=title, message="\n".join(lines), priority=priority, tags=tags)
     else:
         # All good
+        message = f"{success_count} accounts, {transaction_count} transactions"
+        if timing_line:
+            message += f"\n{timing_line}"
         notifier.send(
             title="Daily sync complete",
-            message=f"{success_count} accounts, {transaction_count} transactions",
+            message=message,
             priority="default",
             tags=["white_check_mark"],
         )
@@ -554,6 +617,8 @@ def run_automation(
     config_path: str,
     notifier: NtfyNotifier,
     pending_file: str = DEFAULT_PENDING_FILE,
+    timing_report: Optional[str] = None,
+    metrics_file: Optional[str] = None,
 ) -> bool:
     """
     Main automation entry point.
@@ -562,10 +627,60 @@ def run_automation(
         config_path: Path to YAML configuration file
         notifier: NtfyNotifier instance for sending notifications
         pending_file: Path to pending re-auths JSON file
+        timing_report: Path of the per-run JSON timing report (optional)
+        metrics_file: Path of the Prometheus textfile-collector output (optional)
 
     Returns:
         True if all accounts succeeded, False otherwise
     """
+    tracer = tracing.reset_tracer()
+    success = False
+    try:
+        with tracer.span("run"):
+            success = _run_automation(config_path, notifier, pending_file, tracer)
+        return success
+    finally:
+        if timing_report:
+            try:
+                tracer.write_report(timing_report)
+            except OSError as e:
+                log.warning(f"Could not write timing report {timing_report}: {e}")
+        if metrics_file:
+            write_run_metrics(metrics_file, tracer, success)
+
+
+def write_run_metrics(metrics_file: str, tracer: tracing.Tracer, success: bool) -> None:
+    """
+    Record the run outcome and stage timings and write them for the
+    node_exporter textfile collector.
+
+    Args:
+        metrics_file: Path of the .prom file to (atomically) replace
+        tracer: Tracer holding the spans of the finished run
+        success: Whether the run succeeded
+    """
+    registry = metrics.get_registry()
+    metrics.observe_stages(tracer)
+    registry.gauge(
+        "expenses_fetcher_last_run_timestamp_seconds",
+        "Unix time at which the last sync run started",
+    ).set(tracer.started_at.timestamp())
+    registry.gauge(
+        "expenses_fetcher_last_run_success",
+        "1 if the last sync run succeeded, 0 otherwise",
+    ).set(1 if success else 0)
+    try:
+        registry.write_textfile(metrics_file)
+    except OSError as e:
+        log.warning(f"Could not write metrics file {metrics_file}: {e}")
+
+
+def _run_automation(
+    config_path: str,
+    notifier: NtfyNotifier,
+    pending_file: str,
+    tracer: tracing.Tracer,
+) -> bool:
     log.info(f"Starting automated sync at {datetime.now().isoformat()}")
 
     results = {
@@ -593,7 +708,8 @@ def run_automation(
         account_configs = config.get("accounts", {})
 
         # Build fetcher
-        expense_fetcher = build_expense_fetcher(config)
+        with tracer.span("build_expense_fetcher"):
+            expense_fetcher = build_expense_fetcher(config)
 
         # Pull from each account
         for account_name in list(expense_fetcher.accounts.keys()):
@@ -617,23 +733,50 @@ def run_automation(
         transaction_count = len(expense_fetcher.staged_transactions)
         log.info(f"Total transactions staged: {transaction_count}")
 
-        # Push to Google Sheets
+        # Push to every repository concurrently; one failing sink does not
+        # stop the others.
         if transaction_count > 0:
-            try:
-                expense_fetcher.push_transactions()
-                log.info("Successfully pushed transactions to Google Sheets")
-            except Exception as e:
-                log.error(f"Failed to push to Google Sheets: {e}", exc_info=True)
+            with tracer.span("push_transactions"):
+                push_results = expense_fetcher.push_transactions(deduplicate=True)
+            failed = {name: r for name, r in push_results.items() if not r.ok}
+            for name, push_result in push_results.items():
+                log.info(
+                    f"Push to {name}: {'ok' if push_result.ok else 'failed'} "
+                    f"in {push_result.elapsed_seconds:.2f}s"
+                )
+            if failed and len(failed) == len(push_results):
+                errors = "; ".join(f"{name}: {r.error}" for name, r in failed.items())
                 notifier.send(
-                    title="Sync FAILED - Sheets error",
-                    message=f"Could not push {transaction_count} transactions: {e}",
+                    title="Sync FAILED - repository error",
+                    message=f"Could not push {transaction_count} transactions: {errors}",
                     priority="urgent",
                     tags=["x", "rotating_light"],
                 )
                 return False
+            for name, push_result in failed.items():
+                results["errors"].append((name, push_result.error))
+
+        # Drain write-behind outboxes; anything that cannot be written now is
+        # kept locally and retried on the next run.
+        with tracer.span("flush_write_behind"):
+            queued = flush_write_behind_repositories(expense_fetcher)
+        for repo_name, pending_count in queued.items():
+            results["errors"].append((repo_name, f"{pending_count} rows queued"))
+            notifier.send(
+                title=f"Sync queued - {repo_name} unavailable",
+                message=f"{pending_count} rows saved locally, will retry on next run",
+                priority="high",
+                tags=["warning", "floppy_disk"],
+            )
 
         # Send summary notification
-        send_summary_notification(notifier, results, transaction_count, pending_file)
+        send_summary_notification(
+            notifier,
+            results,
+            transaction_count,
+            pending_file,
+            slowest_stages=tracer.slowest_stages(3),
+        )
 
         # Close connections
         expense_fetcher.close_all_connections()
@@ -672,6 +815,18 @@ def main():
         default=DEFAULT_PENDING_FILE,
         help=f"Path to pending re-auths JSON file (default: {DEFAULT_PENDING_FILE})",
     )
+    parser.add_argument(
+        "--timing-report",
+        dest="timing_report",
+        default=None,
+        help="Path of the per-run JSON timing report (default: <log-dir>/timing_report.json)",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        dest="metrics_file",
+        default=os.environ.get("METRICS_FILE"),
+        help="Write Prometheus metrics here for the node_exporter textfile collector",
+    )
     args = parser.parse_args()
 
     # Setup logging
@@ -687,7 +842,10 @@ def main():
     notifier = NtfyNotifier(topic=ntfy_topic, server=ntfy_server)
 
     # Run automation
-    success = run_automation(args.config_file, notifier, args.pending_file)
+    timing_report = args.timing_report or os.path.join(args.log_dir, "timing_report.json")
+    success = run_automation(
+        args.config_file, notifier, args.pending_file, timing_report, args.metrics_file
+    )
     sys.exit(0 if success else 1)
 
 
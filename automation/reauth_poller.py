@@ -13,6 +13,8 @@ History of account ID replacements is kept for 7 days.
 
 Usage:
     python automation/reauth_poller.py --config-file config/accounts_cfg.yaml
+    python automation/reauth_poller.py --config-file config/accounts_cfg.yaml \
+        --metrics-file /var/lib/node_exporter/textfile/reauth_poller.prom
 
 Cron example (every 30 min):
     */30 * * * * cd /path/to/expenses_fetcher && python automation/reauth_poller.py --config-file config/accounts_cfg.yaml
@@ -33,6 +35,7 @@ import requests
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.infrastructure.notifiers import NtfyNotifier
+from src.infrastructure import metrics, tracing
 
 log = logging.getLogger(__name__)
 
@@ -41,6 +44,17 @@ DEFAULT_PENDING_FILE = "data/pending_reauths.json"
 REAUTH_EXPIRY_HOURS = 24
 HISTORY_RETENTION_DAYS = 180  # ~6 months, covers 2 re-auth cycles (90 days each)
 
+REQUISITIONS = metrics.get_registry().counter(
+    "reauth_poller_requisitions_total",
+    "Pending re-auths processed, by outcome",
+    ("outcome",),
+)
+STAGE_DURATION = metrics.get_registry().histogram(
+    "reauth_poller_stage_duration_seconds",
+    "Duration of each traced re-auth poller stage",
+    ("stage",),
+)
+
 
 def setup_logging() -> None:
     """Configure logging to stdout."""
@@ -108,6 +122,7 @@ def add_to_history(
     })
 
 
+@tracing.traced("nordigen.token")
 def get_nordigen_token(secret_id: str, secret_key: str) -> Optional[str]:
     """Get a fresh Nordigen access token."""
     try:
@@ -124,6 +139,7 @@ def get_nordigen_token(secret_id: str, secret_key: str) -> Optional[str]:
     return None
 
 
+@tracing.traced("nordigen.requisition")
 def get_requisition_status(requisition_id: str, access_token: str) -> Optional[Dict]:
     """Fetch requisition details from Nordigen API."""
     try:
@@ -142,6 +158,7 @@ def get_requisition_status(requisition_id: str, access_token: str) -> Optional[D
     return None
 
 
+@tracing.traced("nordigen.account_details")
 def get_account_iban(account_id: str, access_token: str) -> Optional[str]:
     """
     Fetch IBAN for an account from Nordigen API.
@@ -287,12 +304,14 @@ def process_pending_reauths(
 
         if not all([requisition_id, secret_id, secret_key, expires_at_str, old_accounts]):
             log.warning(f"Skipping incomplete pending reauth entry: {item}")
+            REQUISITIONS.inc(outcome="incomplete")
             continue
 
         # Check expiry
         expires_at = datetime.fromisoformat(expires_at_str.replace("Z", "+00:00"))
         if now > expires_at:
             log.warning(f"Re-auth for {account_names_str} expired (started > 24h ago)")
+            REQUISITIONS.inc(outcome="timed_out")
             if notifier:
                 notifier.send(
                     title=f"Re-auth expired: {account_names_str}",
@@ -306,6 +325,7 @@ def process_pending_reauths(
         access_token = get_nordigen_token(secret_id, secret_key)
         if not access_token:
             log.error(f"Could not get token for {account_names_str}, will retry later")
+            REQUISITIONS.inc(outcome="token_error")
             still_pending.append(item)
             continue
 
@@ -313,12 +333,14 @@ def process_pending_reauths(
         requisition = get_requisition_status(requisition_id, access_token)
         if not requisition:
             log.error(f"Could not fetch requisition for {account_names_str}, will retry later")
+            REQUISITIONS.inc(outcome="requisition_error")
             still_pending.append(item)
             continue
 
         status = requisition.get("status")
         new_account_ids = requisition.get("accounts", [])
         log.info(f"Requisition {requisition_id} status: {status}, accounts: {new_account_ids}")
+        REQUISITIONS.inc(outcome=f"status_{status}")
 
         if status == "LN":  # Linked
             if not new_account_ids:
@@ -415,6 +437,12 @@ def main():
         default=DEFAULT_PENDING_FILE,
         help=f"Path to pending re-auths JSON file (default: {DEFAULT_PENDING_FILE})",
     )
+    parser.add_argument(
+        "--metrics-file",
+        dest="metrics_file",
+        default=os.environ.get("METRICS_FILE"),
+        help="Write Prometheus metrics here for the node_exporter textfile collector",
+    )
     args = parser.parse_args()
 
     setup_logging()
@@ -428,11 +456,35 @@ def main():
     else:
         log.warning("NTFY_TOPIC not set, notifications disabled")
 
-    process_pending_reauths(
-        pending_file=args.pending_file,
-        config_path=args.config_file,
-        notifier=notifier,
-    )
+    tracer = tracing.reset_tracer()
+    try:
+        with tracer.span("process_pending_reauths"):
+            process_pending_reauths(
+                pending_file=args.pending_file,
+                config_path=args.config_file,
+                notifier=notifier,
+            )
+    finally:
+        if args.metrics_file:
+            write_poller_metrics(args.metrics_file, tracer, args.pending_file)
+
+
+def write_poller_metrics(metrics_file: str, tracer: tracing.Tracer, pending_file: str) -> None:
+    """Write the poller metrics for the node_exporter textfile collector."""
+    registry = metrics.get_registry()
+    metrics.observe_stages(tracer, STAGE_DURATION)
+    registry.gauge(
+        "reauth_poller_pending",
+        "Re-auths still waiting to be completed",
+    ).set(len(load_pending_reauths(pending_file).get("pending", [])))
+    registry.gauge(
+        "reauth_poller_last_run_timestamp_seconds",
+        "Unix time at which the last poller run started",
+    ).set(tracer.started_at.timestamp())
+    try:
+        registry.write_textfile(metrics_file)
+    except OSError as e:
+        log.warning(f"Could not write metrics file {metrics_file}: {e}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of src.domain.date_codec against plain strptime/strftime.
+
+Rows are drawn from a limited set of distinct dates, like a real ledger, and
+each call site pattern is timed both ways: ISO parsing (Nordigen, Buxfer,
+Sheets), custom-format parsing (XLSX exports, FromListTransaction) and
+formatting (ExpenseFetcherTransaction.to_list, Balance.to_list).
+
+Usage:
+    python benchmarks/date_codec.py --rows 100000 --distinct-dates 365
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.domain import date_codec  # noqa: E402
+
+
+def _time(function, values, date_format) -> float:
+    start = time.perf_counter()
+    for value in values:
+        function(value, date_format)
+    return time.perf_counter() - start
+
+
+def run(rows: int, distinct_dates: int, seed: int = 0):
+    rng = random.Random(seed)
+    dates = [datetime(2024, 1, 1) + timedelta(days=i) for i in range(distinct_dates)]
+    sample = [rng.choice(dates) for _ in range(rows)]
+    iso_strings = [d.strftime("%Y-%m-%d") for d in sample]
+    dmy_strings = [d.strftime("%d-%m-%Y") for d in sample]
+    parse, format_ = date_codec.parse_date, date_codec.format_date
+    cases = [
+        ("parse %Y-%m-%d", datetime.strptime, parse, iso_strings, "%Y-%m-%d"),
+        ("parse %d-%m-%Y", datetime.strptime, parse, dmy_strings, "%d-%m-%Y"),
+        ("format %Y/%m/%d", datetime.strftime, format_, sample, "%Y/%m/%d"),
+        ("format %Y-%m-%d", datetime.strftime, format_, sample, "%Y-%m-%d"),
+    ]
+    results = []
+    for name, baseline, codec, values, date_format in cases:
+        date_codec.clear_caches()
+        baseline_seconds = _time(baseline, values, date_format)
+        codec_seconds = _time(codec, values, date_format)
+        results.append((name, baseline_seconds, codec_seconds))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Date codec micro-benchmark")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--distinct-dates", type=int, default=365)
+    args = parser.parse_args()
+
+    print(f"{args.rows} rows over {args.distinct_dates} distinct dates")
+    for name, baseline_seconds, codec_seconds in run(args.rows, args.distinct_dates):
+        print(
+            f"{name:18} stdlib {baseline_seconds * 1000:8.1f} ms  "
+            f"codec {codec_seconds * 1000:8.1f} ms  "
+            f"x{baseline_seconds / codec_seconds:5.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the pull -> tag -> dedup -> push cycle.
+
+ExpensesFetcher runs unmodified against local stand-ins (see benchmarks/fakes.py):
+Nordigen accounts read from a fake GoCardless server, one manual XLSX account
+reads a generated export, and the Google Sheets repository writes to an
+in-memory spreadsheet pre-seeded with part of the ledger so that duplicate
+detection has work to do.
+
+For every ledger size the benchmark reports throughput, the time spent in the
+main traced stages, peak traced memory and the requests each fake served.
+
+Usage:
+    python benchmarks/e2e_pipeline.py
+    python benchmarks/e2e_pipeline.py --rows 1000,10000,100000 --json report.json
+    python benchmarks/e2e_pipeline.py --full-scale --no-memory
+
+Duplicate detection is a set lookup on (account, transaction id), so the run
+time grows linearly with the ledger. `--full-scale` adds the 100k and 1M row
+ledgers (same as `--rows 1k,10k,100k,1m`). The 1M run takes minutes rather
+than seconds, most of it generating the fakes and parsing the pulled payloads;
+add --no-memory there, as tracemalloc slows it down several times.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.fakes import (  # noqa: E402
+    XLSX_COLUMNS,
+    XLSX_HEADER_SKIP_ROWS,
+    FakeGoCardlessServer,
+    InMemorySpreadsheet,
+    StaticTokenProvider,
+    in_memory_sheet_repository,
+    synthetic_ledger,
+    write_xlsx_export,
+)
+from src.application.account_manager.nordigen_account_manager import (  # noqa: E402
+    NordigenAccountManager,
+)
+from src.application.account_manager.xlsx_manual_account_manager import (  # noqa: E402
+    XlsxManualAccountManager,
+)
+from src.application.expenses_fetcher.expenses_fetcher import (  # noqa: E402
+    ExpensesFetcher,
+)
+from src.domain.category_taggers.regex_tagger import RegexTaggerBuilder  # noqa: E402
+from src.infrastructure import tracing  # noqa: E402
+
+REPORTED_STAGES = (
+    "pull_transactions",
+    "nordigen.http",
+    "account.fetch",
+    "tagging",
+    "format_transactions",
+    "duplicate_detection",
+    "googlesheet.append",
+)
+
+
+def build_taggers():
+    builder = RegexTaggerBuilder()
+    builder.add_category_regex("Groceries", r"CONTINENTE|PINGO DOCE")
+    builder.add_category_regex("Salary", r"SALARIO")
+    builder.add_category_regex("Utilities", r"ELECTRICIDADE")
+    builder.add_category_regex("Transport", r"UBER")
+    builder.add_category_regex("Health", r"FARMACIA")
+    return [builder.build()]
+
+
+def build_fetcher(
+    server: FakeGoCardlessServer,
+    nordigen_accounts: List[str],
+    xlsx_path: str,
+    spreadsheet: InMemorySpreadsheet,
+    token_provider: StaticTokenProvider,
+    cache_dir: str,
+) -> ExpensesFetcher:
+    accounts = dict()
+    for account_id in nordigen_accounts:
+        account_manager = NordigenAccountManager(
+            "secret-id",
+            "secret-key",
+            account_id,
+            remove_transaction_description_prefix=False,
+            taggers=build_taggers(),
+            token_provider=token_provider,
+            cache_dir=cache_dir,
+        )
+        server.point_fetcher(account_manager.transactions_fetcher, account_id)
+        accounts[account_id] = account_manager
+    accounts["xlsx"] = XlsxManualAccountManager(
+        account_name="xlsx",
+        header_skip_rows=XLSX_HEADER_SKIP_ROWS,
+        date_format="%d-%m-%Y",
+        decimal_separator=",",
+        thousands_separator="",
+        columns=XLSX_COLUMNS,
+        remove_transaction_description_prefix=False,
+        taggers=build_taggers(),
+        sheet_name="Movimentos",
+        prompt_for_file_path=False,
+        file_path=xlsx_path,
+    )
+    repositories = {"googlesheet": in_memory_sheet_repository(spreadsheet)}
+    return ExpensesFetcher(repositories, accounts, date_format="%Y-%m-%d")
+
+
+def run_size(rows: int, accounts: int, overlap: float, measure_memory: bool) -> Dict:
+    sources = accounts + 1  # Nordigen accounts plus the XLSX account
+    per_source = max(rows // sources, 1)
+    nordigen_accounts = [f"nordigen-{i}" for i in range(accounts)]
+    ledgers = {
+        account_id: synthetic_ledger(per_source, seed=i)
+        for i, account_id in enumerate(nordigen_accounts)
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir, FakeGoCardlessServer(
+        ledgers
+    ) as server, contextlib.redirect_stdout(io.StringIO()):
+        # GoogleSheetRepository prints metadata lookups; keep the report readable.
+        xlsx_path = os.path.join(tmp_dir, "export.xlsx")
+        write_xlsx_export(xlsx_path, synthetic_ledger(per_source, seed=accounts))
+        cache_dir = os.path.join(tmp_dir, "cache")
+
+        # Seed the repository with the oldest part of every account, as if an
+        # earlier sync had already written it.
+        spreadsheet = InMemorySpreadsheet()
+        seed_fetcher = build_fetcher(
+            server,
+            nordigen_accounts,
+            xlsx_path,
+            spreadsheet,
+            StaticTokenProvider(),
+            cache_dir,
+        )
+        seed_fetcher.pull_transactions()
+        seed_fetcher.sort_transactions()
+        seeded = seed_fetcher.staged_transactions[
+            : int(len(seed_fetcher.staged_transactions) * overlap)
+        ]
+        spreadsheet.sheets["Expenses"].extend(seeded)
+        del seed_fetcher
+
+        server.requests.clear()
+        spreadsheet.requests.clear()
+        token_provider = StaticTokenProvider()
+        fetcher = build_fetcher(
+            server,
+            nordigen_accounts,
+            xlsx_path,
+            spreadsheet,
+            token_provider,
+            cache_dir,
+        )
+        tracer = tracing.reset_tracer()
+        if measure_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        fetcher.pull_transactions(apply_categories=True)
+        fetcher.sort_transactions()
+        staged = len(fetcher.staged_transactions)
+        push_results = fetcher.push_transactions(deduplicate=True)
+        elapsed = time.perf_counter() - start
+        peak_bytes = 0
+        if measure_memory:
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        errors = {name: r.error for name, r in push_results.items() if not r.ok}
+        written = len(spreadsheet.sheets["Expenses Staging"]) - 1
+        stages = {stage.name: stage for stage in tracer.stages()}
+        return {
+            "rows": rows,
+            "staged": staged,
+            "seeded": len(seeded),
+            "written": written,
+            "seconds": elapsed,
+            "rows_per_second": staged / elapsed if elapsed else 0.0,
+            "peak_memory_mb": peak_bytes / 2**20 if measure_memory else None,
+            "stages": {
+                name: stages[name].total_seconds
+                for name in REPORTED_STAGES
+                if name in stages
+            },
+            "requests": {
+                "gocardless": dict(server.requests),
+                "sheets": dict(spreadsheet.requests),
+                "token": token_provider.calls,
+            },
+            "errors": errors,
+        }
+
+
+def print_result(result: Dict) -> None:
+    memory = (
+        f"{result['peak_memory_mb']:.1f} MB"
+        if result["peak_memory_mb"] is not None
+        else "n/a"
+    )
+    print(
+        f"{result['rows']:>9} rows: {result['seconds']:8.2f}s "
+        f"{result['rows_per_second']:>10.0f} rows/s  peak {memory}  "
+        f"staged {result['staged']} seeded {result['seeded']} "
+        f"written {result['written']}"
+    )
+    for name, seconds in result["stages"].items():
+        print(f"    {name:24} {seconds:8.3f}s")
+    requests = result["requests"]
+    print(
+        f"    requests: gocardless {requests['gocardless']} "
+        f"sheets {requests['sheets']} token {requests['token']}"
+    )
+    for name, error in result["errors"].items():
+        print(f"    push to {name} FAILED: {error}")
+
+
+def parse_sizes(value: str) -> List[int]:
+    sizes = []
+    for size in value.split(","):
+        match = re.fullmatch(r"\s*(\d+)\s*([kKmM]?)\s*", size)
+        if match is None:
+            raise argparse.ArgumentTypeError(f"invalid size: {size}")
+        multiplier = {"": 1, "k": 1_000, "m": 1_000_000}[match[2].lower()]
+        sizes.append(int(match[1]) * multiplier)
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end sync pipeline benchmark")
+    parser.add_argument(
+        "--rows",
+        type=parse_sizes,
+        default=parse_sizes("1k,10k"),
+        help="comma separated ledger sizes, e.g. 1k,10k,100k,1m (default: 1k,10k)",
+    )
+    parser.add_argument(
+        "--full-scale",
+        dest="rows",
+        action="store_const",
+        const=parse_sizes("1k,10k,100k,1m"),
+        help="run 1k,10k,100k,1m ledgers",
+    )
+    parser.add_argument("--accounts", type=int, default=3, help="Nordigen accounts")
+    parser.add_argument(
+        "--overlap",
+        type=float,
+        default=0.5,
+        help="fraction of the ledger already in the repository (default: 0.5)",
+    )
+    parser.add_argument(
+        "--no-memory",
+        dest="measure_memory",
+        action="store_false",
+        help="skip tracemalloc, which slows the run down",
+    )
+    parser.add_argument("--json", dest="json_path", help="also write results here")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        result = run_size(rows, args.accounts, args.overlap, args.measure_memory)
+        print_result(result)
+        results.append(result)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
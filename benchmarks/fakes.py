@@ -0,0 +1,385 @@
+"""
+Local stand-ins for the services the sync pipeline talks to.
+
+- FakeGoCardlessServer: a threaded HTTP server answering the GoCardless
+  account transactions and balances endpoints from an in-memory ledger.
+- StaticTokenProvider: NordigenTokenProvider replacement that never calls out.
+- InMemorySpreadsheet: implements the `spreadsheets().values().get/append/update`
+  calls GoogleSheetRepository makes, backed by Python lists.
+- write_xlsx_export: writes a bank-style XLSX export with openpyxl.
+- write_csv_export, write_ofx_export, write_camt053_export: the same ledger as
+  a semicolon CSV export, an OFX 1.x (SGML) statement and a CAMT.053 statement.
+
+Every fake counts the requests it serves so benchmarks can report them.
+"""
+
+import json
+import random
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from src.repository.google_sheet_repository import GoogleSheetRepository
+
+DESCRIPTIONS = (
+    "COMPRA CONTINENTE",
+    "COMPRA PINGO DOCE",
+    "TRF SALARIO",
+    "PAG SERV ELECTRICIDADE",
+    "COMPRA UBER TRIP",
+    "LEVANTAMENTO ATM",
+    "COMPRA FARMACIA",
+    "TRF MBWAY",
+)
+START_DATE = datetime(2020, 1, 1)
+END_DATE = datetime(2024, 12, 31)
+
+
+def synthetic_ledger(rows: int, seed: int = 0) -> List[Dict[str, object]]:
+    """
+    Deterministic (date, description, amount) rows, oldest first, spread evenly
+    between START_DATE and END_DATE whatever the size.
+    """
+    rng = random.Random(seed)
+    step = (END_DATE - START_DATE) / max(rows, 1)
+    ledger = []
+    for i in range(rows):
+        booked = START_DATE + step * i
+        ledger.append(
+            {
+                "date": booked,
+                "description": f"{rng.choice(DESCRIPTIONS)} {i}",
+                "amount": round(rng.uniform(-250, 250), 2) or 1.0,
+            }
+        )
+    return ledger
+
+
+def nordigen_payload(ledger: List[Dict[str, object]]) -> Dict[str, object]:
+    return {
+        "transactions": {
+            "booked": [
+                {
+                    "transactionId": f"{row['date']:%Y%m%d}-{i}",
+                    "bookingDate": row["date"].strftime("%Y-%m-%d"),
+                    "valueDate": row["date"].strftime("%Y-%m-%d"),
+                    "remittanceInformationUnstructured": row["description"],
+                    "transactionAmount": {
+                        "amount": f"{row['amount']:.2f}",
+                        "currency": "EUR",
+                    },
+                }
+                for i, row in enumerate(ledger)
+            ],
+            "pending": [],
+        }
+    }
+
+
+def balance_payload(amount: float, date: datetime) -> Dict[str, object]:
+    return {
+        "balances": [
+            {
+                "balanceType": "interimAvailable",
+                "balanceAmount": {"amount": f"{amount:.2f}", "currency": "EUR"},
+                "referenceDate": date.strftime("%Y-%m-%d"),
+            }
+        ]
+    }
+
+
+class FakeGoCardlessServer:
+    """
+    Serves /api/v2/accounts/<id>/transactions/ and /balances/ for the accounts
+    it was given. Use as a context manager; `base_url` is only valid inside it.
+    """
+
+    _path = re.compile(r"^/api/v2/accounts/([^/]+)/(transactions|balances)/?$")
+
+    def __init__(self, ledgers: Dict[str, List[Dict[str, object]]]):
+        # Responses are serialized once so the server is not what gets measured.
+        self.responses: Dict[str, bytes] = dict()
+        for account_id, ledger in ledgers.items():
+            last_date = ledger[-1]["date"] if ledger else START_DATE
+            self.responses[f"{account_id}/transactions"] = json.dumps(
+                nordigen_payload(ledger)
+            ).encode()
+            self.responses[f"{account_id}/balances"] = json.dumps(
+                balance_payload(sum(row["amount"] for row in ledger), last_date)
+            ).encode()
+        self.requests: Counter = Counter()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v2"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                match = fake._path.match(self.path)
+                body = match and fake.responses.get(f"{match[1]}/{match[2]}")
+                fake.requests[match[2] if match else "unknown"] += 1
+                if not body:
+                    body = json.dumps({"detail": "Not found", "status_code": 404})
+                    body = body.encode()
+                    self.send_response(404)
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "FakeGoCardlessServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-gocardless", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def point_fetcher(self, fetcher, account_id: str) -> None:
+        """Redirect a NordigenFetcher from the real API to this server."""
+        account_url = f"{self.base_url}/accounts/{account_id}"
+        fetcher.download_data_url = f"{account_url}/transactions/"
+        fetcher.balance_data_url = f"{account_url}/balances/"
+
+
+class StaticTokenProvider:
+    def __init__(self, token: str = "benchmark-token"):
+        self.token = token
+        self.calls = 0
+
+    def get_valid_token(self, secret_id: str, secret_key: str) -> str:
+        self.calls += 1
+        return self.token
+
+
+class _Request:
+    def __init__(self, callback):
+        self.callback = callback
+
+    def execute(self):
+        return self.callback()
+
+
+class _Values:
+    def __init__(self, spreadsheet: "InMemorySpreadsheet"):
+        self.spreadsheet = spreadsheet
+
+    def get(self, spreadsheetId: str, range: str):
+        return _Request(lambda: self.spreadsheet.get(range))
+
+    def append(self, spreadsheetId: str, range: str, body: Dict, **kwargs):
+        return _Request(lambda: self.spreadsheet.append(range, body["values"]))
+
+    def update(self, spreadsheetId: str, range: str, body: Dict, **kwargs):
+        return _Request(lambda: self.spreadsheet.update(range, body["values"]))
+
+
+class InMemorySpreadsheet:
+    """
+    Sheets keyed by tab name. Ranges are only resolved to their tab: reads return
+    the whole tab, appends add rows at the end and updates replace the rows from
+    the range's start row on, which is all GoogleSheetRepository relies on.
+    """
+
+    def __init__(self, sheets: Optional[Dict[str, List[List[object]]]] = None):
+        self.sheets: Dict[str, List[List[object]]] = sheets or dict()
+        self.requests: Counter = Counter()
+
+    def values(self) -> _Values:
+        return _Values(self)
+
+    @staticmethod
+    def _tab(sheet_range: str) -> str:
+        return sheet_range.split("!")[0]
+
+    def get(self, sheet_range: str) -> Dict[str, object]:
+        self.requests["get"] += 1
+        rows = self.sheets.get(self._tab(sheet_range), [])
+        # The API returns strings for USER_ENTERED values.
+        return {"values": [[str(cell) for cell in row] for row in rows]}
+
+    def append(self, sheet_range: str, values: List[List[object]]) -> Dict:
+        self.requests["append"] += 1
+        self.sheets.setdefault(self._tab(sheet_range), []).extend(
+            list(row) for row in values
+        )
+        return {"updates": {"updatedRows": len(values)}}
+
+    def update(self, sheet_range: str, values: List[List[object]]) -> Dict:
+        self.requests["update"] += 1
+        match = re.search(r"!\D*(\d+)", sheet_range)
+        start = int(match[1]) - 1 if match else 0
+        rows = self.sheets.setdefault(self._tab(sheet_range), [])
+        del rows[start:]
+        rows.extend(list(row) for row in values)
+        return {"updatedRows": len(values)}
+
+
+EXPENSES_HEADER = [
+    "Capture date",
+    "Auth date",
+    "Description",
+    "Account",
+    "Type",
+    "Category",
+    "Absolute value",
+    "Value",
+    "ID",
+]
+
+
+def in_memory_sheet_repository(
+    spreadsheet: InMemorySpreadsheet,
+) -> GoogleSheetRepository:
+    """GoogleSheetRepository wired to `spreadsheet` instead of the Sheets API."""
+    for tab in ("Expenses", "Expenses Staging"):
+        spreadsheet.sheets.setdefault(tab, [list(EXPENSES_HEADER)])
+    repository = GoogleSheetRepository.__new__(GoogleSheetRepository)
+    repository.spreadsheet_id = "benchmark"
+    repository.expenses_sheet_name = "Expenses"
+    repository.expenses_staging_name = "Expenses Staging"
+    repository.expenses_start_cell = "A1"
+    repository.metadata_sheet_name = "Data"
+    repository.accounts_balance_sheet_name = "Balances"
+    repository.accounts_balance_start_cell = "A1"
+    repository.scopes = []
+    repository.credentials = None
+    repository.sheet = spreadsheet
+    repository.last_transaction_date_by_account = None
+    repository.categories = None
+    repository.cache = None
+    repository.key_filter = None
+    return repository
+
+
+XLSX_COLUMNS = {
+    "capture_date": "Data Lanc.",
+    "auth_date": "Data Valor",
+    "description": "Descrição",
+    "debit": "Débito",
+    "credit": "Crédito",
+    "balance": "Saldo",
+}
+XLSX_HEADER_SKIP_ROWS = 3
+
+
+def _decimal_comma(value: float) -> str:
+    return f"{value:.2f}".replace(".", ",")
+
+
+def write_xlsx_export(path: str, ledger: List[Dict[str, object]]) -> None:
+    """Write `ledger` as a bank export: banner rows, a header, one row per movement."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Movimentos")
+    for banner in ("Banco Benchmark", "Conta 000-000", ""):
+        sheet.append([banner])
+    sheet.append(list(XLSX_COLUMNS.values()))
+    for date, description, debit, credit, balance in _export_rows(ledger):
+        sheet.append([date, date, description, debit, credit, balance])
+    workbook.save(path)
+
+
+def _export_rows(ledger: List[Dict[str, object]]):
+    """(date, description, debit, credit, balance) as a bank export shows them."""
+    balance = 0.0
+    for row in ledger:
+        balance += row["amount"]
+        date = row["date"].strftime("%d-%m-%Y")
+        debit = _decimal_comma(-row["amount"]) if row["amount"] < 0 else ""
+        credit = _decimal_comma(row["amount"]) if row["amount"] > 0 else ""
+        yield date, row["description"], debit, credit, _decimal_comma(balance)
+
+
+def write_csv_export(path: str, ledger: List[Dict[str, object]]) -> None:
+    """`ledger` as a semicolon separated export with the XLSX export's layout."""
+    import csv
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=";")
+        for banner in ("Banco Benchmark", "Conta 000-000", ""):
+            writer.writerow([banner])
+        writer.writerow(list(XLSX_COLUMNS.values()))
+        for date, description, debit, credit, balance in _export_rows(ledger):
+            writer.writerow([date, date, description, debit, credit, balance])
+
+
+def write_ofx_export(path: str, ledger: List[Dict[str, object]]) -> None:
+    """`ledger` as an OFX 1.x (SGML) bank statement, ledger balance included."""
+    balance = sum(row["amount"] for row in ledger)
+    last_date = ledger[-1]["date"] if ledger else START_DATE
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            "OFXHEADER:100\nDATA:OFXSGML\nVERSION:102\nENCODING:UTF-8\n\n"
+            "<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>EUR\n<BANKTRANLIST>\n"
+        )
+        for i, row in enumerate(ledger):
+            f.write(
+                "<STMTTRN><TRNTYPE>OTHER\n"
+                f"<DTPOSTED>{row['date']:%Y%m%d}120000\n"
+                f"<TRNAMT>{row['amount']:.2f}\n"
+                f"<FITID>{i}\n"
+                f"<NAME>{row['description']}\n"
+                "</STMTTRN>\n"
+            )
+        f.write(
+            "</BANKTRANLIST>\n"
+            f"<LEDGERBAL><BALAMT>{balance:.2f}\n<DTASOF>{last_date:%Y%m%d}\n</LEDGERBAL>\n"
+            "</STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n"
+        )
+
+
+def write_camt053_export(path: str, ledger: List[Dict[str, object]]) -> None:
+    """`ledger` as an ISO 20022 CAMT.053 statement with a closing booked balance."""
+    from xml.sax.saxutils import escape
+
+    def amount(value: float) -> str:
+        indicator = "DBIT" if value < 0 else "CRDT"
+        return (
+            f'<Amt Ccy="EUR">{abs(value):.2f}</Amt><CdtDbtInd>{indicator}</CdtDbtInd>'
+        )
+
+    balance = sum(row["amount"] for row in ledger)
+    last_date = ledger[-1]["date"] if ledger else START_DATE
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02">'
+            "<BkToCstmrStmt><Stmt><Id>benchmark</Id>\n"
+        )
+        for row in ledger:
+            date = f"{row['date']:%Y-%m-%d}"
+            f.write(
+                f"<Ntry>{amount(row['amount'])}<Sts>BOOK</Sts>"
+                f"<BookgDt><Dt>{date}</Dt></BookgDt><ValDt><Dt>{date}</Dt></ValDt>"
+                "<NtryDtls><TxDtls><RmtInf>"
+                f"<Ustrd>{escape(row['description'])}</Ustrd>"
+                "</RmtInf></TxDtls></NtryDtls></Ntry>\n"
+            )
+        f.write(
+            "<Bal><Tp><CdOrPrtry><Cd>CLBD</Cd></CdOrPrtry></Tp>"
+            f"{amount(balance)}<Dt><Dt>{last_date:%Y-%m-%d}</Dt></Dt></Bal>\n"
+            "</Stmt></BkToCstmrStmt></Document>\n"
+        )
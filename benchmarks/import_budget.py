@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Cold-start import budget for the interactive shell and the cron runner.
+
+Each entry point is imported in a fresh interpreter with `python -X importtime`.
+The check fails when the cumulative import time goes over its budget, or when a
+heavy third-party module (Google client libraries, Selenium, openpyxl, ...) is
+imported at startup instead of inside the code path that uses it.
+
+Usage:
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --runs 10 --scale 2.0
+
+Exit code is 1 when any budget is exceeded.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List, Set, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = (
+    "googleapiclient",
+    "google_auth_oauthlib",
+    "google.auth",
+    "selenium",
+    "openpyxl",
+    "tabulate",
+    "yaml",
+    "pandas",
+    "numpy",
+)
+
+
+@dataclass
+class ImportBudget:
+    module: str
+    max_ms: float
+    forbidden: Tuple[str, ...] = HEAVY_MODULES
+
+
+BUDGETS = [
+    ImportBudget("main", max_ms=150),
+    # requests is needed for every ntfy notification, so it is part of the budget
+    ImportBudget("automation.cron_runner", max_ms=400),
+]
+
+
+def measure_import(module: str, runs: int = 5) -> Tuple[float, Set[str]]:
+    """
+    Import `module` in `runs` fresh interpreters.
+
+    Returns:
+        (best cumulative import time in ms, names of every module imported)
+    """
+    best_us = None
+    imported: Set[str] = set()
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            name = name.strip()
+            imported.add(name)
+            if name == module and cumulative.strip().isdigit():
+                cumulative_us = int(cumulative)
+                if best_us is None or cumulative_us < best_us:
+                    best_us = cumulative_us
+    return (best_us or 0) / 1000, imported
+
+
+def heavy_modules_imported(imported: Set[str], forbidden: Tuple[str, ...]) -> List[str]:
+    return sorted(
+        name
+        for name in imported
+        if any(name == heavy or name.startswith(heavy + ".") for heavy in forbidden)
+    )
+
+
+def check_budgets(runs: int = 5, scale: float = 1.0) -> List[str]:
+    failures = []
+    for budget in BUDGETS:
+        elapsed_ms, imported = measure_import(budget.module, runs)
+        max_ms = budget.max_ms * scale
+        heavy = heavy_modules_imported(imported, budget.forbidden)
+        status = "OK" if elapsed_ms <= max_ms and not heavy else "FAIL"
+        print(
+            f"{status:4} {budget.module:28} {elapsed_ms:8.1f} ms "
+            f"(budget {max_ms:.0f} ms)"
+        )
+        if elapsed_ms > max_ms:
+            failures.append(f"{budget.module}: {elapsed_ms:.1f} ms > {max_ms:.0f} ms")
+        if heavy:
+            failures.append(f"{budget.module}: imports {', '.join(heavy)} at startup")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import budget check")
+    parser.add_argument("--runs", type=int, default=5, help="interpreters per module")
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiply every budget (slow machines)"
+    )
+    args = parser.parse_args()
+
+    failures = check_budgets(args.runs, args.scale)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
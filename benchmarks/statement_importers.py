@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Throughput of the statement importers behind XlsxManualAccountManager.
+
+The same synthetic ledger is written as an XLSX export, a semicolon CSV, an
+OFX 1.x statement and a CAMT.053 statement, then read back through
+StatementTransactionsFetcher (format auto-detected). Reported per format:
+file size, best-of-N parse time, rows per second and peak traced memory.
+
+Usage:
+    python benchmarks/statement_importers.py --rows 10000,100000 --repeat 3
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import (  # noqa: E402
+    XLSX_COLUMNS,
+    XLSX_HEADER_SKIP_ROWS,
+    synthetic_ledger,
+    write_camt053_export,
+    write_csv_export,
+    write_ofx_export,
+    write_xlsx_export,
+)
+from src.infrastructure.bank_account_transactions_fetchers.statement_transactions_fetcher import (  # noqa: E402
+    StatementTransactionsFetcher,
+)
+
+WRITERS = {
+    "xlsx": (write_xlsx_export, "xlsx"),
+    "csv": (write_csv_export, "csv"),
+    "ofx": (write_ofx_export, "ofx"),
+    "camt053": (write_camt053_export, "xml"),
+}
+
+
+def build_fetcher() -> StatementTransactionsFetcher:
+    return StatementTransactionsFetcher(
+        header_skip_rows=XLSX_HEADER_SKIP_ROWS,
+        date_format="%d-%m-%Y",
+        decimal_separator=",",
+        thousands_separator="",
+        columns=XLSX_COLUMNS,
+    )
+
+
+def run_size(rows: int, repeat: int, measure_memory: bool) -> List[Dict]:
+    ledger = synthetic_ledger(rows)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for statement_format, (write, extension) in WRITERS.items():
+            path = os.path.join(tmp_dir, f"statement.{extension}")
+            write(path, ledger)
+
+            best = None
+            for _ in range(repeat):
+                fetcher = build_fetcher()
+                start = time.perf_counter()
+                parsed = fetcher.getTransactions(file_path=path)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            if len(parsed) != rows:
+                raise Exception(f"{statement_format}: parsed {len(parsed)} of {rows} rows")
+
+            peak = None
+            if measure_memory:
+                tracemalloc.start()
+                build_fetcher().getTransactions(file_path=path)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+            results.append(
+                {
+                    "format": statement_format,
+                    "rows": rows,
+                    "file_bytes": os.path.getsize(path),
+                    "seconds": best,
+                    "rows_per_second": rows / best if best else None,
+                    "peak_memory_bytes": peak,
+                }
+            )
+    return results
+
+
+def parse_sizes(value: str) -> List[int]:
+    sizes = []
+    for part in value.split(","):
+        part = part.strip().lower()
+        multiplier = 1000 if part.endswith("k") else 1
+        sizes.append(int(part.rstrip("k")) * multiplier)
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statement importer throughput")
+    parser.add_argument("--rows", type=parse_sizes, default=parse_sizes("10k"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        for result in run_size(rows, args.repeat, not args.no_memory):
+            results.append(result)
+            memory = result["peak_memory_bytes"]
+            print(
+                f"{result['format']:8} {rows:>8} rows  "
+                f"{result['file_bytes'] / 1024:9.0f} KiB  "
+                f"{result['seconds'] * 1000:9.1f} ms  "
+                f"{result['rows_per_second']:10.0f} rows/s"
+                + (f"  peak {memory / 1024 / 1024:6.1f} MiB" if memory is not None else "")
+            )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
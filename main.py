@@ -1,29 +1,34 @@
 import argparse
 import os, sys
-import yaml
 from typing import List
 import cmd
-from tabulate import tabulate
 from datetime import datetime
 
 from src.application.expenses_fetcher.expenses_fetcher import ExpensesFetcher
+from src.infrastructure import cache, tracing
+from src.service.command_profiler import CommandProfiler
 from src.service.configuration import configuration_parser as cfg_parser
 from src.service.password_getter_tty import TTYPasswordGetter
-from src.infrastructure.bank_account_transactions_fetchers.nordigen_token_provider import (
-    NordigenTokenProvider,
-)
 
 import logging
 
 log = logging.getLogger(__file__)
 
-def build_expense_fetcher(config, password_getter_repo=None, password_getter=None):
+def build_expense_fetcher(
+    config, password_getter_repo=None, password_getter=None, lazy: bool = True
+):
+    """
+    With `lazy` (the default) accounts and repositories are validated up front but
+    only authenticate and connect the first time they are used.
+    """
     if password_getter_repo is None:
         password_getter_repo = TTYPasswordGetter("Password for repository {} :")
 
     if password_getter is None:
         password_getter = TTYPasswordGetter("Password for account {} :")
 
+    cfg_parser.configure_cache(config)
+
     if "expense_fetcher_options" in config:
         if "tmp_dir_path" in config["expense_fetcher_options"]:
             tmp_dir = config["expense_fetcher_options"]["tmp_dir_path"]
@@ -36,6 +41,11 @@ def build_expense_fetcher(config, password_getter_repo=None, password_getter=Non
     else:
         tmp_dir = None
 
+    parse_repository = (
+        cfg_parser.parse_repository_lazily if lazy else cfg_parser.parse_repository
+    )
+    parse_account = cfg_parser.parse_account_lazily if lazy else cfg_parser.parse_account
+
     repositories = dict()
     if "repositories" in config:
         repo_cfg = config["repositories"]
@@ -43,7 +53,7 @@ def build_expense_fetcher(config, password_getter_repo=None, password_getter=Non
             [
                 (
                     repository_name,
-                    cfg_parser.parse_repository(
+                    parse_repository(
                         config["repositories"][repository_name],
                         repository_name,
                         password_getter_repo,
@@ -58,12 +68,16 @@ def build_expense_fetcher(config, password_getter_repo=None, password_getter=Non
     accounts = dict()
     if "accounts" in config:
         accounts_cfg = config["accounts"]
+        from src.infrastructure.bank_account_transactions_fetchers.nordigen_token_provider import (
+            NordigenTokenProvider,
+        )
+
         nordigen_token_provider = NordigenTokenProvider()
         accounts = dict(
             [
                 (
                     account_name,
-                    cfg_parser.parse_account(
+                    parse_account(
                         accounts_cfg[account_name],
                         account_name,
                         repositories.values(),
@@ -105,6 +119,9 @@ def build_expense_fetcher(config, password_getter_repo=None, password_getter=Non
             if "date_format" not in config["transactions"]
             else config["transactions"]["date_format"]
         )
+        transactions_cfg["transfer_window_days"] = config["transactions"].get(
+            "transfer_window_days"
+        )
 
     return ExpensesFetcher(repositories, accounts, **transactions_cfg)
 
@@ -114,9 +131,28 @@ class ExpenseFetcherShell(cmd.Cmd):
     prompt = "Expenses Fetcher >> "
     file = None
 
+    # Commands that are never profiled: the profiler itself and leaving the shell
+    unprofiled_commands = ("profile", "exit", "EOF")
+
     def __init__(self, expense_fetcher: ExpensesFetcher):
         super().__init__()
         self.expense_fetcher = expense_fetcher
+        self.profiler = CommandProfiler()
+
+    def onecmd(self, line):
+        command, _, _ = self.parseline(line)
+        # Spans of one command at a time; the shell may run for days
+        tracing.reset_tracer()
+        if (
+            not self.profiler.enabled
+            or not command
+            or command in self.unprofiled_commands
+        ):
+            return super().onecmd(line)
+        result, report = self.profiler.run(command, super().onecmd, line)
+        print(f"--- profile: {command} ---")
+        print(report)
+        return result
 
     @staticmethod
     def _parse_datetime(parameters, parameter_name: str, input_format):
@@ -164,6 +200,47 @@ class ExpenseFetcherShell(cmd.Cmd):
             )
         self.expense_fetcher.pull_transactions(**parameters)
 
+    def do_backfill(self, arg):
+        """
+        Stage every statement of a manual account at once, parsed in parallel:
+        backfill account_name=<name>, path=<directory or glob>[, date_start=...]
+        """
+        parameters = parse(arg)
+        account_name = parameters.get("account_name")
+        if "path" not in parameters:
+            raise Exception("parameter `path` is required")
+        account_manager = self.expense_fetcher.get_account(account_name)
+        if account_manager is None or not hasattr(account_manager, "set_file_path"):
+            raise Exception(f"`{account_name}` is not an xlsx-manual account")
+
+        # The whole history: the repository's last date would skip older statements
+        date_start = datetime(1970, 1, 1)
+        if "date_start" in parameters:
+            date_start = self._parse_datetime(
+                parameters, "date_start", self.expense_fetcher.date_format
+            )
+        date_end = None
+        if "date_end" in parameters:
+            date_end = self._parse_datetime(
+                parameters, "date_end", self.expense_fetcher.date_format
+            )
+
+        previous = account_manager.set_file_path(parameters["path"])
+        staged = len(self.expense_fetcher.staged_transactions)
+        try:
+            self.expense_fetcher.pull_transactions(
+                date_start=date_start,
+                date_end=date_end,
+                account_name=account_name,
+                apply_categories=True,
+            )
+        finally:
+            account_manager.set_file_path(previous)
+        print(
+            f"Staged {len(self.expense_fetcher.staged_transactions) - staged} "
+            f"transactions for {account_name}"
+        )
+
     def do_sort(self, arg):
         "Sort transactions. sort_transcations reverse = False"
         parameters = parse(arg)
@@ -176,16 +253,32 @@ class ExpenseFetcherShell(cmd.Cmd):
 
     def do_push(self, arg):
         parameters = parse(arg)
-        # try:
-        self.expense_fetcher.push_transactions(**parameters)
-        # except Exception as e:
-        #    print(e)
+        if "deduplicate" in parameters:
+            if parameters["deduplicate"] not in ("True", "False"):
+                raise Exception("parameter `deduplicate` must be either True or False")
+            parameters["deduplicate"] = parameters["deduplicate"] == "True"
+        results = self.expense_fetcher.push_transactions(**parameters)
+        for name, result in results.items():
+            status = "ok" if result.ok else f"FAILED: {result.error}"
+            print(f"{name}: {status} ({result.elapsed_seconds:.2f}s)")
+
+    def do_check_duplicates(self, arg):
+        "Drop transactions staged more than once. check_duplicates [account_name=...]"
+        parameters = parse(arg)
+        dropped = self.expense_fetcher.check_duplicates(**parameters)
+        print(f"Dropped {dropped} duplicated transactions")
+
+    def do_match_transfers(self, arg):
+        "Pair transfers between the staged accounts. match_transfers"
+        print(f"Paired {self.expense_fetcher.match_transfers()} transfers")
 
     def do_remove(self, arg):
         parameters = parse(arg)
         self.expense_fetcher.remove_transactions(**parameters)
 
     def do_list(self, arg):
+        from tabulate import tabulate
+
         parameters = parse(arg)
         print(
             tabulate(
@@ -199,6 +292,7 @@ class ExpenseFetcherShell(cmd.Cmd):
                     "Category",
                     "Unsigned Value",
                     "Value",
+                    "ID",
                 ],
             )
         )
@@ -224,6 +318,57 @@ class ExpenseFetcherShell(cmd.Cmd):
         """
         print("Not implemented yet")
 
+    def do_profile(self, arg):
+        """Profile shell commands with cProfile.
+        profile on [top=15, sort=cumulative|tottime|ncalls]
+        profile off
+        profile dump path=profiles
+        profile clear"""
+        action, _, rest = arg.strip().partition(" ")
+        parameters = parse(rest)
+        if action == "on":
+            top = int(parameters["top"]) if "top" in parameters else None
+            self.profiler.enable(top=top, sort=parameters.get("sort"))
+            print(
+                f"Profiling on: top {self.profiler.top} functions "
+                f"by {self.profiler.sort} after each command"
+            )
+        elif action == "off":
+            self.profiler.disable()
+            print("Profiling off")
+        elif action == "dump":
+            if "path" not in parameters:
+                raise Exception("usage: profile dump path=<directory>")
+            written = self.profiler.dump(parameters["path"])
+            for command, file_path in written.items():
+                print(f"{command}: {file_path}")
+        elif action == "clear":
+            self.profiler.clear()
+        else:
+            state = "on" if self.profiler.enabled else "off"
+            print(f"Profiling is {state}; profiled: {', '.join(self.profiler.stats)}")
+
+    def do_cache(self, arg):
+        """Inspect or invalidate the fetcher caches.
+        cache stats
+        cache clear [name=<account or repository>]"""
+        action, _, rest = arg.strip().partition(" ")
+        parameters = parse(rest)
+        registry = cache.get_registry()
+        if action == "clear":
+            dropped = registry.invalidate(parameters.get("name"))
+            print(f"Dropped {dropped} cached entries")
+        else:
+            caches = registry.stats()
+            if not caches:
+                print("No caches configured")
+            for stats in caches:
+                print(
+                    f"{stats.name}: {stats.backend}, ttl {stats.ttl_seconds}s, "
+                    f"{stats.hits} hits, {stats.misses} misses, "
+                    f"{stats.entries} entries, {stats.bytes} bytes"
+                )
+
     def do_exit(self, arg):
         self.expense_fetcher.close_all_connections()
         sys.exit()
@@ -251,6 +396,8 @@ if __name__ == "__main__":
 
     password_getter = TTYPasswordGetter("Password for account {} :")
     password_getter_repo = TTYPasswordGetter("Password for repository {} :")
+    import yaml
+
     config = yaml.load(open(args.config_file), Loader=yaml.FullLoader)
 
     expense_fetcher = build_expense_fetcher(config, password_getter_repo, password_getter)
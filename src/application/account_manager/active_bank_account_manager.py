@@ -1,15 +1,15 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from src.application.password_getter.password_getter import IPasswordGetter
 from src.application.account_manager.i_account_manager import IAccountManager
 from src.domain.category_taggers.i_tagger import ITagger
 from src.domain.transactions import ITransaction, ActiveBankTransaction
+from src.infrastructure.cache import Cache
 from src.infrastructure.bank_account_transactions_fetchers.active_bank_fetcher_crawler import (
     ActiveBankCrawler,
     ITransactionsFetcher,
 )
-from src.repository.google_sheet_repository import GoogleSheetRepository
 from src.application.account_manager.exceptions import AccountNotFoundException
 
 
@@ -23,31 +23,44 @@ class ActiveBankAccountManager(IAccountManager):
         taggers: List[ITagger],
         tmp_folder: str,
         password_getter: IPasswordGetter,
+        headless: bool = True,
+        cache: Optional[Cache] = None,
     ):
-        self.bank = ActiveBankCrawler(
+        self.bank = ActiveBankCrawler.shared(
             username,
             password,
             tmp_folder,
             lambda: password_getter.get_password(account_id=account_id),
+            headless=headless,
         )
-        self.transactions_fetcher: ITransactionsFetcher = self.bank.get_card(account_id)
-        if self.transactions_fetcher is None:
-            raise AccountNotFoundException(
-                f"The account with id {account_id} was not found"
-            )
+        self._transactions_fetcher: ITransactionsFetcher = None
+        self._released = False
         self.account_id = account_id
+        self.cache = cache
         self.taggers = taggers
         self.remove_transactions_description_prefix = (
             remove_transaction_description_prefix
         )
 
+    @property
+    def transactions_fetcher(self) -> ITransactionsFetcher:
+        # Resolving the card logs into the bank, so it only happens on first pull
+        if self._transactions_fetcher is None:
+            if not self._released:
+                self._transactions_fetcher = self.bank.get_card(self.account_id)
+            if self._transactions_fetcher is None:
+                # Drop this account's reference to the shared browser
+                self.close()
+                raise AccountNotFoundException(
+                    f"The account with id {self.account_id} was not found"
+                )
+        return self._transactions_fetcher
+
     def _get_transactions(
         self, date_start: datetime, date_end: datetime
     ) -> List[ITransaction]:
         transactions = []
-        for raw_transaction in self.transactions_fetcher.getTransactions(
-            date_start, date_end
-        ):
+        for raw_transaction in self._get_raw_transactions(date_start, date_end):
             transactions.append(
                 ActiveBankTransaction(
                     auth_date=raw_transaction["Data Valor"],
@@ -58,8 +71,21 @@ class ActiveBankAccountManager(IAccountManager):
             )
         return transactions
 
+    def _get_raw_transactions(self, date_start: datetime, date_end: datetime):
+        if self.cache is None:
+            return self.transactions_fetcher.getTransactions(date_start, date_end)
+        # Checked before touching transactions_fetcher: a hit needs no browser login.
+        # The bank export is per day, so the key ignores the time of day.
+        key = f"{self.account_id}:{date_start:%Y-%m-%d}:{date_end:%Y-%m-%d}"
+        return self.cache.get_or_fetch(
+            key,
+            lambda: self.transactions_fetcher.getTransactions(date_start, date_end),
+        )
+
     def getCategoryTaggers(self) -> List[ITagger]:
         return self.taggers
 
     def close(self):
-        self.bank.driver.quit()
+        if not self._released:
+            self._released = True
+            self.bank.release()
@@ -1,9 +1,12 @@
 from abc import ABC, abstractmethod
+from collections import defaultdict
 import datetime
-from typing import List
-from src.domain.transactions import ITransaction
+import time
+from typing import Dict, List
+from src.domain.transactions import ITransaction, number_repeated_transactions
 from src.domain.balance import Balance
 from src.domain.category_taggers.i_tagger import ITagger
+from src.infrastructure.tracing import get_tracer, span
 import logging
 
 log = logging.getLogger(__file__)
@@ -23,33 +26,50 @@ class IAccountManager(ABC):
     def get_transactions(
         self, date_start: datetime, date_end: datetime, apply_taggers: bool = False
     ) -> List[ITransaction]:
-        transactions = self._get_transactions(date_start, date_end)
+        with span("account.fetch", manager=type(self).__name__):
+            transactions = self._get_transactions(date_start, date_end)
+        number_repeated_transactions(transactions)
         if apply_taggers:
-            for transaction in transactions:
-                tagger_iterable = iter(self.taggers)
-                try:
-                    while transaction.get_category() == "":
-                        tagger = next(tagger_iterable)
-                        current_category = tagger.get_category(
-                            transaction.get_description(
-                                self.remove_transactions_description_prefix
-                            )
+            with span("tagging", transactions=len(transactions)):
+                self._apply_taggers(transactions)
+        return transactions
+
+    def _apply_taggers(self, transactions: List[ITransaction]) -> None:
+        # Taggers run once per transaction, so their time is accumulated per
+        # tagger and recorded as one entry instead of a span per call.
+        tagger_seconds: Dict[str, float] = defaultdict(float)
+        tagger_calls: Dict[str, int] = defaultdict(int)
+        for transaction in transactions:
+            tagger_iterable = iter(self.taggers)
+            try:
+                while transaction.get_category() == "":
+                    tagger = next(tagger_iterable)
+                    tagger_name = type(tagger).__name__
+                    start = time.perf_counter()
+                    current_category = tagger.get_category(
+                        transaction.get_description(
+                            self.remove_transactions_description_prefix
                         )
-                        current_type = tagger.get_type(
-                            transaction.get_description(
-                                self.remove_transactions_description_prefix
-                            )
+                    )
+                    current_type = tagger.get_type(
+                        transaction.get_description(
+                            self.remove_transactions_description_prefix
                         )
-                        transaction.set_category(current_category)
-                        transaction.set_type(current_type)
-                        if self.account_names:
-                            log.debug("Account manager is receiving account names:")
-                            log.debug(self.account_names)
-                            if current_category in self.account_names and transaction.get_type() == "":
-                                transaction.set_transfer()
-                except StopIteration:
-                    continue
-        return transactions
+                    )
+                    tagger_seconds[tagger_name] += time.perf_counter() - start
+                    tagger_calls[tagger_name] += 1
+                    transaction.set_category(current_category)
+                    transaction.set_type(current_type)
+                    if self.account_names:
+                        log.debug("Account manager is receiving account names:")
+                        log.debug(self.account_names)
+                        if current_category in self.account_names and transaction.get_type() == "":
+                            transaction.set_transfer()
+            except StopIteration:
+                continue
+        tracer = get_tracer()
+        for tagger_name, seconds in tagger_seconds.items():
+            tracer.record(f"tagger.{tagger_name}", seconds, tagger_calls[tagger_name])
 
     @abstractmethod
     def get_balance() -> Balance:
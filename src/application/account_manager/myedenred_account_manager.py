@@ -1,17 +1,22 @@
 import datetime
-from typing import List
+from typing import List, Optional
 
 from src.application.account_manager.i_account_manager import IAccountManager
 from src.application.account_manager.exceptions import AccountNotFoundException
 from src.application.password_getter.password_getter import IPasswordGetter
 from src.domain.category_taggers.i_tagger import ITagger
 from src.domain.transactions import ITransaction, MyEdenredTransaction
+from src.infrastructure.cache import Cache
 from src.infrastructure.bank_account_transactions_fetchers.i_transactions_fetcher import (
     ITransactionsFetcher,
 )
 from src.infrastructure.bank_account_transactions_fetchers.myedenred_fetcher import (
     MyEdenred,
 )
+from src.infrastructure.bank_account_transactions_fetchers.myedenred_movement_store import (
+    MYEDENRED_STORE_DIR,
+    MyEdenredMovementStore,
+)
 
 
 class MyEdenredAccountManager(IAccountManager):
@@ -23,11 +28,16 @@ class MyEdenredAccountManager(IAccountManager):
         remove_transaction_description_prefix: bool,
         taggers: List[ITagger],
         password_getter: IPasswordGetter,
+        cache: Optional[Cache] = None,
+        incremental: bool = True,
+        store_dir: Optional[str] = None,
     ):
         self.bank = MyEdenred(
             username,
             password,
             lambda: password_getter.get_password(account_id=account_id),
+            cache=cache,
+            store_dir=(store_dir or MYEDENRED_STORE_DIR) if incremental else None,
         )
         self.transactions_fetcher: ITransactionsFetcher = self.bank.get_card(
             int(account_id)
@@ -54,6 +64,7 @@ class MyEdenredAccountManager(IAccountManager):
                     transaction_date=raw_transaction["transactionDate"],
                     transaction_name=raw_transaction["transactionName"],
                     amount=raw_transaction["amount"],
+                    transaction_id=MyEdenredMovementStore.movement_id(raw_transaction),
                 )
             )
         return transactions
@@ -1,5 +1,5 @@
 import datetime
-from typing import List
+from typing import List, TYPE_CHECKING
 
 from src.application.account_manager.i_account_manager import IAccountManager
 from src.application.account_manager.exceptions import AccountNotFoundException
@@ -12,10 +12,14 @@ from src.infrastructure.bank_account_transactions_fetchers.i_transactions_fetche
 from src.infrastructure.bank_account_transactions_fetchers.nordigen_fetcher import (
     NordigenFetcher,
 )
-from src.infrastructure.bank_account_transactions_fetchers.nordigen_token_provider import (
-    NordigenTokenProvider,
-)
 from src.domain.balance import Balance
+from src.domain.date_codec import parse_date
+
+if TYPE_CHECKING:
+    from src.infrastructure.cache import Cache
+    from src.infrastructure.bank_account_transactions_fetchers.nordigen_token_provider import (
+        NordigenTokenProvider,
+    )
 
 
 class NordigenAccountManager(IAccountManager):
@@ -29,10 +33,11 @@ class NordigenAccountManager(IAccountManager):
         account_names: List[
             str
         ] = None,  # this is needed to compare categories agains account names, to identify transfers
-        token_provider: NordigenTokenProvider = None,
+        token_provider: "NordigenTokenProvider" = None,
         cache_dir: str = None,
         cache_policy: str = "network_only",
         cache_ttl_hours: int = 3,
+        cache: "Cache" = None,
     ):
         self.transactions_fetcher: ITransactionsFetcher = NordigenFetcher(
             secret_id,
@@ -42,6 +47,7 @@ class NordigenAccountManager(IAccountManager):
             cache_dir=cache_dir,
             cache_policy=cache_policy,
             cache_ttl_hours=cache_ttl_hours,
+            cache=cache,
         )
         if self.transactions_fetcher is None:
             raise AccountNotFoundException(
@@ -76,6 +82,9 @@ class NordigenAccountManager(IAccountManager):
                     value_date=raw_transaction["valueDate"],
                     transaction_name=transaction_name,
                     amount=raw_transaction["transactionAmount"],
+                    # Not every bank sends transactionId
+                    transaction_id=raw_transaction.get("transactionId")
+                    or raw_transaction.get("internalTransactionId"),
                 )
             )
         return transactions
@@ -92,15 +101,13 @@ class NordigenAccountManager(IAccountManager):
             args = {}
             for balance_type in raw_balance["balances"]:
                 if balance_type["balanceType"] == "closingBooked":
-                    args["balance_date"] = datetime.datetime.strptime(
+                    args["balance_date"] = parse_date(
                         balance_type["lastChangeDateTime"], "%Y-%m-%dT%H:%M:%SZ"
                     )
                 elif balance_type["balanceType"] == "interimAvailable":
                     args["balance"] = float(balance_type["balanceAmount"]["amount"])
                     if balance_type.get("referenceDate"):
-                        args["balance_date"] = datetime.datetime.strptime(
-                                balance_type["referenceDate"], "%Y-%m-%d"
-                        )
+                        args["balance_date"] = parse_date(balance_type["referenceDate"])
                     args["account"] = None
 
             args["updated_date_time"] = datetime.datetime.now()
@@ -8,10 +8,16 @@ from src.domain.transactions import ITransaction, FromListTransaction
 from src.infrastructure.bank_account_transactions_fetchers.i_transactions_fetcher import (
     ITransactionsFetcher,
 )
-from src.infrastructure.bank_account_transactions_fetchers.xlsx_transactions_fetcher import (
-    XlsxTransactionsFetcher,
+from src.infrastructure.bank_account_transactions_fetchers.statement_backfill import (
+    is_statement_collection,
+    parse_statements,
+    resolve_statement_paths,
+)
+from src.infrastructure.bank_account_transactions_fetchers.statement_transactions_fetcher import (
+    StatementTransactionsFetcher,
 )
 from src.domain.balance import Balance
+from src.domain.date_codec import format_date
 
 
 class XlsxManualAccountManager(IAccountManager):
@@ -29,6 +35,10 @@ class XlsxManualAccountManager(IAccountManager):
         prompt_for_file_path: bool = True,
         file_path: Optional[str] = None,
         footer_skip_rows: int = 0,
+        statement_format: str = "auto",
+        delimiter: Optional[str] = None,
+        encoding: Optional[str] = None,
+        parse_workers: Optional[int] = None,
     ):
         self.account_name = account_name
         self.taggers = taggers
@@ -38,7 +48,8 @@ class XlsxManualAccountManager(IAccountManager):
         self.prompt_for_file_path = prompt_for_file_path
         self.file_path = file_path
         self.sheet_name = sheet_name
-        self.transactions_fetcher: ITransactionsFetcher = XlsxTransactionsFetcher(
+        # XLSX, CSV, OFX or CAMT.053, detected per file unless statement_format is set
+        self.transactions_fetcher: ITransactionsFetcher = StatementTransactionsFetcher(
             header_skip_rows=header_skip_rows,
             date_format=date_format,
             decimal_separator=decimal_separator,
@@ -46,20 +57,35 @@ class XlsxManualAccountManager(IAccountManager):
             columns=columns,
             sheet_name=sheet_name,
             footer_skip_rows=footer_skip_rows,
+            statement_format=statement_format,
+            delimiter=delimiter,
+            encoding=encoding,
         )
+        # Processes parsing the files of a back-fill (directory or glob file_path)
+        self.parse_workers = parse_workers
         self._latest_balance_value: Optional[float] = None
         self._latest_balance_date: Optional[datetime.datetime] = None
+        self._closing_balance = None
         self.account_names = None
 
     def set_accounts(self, account_names: List[str]) -> None:
         self.account_names = account_names
 
+    def set_file_path(self, file_path: Optional[str]) -> Optional[str]:
+        """Point at another statement, directory or glob; returns the previous one."""
+        previous, self.file_path = self.file_path, file_path
+        self._latest_balance_value = None
+        self._latest_balance_date = None
+        self._closing_balance = None
+        return previous
+
     def _resolve_file_path(self) -> str:
         if self.file_path:
             return self.file_path
         if self.prompt_for_file_path:
             path = input(
-                f"Please enter the path to the XLSX file for '{self.account_name}': "
+                f"Please enter the path to the statement file (or a directory or glob "
+                f"of statements) for '{self.account_name}': "
             ).strip()
             if not path:
                 raise Exception("No file path provided")
@@ -67,13 +93,36 @@ class XlsxManualAccountManager(IAccountManager):
             return path
         raise Exception("file_path not set and prompt_for_file_path is False")
 
+    def _read_statements(
+        self, path: str, date_start: datetime, date_end: datetime
+    ) -> List[dict]:
+        """
+        Rows of the statement at `path`, or of every statement matching it when
+        it is a directory or glob: those are parsed in parallel and merged.
+        """
+        if not is_statement_collection(path):
+            rows = self.transactions_fetcher.getTransactions(
+                date_init=date_start, date_end=date_end, file_path=path
+            )
+            self._closing_balance = getattr(
+                self.transactions_fetcher, "closing_balance", None
+            )
+            return rows
+        result = parse_statements(
+            self.transactions_fetcher,
+            resolve_statement_paths(path),
+            date_start,
+            date_end,
+            max_workers=self.parse_workers,
+        )
+        self._closing_balance = result.closing_balance
+        return result.rows
+
     def _get_transactions(
         self, date_start: datetime, date_end: datetime
     ) -> List[ITransaction]:
         path = self._resolve_file_path()
-        raw_rows = self.transactions_fetcher.getTransactions(
-            date_init=date_start, date_end=date_end, file_path=path
-        )
+        raw_rows = self._read_statements(path, date_start, date_end)
 
         # Track latest balance based on the most recent date within filtered rows
         self._latest_balance_value = None
@@ -83,11 +132,19 @@ class XlsxManualAccountManager(IAccountManager):
         for row in raw_rows:
             capture_dt = row["captureDate"]
             auth_dt = row["authDate"]
-            capture = capture_dt.strftime("%Y/%m/%d")
-            auth = auth_dt.strftime("%Y/%m/%d")
+            capture = format_date(capture_dt, "%Y/%m/%d")
+            auth = format_date(auth_dt, "%Y/%m/%d")
             desc = row["description"]
             amount = row["amount"]
-            txs.append(FromListTransaction(capture, auth, desc, amount))
+            txs.append(
+                FromListTransaction(
+                    capture,
+                    auth,
+                    desc,
+                    amount,
+                    transaction_id=row.get("transactionId"),
+                )
+            )
 
             # Update latest balance by max(authDate or captureDate)
             if row.get("balance") is not None:
@@ -126,9 +183,7 @@ class XlsxManualAccountManager(IAccountManager):
         except Exception:
             return None
 
-        all_rows = self.transactions_fetcher.getTransactions(
-            date_init=None, date_end=None, file_path=path
-        )
+        all_rows = self._read_statements(path, None, None)
         # Select the row with the most recent date among those with a balance
         latest = None
         latest_dt = None
@@ -148,4 +203,13 @@ class XlsxManualAccountManager(IAccountManager):
                 balance=latest["balance"],
                 account=None,
             )
+        # OFX and CAMT.053 rows carry no balance, the statement has a closing one
+        closing_balance = self._closing_balance
+        if closing_balance is not None and closing_balance[0] is not None:
+            return Balance(
+                balance_date=closing_balance[0],
+                updated_date_time=datetime.datetime.now(),
+                balance=closing_balance[1],
+                account=None,
+            )
         return None
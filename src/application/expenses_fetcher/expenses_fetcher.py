@@ -1,3 +1,6 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from src.application.account_manager.i_account_manager import IAccountManager
 from typing import Iterable, Dict
@@ -6,19 +9,41 @@ from enum import Enum
 from src.application.transactions.expense_fetcher_transaction import (
     ExpenseFetcherTransaction,
 )
+from src.domain.transactions import ITransaction
+from src.domain.transfer_matcher import TransferMatcher
 from src.repository.i_repository import IRepository
+from src.infrastructure.bank_account_transactions_fetchers.webdriver_pool import (
+    shutdown_default_pool,
+)
+from src.infrastructure import metrics
+from src.infrastructure.tracing import in_current_span, span
 
-from typing import List
+from typing import List, Optional, Tuple
 import logging
 
 log = logging.getLogger(__file__)
 
+STAGED_ID_INDEX = 8
+
 
 class OrderBy(Enum):
     AUTH_DATE = 1
     CAPTURE_DATE = 0
 
 
+@dataclass
+class PushResult:
+    repository_name: str
+    transactions: int
+    balances: int
+    elapsed_seconds: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
 class ExpensesFetcher:
     def __init__(
         self,
@@ -29,6 +54,7 @@ class ExpensesFetcher:
         transfer_description: str = "Transfer",
         investment_description: str = "Investment",
         date_format: str = "%Y/%M/%D",
+        transfer_window_days: Optional[int] = None,
     ):
         self.repositories = repositories
         self.accounts = accounts
@@ -39,6 +65,12 @@ class ExpensesFetcher:
         self.investment_description = investment_description
         self.date_format = date_format
         self.staged_balances: List[List[str]] = list()
+        # Pairs debits and credits between the staged accounts as transfers
+        self.transfer_matcher: Optional[TransferMatcher] = None
+        if transfer_window_days is not None:
+            self.transfer_matcher = TransferMatcher(int(transfer_window_days))
+        # Staged transactions not paired yet, with the row each was staged as
+        self.unpaired_transactions: List[Tuple[str, ITransaction, List[str]]] = list()
         account_names = list(accounts.keys())
         for account_name in account_names:
             self.accounts[account_name].set_accounts(account_names)
@@ -57,54 +89,126 @@ class ExpensesFetcher:
                 (account_name, self.accounts.get(account_name, None))
             ]
 
+        pulled: List[Tuple[str, List[ITransaction]]] = []
         try:
             for account_name, account_manager in accounts_iterator:
-
-                current_balance = account_manager.get_balance()
-                if current_balance is not None:
-                    self.staged_balances.append(
-                        current_balance.to_list(self.date_format, account_name)
+                with span("pull_transactions", account=account_name):
+                    transactions = self._pull_account(
+                        account_name,
+                        account_manager,
+                        date_start,
+                        date_end,
+                        apply_categories,
                     )
+                pulled.append((account_name, transactions))
+        except StopIteration:
+            pass
+        finally:
+            # Accounts pulled before a failing one are still staged
+            self._stage_transactions(pulled)
 
-                if date_start is None:
-                    _, pivot_repository = next(iter(self.repositories.items()))
-                    date_get_from_repo = pivot_repository.get_last_transaction_date_for_account(
-                        account_name
-                    )
+    def _format_transaction(
+        self, transaction: ITransaction, account_name: str
+    ) -> List[str]:
+        return ExpenseFetcherTransaction(
+            transaction,
+            account_name,
+            self.debt_description,
+            self.income_description,
+            self.transfer_description,
+            self.investment_description,
+            self.date_format,
+        ).to_list()
 
-                    if date_get_from_repo is None:
-                        date_start_fetched = datetime.strptime("1970-01-01", "%Y-%m-%d")
-                    else:
-                        date_start_fetched = date_get_from_repo
-                    # date_start_fetched = date_start_fetched + timedelta(days=1)
-                    log.debug(
-                        f"Reference data for account {account_name} is {date_start_fetched}"
-                    )
-                else:
-                    date_start_fetched = date_start
-                if date_end is None:
-                    date_end_fetched = datetime.today()
-                else:
-                    date_end_fetched = date_end
-                if date_start_fetched <= date_end_fetched:
-                    self.staged_transactions.extend(
-                        map(
-                            lambda transaction: ExpenseFetcherTransaction(
-                                transaction,
-                                account_name,
-                                self.debt_description,
-                                self.income_description,
-                                self.transfer_description,
-                                self.investment_description,
-                                self.date_format,
-                            ).to_list(),
-                            account_manager.get_transactions(
-                                date_start_fetched, date_end_fetched, apply_categories
-                            ),
+    def _stage_transactions(self, pulled: List[Tuple[str, List[ITransaction]]]) -> None:
+        for account_name, transactions in pulled:
+            with span("format_transactions", account=account_name):
+                for transaction in transactions:
+                    row = self._format_transaction(transaction, account_name)
+                    self.staged_transactions.append(row)
+                    if self.transfer_matcher is not None:
+                        self.unpaired_transactions.append(
+                            (account_name, transaction, row)
                         )
-                    )
-        except StopIteration:
-            pass
+
+    def match_transfers(self) -> int:
+        """
+        Pair transfers across every account staged so far, whether pulled
+        together or one `pull_transactions` call at a time, and restage both
+        legs as transfers. Returns how many pairs were found.
+        """
+        if self.transfer_matcher is None:
+            return 0
+        # Rows dropped since they were staged (removed, deduplicated) are not
+        # pushed, so their transactions must not take a counterpart
+        staged = {id(row) for row in self.staged_transactions}
+        self.unpaired_transactions = [
+            entry for entry in self.unpaired_transactions if id(entry[2]) in staged
+        ]
+        by_account: Dict[str, List[ITransaction]] = dict()
+        for account_name, transaction, _ in self.unpaired_transactions:
+            by_account.setdefault(account_name, []).append(transaction)
+        pairs = self.transfer_matcher.match(list(by_account.items()))
+
+        paired = {id(leg) for pair in pairs for leg in (pair.debit, pair.credit)}
+        unpaired = []
+        for account_name, transaction, row in self.unpaired_transactions:
+            if id(transaction) in paired:
+                # In place: the row may have been sorted or copied by reference
+                row[:] = self._format_transaction(transaction, account_name)
+            else:
+                unpaired.append((account_name, transaction, row))
+        self.unpaired_transactions = unpaired
+        if pairs:
+            log.info(f"Paired {len(pairs)} transfers between accounts")
+        return len(pairs)
+
+    def _pull_account(
+        self,
+        account_name: str,
+        account_manager: IAccountManager,
+        date_start: Optional[datetime],
+        date_end: Optional[datetime],
+        apply_categories: bool,
+    ) -> List[ITransaction]:
+        with span("account.get_balance", account=account_name):
+            current_balance = account_manager.get_balance()
+        if current_balance is not None:
+            self.staged_balances.append(
+                current_balance.to_list(self.date_format, account_name)
+            )
+
+        if date_start is None:
+            repository_name, pivot_repository = next(iter(self.repositories.items()))
+            with span(
+                "repository.get_last_transaction_date", repository=repository_name
+            ):
+                date_get_from_repo = pivot_repository.get_last_transaction_date_for_account(
+                    account_name
+                )
+
+            if date_get_from_repo is None:
+                date_start_fetched = datetime.strptime("1970-01-01", "%Y-%m-%d")
+            else:
+                date_start_fetched = date_get_from_repo
+            # date_start_fetched = date_start_fetched + timedelta(days=1)
+            log.debug(
+                f"Reference data for account {account_name} is {date_start_fetched}"
+            )
+        else:
+            date_start_fetched = date_start
+        if date_end is None:
+            date_end_fetched = datetime.today()
+        else:
+            date_end_fetched = date_end
+        if date_start_fetched > date_end_fetched:
+            return []
+        with span("account.get_transactions", account=account_name):
+            transactions = account_manager.get_transactions(
+                date_start_fetched, date_end_fetched, apply_categories
+            )
+        metrics.TRANSACTIONS_FETCHED.inc(len(transactions), account=account_name)
+        return transactions
 
     def sort_transactions(
         self, by: int = OrderBy.AUTH_DATE.value, reverse: bool = False
@@ -125,20 +229,76 @@ class ExpensesFetcher:
         repo = self.repositories[repository]
         self.staged_transactions.extend(repo.get_transactions())
 
-    def push_transactions(self, repository_name: str = None):
+    def push_transactions(
+        self,
+        repository_name: str = None,
+        parallel: bool = True,
+        deduplicate: bool = False,
+    ) -> Dict[str, PushResult]:
+        """
+        Write the staged transactions and balances to every repository (or only
+        to `repository_name`). Repositories are written concurrently, each with
+        its own copy of the staged rows, and a failing repository does not stop
+        the others. With `deduplicate`, rows staged more than once are dropped
+        first (see `check_duplicates`). Returns one PushResult per repository.
+        """
         if repository_name is None:
-            repository_iterator = iter(self.repositories.items())
+            repositories = dict(self.repositories)
         else:
-            repository_iterator = iter(
-                [(repository_name, self.repositories.get(repository_name, None))]
-            )
+            if repository_name not in self.repositories:
+                raise Exception("repository unknown")
+            repositories = {repository_name: self.repositories[repository_name]}
+
+        if deduplicate:
+            # Overlapping pulls stage the same rows again; send each only once
+            with span("check_duplicates", rows=len(self.staged_transactions)):
+                self.check_duplicates()
+        # After dedup, so a leg staged twice cannot take a second counterpart
+        with span("match_transfers"):
+            self.match_transfers()
 
+        if not parallel or len(repositories) <= 1:
+            return {
+                name: self._push_to_repository(name, repository)
+                for name, repository in repositories.items()
+            }
+        with ThreadPoolExecutor(
+            max_workers=len(repositories), thread_name_prefix="push"
+        ) as executor:
+            push = in_current_span(self._push_to_repository)
+            futures = {
+                name: executor.submit(push, name, repository)
+                for name, repository in repositories.items()
+            }
+            return {name: future.result() for name, future in futures.items()}
+
+    def _push_to_repository(self, name: str, repository: IRepository) -> PushResult:
+        # Repositories may reorder or mutate the rows they receive (Buxfer sorts
+        # in place), so each one gets its own copy.
+        transactions = [list(row) for row in self.staged_transactions]
+        balances = [list(row) for row in self.staged_balances]
+        start = time.perf_counter()
+        error = None
         try:
-            for _, repository in repository_iterator:
-                repository.batch_insert(self.staged_transactions)
-                repository.append_balances(self.staged_balances)
-        except StopIteration:
-            pass
+            with span("repository.batch_insert", repository=name):
+                repository.batch_insert(transactions)
+            with span("repository.append_balances", repository=name):
+                repository.append_balances(balances)
+        except Exception as e:
+            log.error(f"Failed to push to repository {name}: {e}", exc_info=True)
+            error = str(e) or type(e).__name__
+        result = PushResult(
+            name,
+            len(transactions),
+            len(balances),
+            time.perf_counter() - start,
+            error,
+        )
+        log.info(
+            f"Pushed to {name} in {result.elapsed_seconds:.2f}s"
+            + ("" if result.ok else f" (failed: {error})")
+        )
+        return result
 
     def remove_transactions(self, account_name: str = None):
         if account_name is None:
@@ -148,12 +308,58 @@ class ExpensesFetcher:
                 filter(lambda x: x[3] is not account_name, self.staged_transactions)
             )
 
-    def check_duplicates(self, account_name: str = None):
-        pass
+    @staticmethod
+    def _staged_account(row: List[str]) -> str:
+        return str(row[3]).strip() if len(row) > 3 else ""
+
+    @classmethod
+    def _staged_key(cls, row: List[str]) -> Optional[tuple]:
+        # The id column (see ExpenseFetcherTransaction.to_list). Rows without one
+        # (e.g. pulled from a repository before ids) have no key: two identical
+        # movements cannot be told apart from a row staged twice.
+        if len(row) > STAGED_ID_INDEX and row[STAGED_ID_INDEX]:
+            return cls._staged_account(row), str(row[STAGED_ID_INDEX])
+        return None
+
+    def check_duplicates(self, account_name: str = None) -> int:
+        """
+        Drop staged rows that were staged before, e.g. by pulling overlapping
+        dates twice, keeping the first. Only rows with a transaction id are
+        checked, and only rows of `account_name` when given. Returns how many
+        rows were dropped.
+        """
+        seen = set()
+        kept = []
+        dropped: Dict[str, int] = dict()
+        for row in self.staged_transactions:
+            if account_name is not None and self._staged_account(row) != account_name:
+                kept.append(row)
+                continue
+            key = self._staged_key(row)
+            if key is None:
+                kept.append(row)
+                continue
+            if key in seen:
+                dropped[key[0]] = dropped.get(key[0], 0) + 1
+                continue
+            seen.add(key)
+            kept.append(row)
+        self.staged_transactions = kept
+        for account, count in dropped.items():
+            metrics.TRANSACTIONS_DEDUPLICATED.inc(
+                count, repository="staged", account=account
+            )
+        total = sum(dropped.values())
+        if total:
+            log.info(f"Dropped {total} transactions staged more than once")
+        return total
 
     def close_all_connections(self):
         for account in self.accounts:
             self.accounts[account].close()
+        for repository in self.repositories.values():
+            repository.close()
+        shutdown_default_pool()
 
 
 class ExpenseFetcherBuilder:
@@ -18,7 +18,9 @@ class ExpenseFetcherTransaction:
         self.account_name = account_name
         self.transaction_type =  self.transaction.get_type() 
         if self.transaction_type is None or self.transaction_type == "":
-            if transaction.is_debt():
+            if transaction.is_paired_transfer():
+                self.transaction_type = transfer_description
+            elif transaction.is_debt():
                 self.transaction_type = debt_description
             elif transaction.is_transfer():
                 self.transaction_type = transfer_description
@@ -30,6 +32,8 @@ class ExpenseFetcherTransaction:
         self.date_format = date_format
 
     def to_list(self) -> List[str]:
+        # The last column is the transaction id, used by the repositories to
+        # tell a movement they already have from a new one
         return [
             self.transaction.get_capture_date_str(self.date_format),
             self.transaction.get_auth_date_str(self.date_format),
@@ -39,6 +43,7 @@ class ExpenseFetcherTransaction:
             self.transaction.get_category(),
             str(self.absolute_value),
             str(self.transaction.get_value()),
+            self.transaction.get_transaction_id(),
         ]
 
     def __repr__(self):
@@ -2,6 +2,8 @@ from datetime import datetime
 from typing import List
 from dataclasses import dataclass
 
+from src.domain.date_codec import format_date
+
 
 @dataclass
 class Balance:
@@ -12,7 +14,7 @@ class Balance:
 
     def to_list(self, date_format, account) -> List[str]:
         return [
-            self.balance_date.strftime(date_format),
+            format_date(self.balance_date, date_format),
             str(self.updated_date_time),
             account,
             str(self.balance),
@@ -32,11 +32,22 @@ class HistoricTagger(ITagger):
     #    return pair_description_category
 
     def _get_historical_data__init__(self):
+        if hasattr(self.repository, "iter_description_category"):
+            # Repositories that stream (description, category) pairs, e.g. Buxfer,
+            # feed the aggregator directly instead of materializing the history.
+            rows = (
+                (trx_description, "", trx_category)
+                for trx_description, trx_category in self.repository.iter_description_category()
+            )
+        else:
+            rows = self.repository.get_data(
+                data_range=self.SAMPLE_RANGE_NAME, columns_indexes=[0, 2, 3]
+            )
+        self._aggregate(rows)
+
+    def _aggregate(self, rows):
         trx_descp_trx_to_type_category_count = defaultdict(partial(defaultdict, int))
-        tmp_data = self.repository.get_data(
-            data_range=self.SAMPLE_RANGE_NAME, columns_indexes=[0, 2, 3]
-        )
-        for el in tmp_data:
+        for el in rows:
             trx_description = el[0]
             trx_type = el[1]
             trx_category = el[2]
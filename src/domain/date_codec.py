@@ -0,0 +1,52 @@
+"""
+Shared date parsing and formatting.
+
+Transactions cluster on a few hundred distinct dates, so both directions are
+memoized with bounded LRU caches. ISO dates and timestamps skip `strptime`
+and go through `datetime.fromisoformat`, which is several times faster.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict
+
+ISO_DATE = "%Y-%m-%d"
+ISO_DATETIME = "%Y-%m-%dT%H:%M:%S"
+
+CACHE_SIZE = 4096
+
+
+def _is_iso(value: str, date_format: str) -> bool:
+    # fromisoformat also accepts forms strptime would reject (e.g. 20240105), so
+    # the fast path is only taken for values shaped exactly like the format.
+    if date_format == ISO_DATE:
+        return len(value) == 10 and value[4] == value[7] == "-"
+    if date_format == ISO_DATETIME:
+        return len(value) == 19 and value[4] == value[7] == "-" and value[10] == "T"
+    return False
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_date(value: str, date_format: str = ISO_DATE) -> datetime:
+    if _is_iso(value, date_format):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.strptime(value, date_format)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def format_date(value: datetime, date_format: str = ISO_DATE) -> str:
+    if date_format == ISO_DATE:
+        return value.date().isoformat()
+    return value.strftime(date_format)
+
+
+def cache_info() -> Dict[str, object]:
+    return {"parse": parse_date.cache_info(), "format": format_date.cache_info()}
+
+
+def clear_caches() -> None:
+    parse_date.cache_clear()
+    format_date.cache_clear()
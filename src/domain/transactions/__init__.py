@@ -1,4 +1,7 @@
-from src.domain.transactions.i_transaction import ITransaction
+from src.domain.transactions.i_transaction import (
+    ITransaction,
+    number_repeated_transactions,
+)
 from src.domain.transactions.activebank_transaction import ActiveBankTransaction
 from src.domain.transactions.myedenred_transaction import MyEdenredTransaction
 from src.domain.transactions.nordigen_transaction import NordigenTransaction
@@ -1,14 +1,22 @@
 from src.domain.transactions import ITransaction
 import numbers
-from datetime import datetime
+from typing import Optional
+
+from src.domain.date_codec import parse_date
 
 
 class FromListTransaction(ITransaction):
     def __init__(
-        self, date_capture: str, date_auth: str, description: str, amount: float, date_format: str = "%Y/%m/%d"
+        self,
+        date_capture: str,
+        date_auth: str,
+        description: str,
+        amount: float,
+        date_format: str = "%Y/%m/%d",
+        transaction_id: Optional[str] = None,
     ):
-        capture_dt = datetime.strptime(date_capture, date_format)
-        auth_dt = datetime.strptime(date_auth, date_format)
+        capture_dt = parse_date(date_capture, date_format)
+        auth_dt = parse_date(date_auth, date_format)
 
         if not isinstance(amount, numbers.Number):
             raise Exception("Value is not a numeric variable")
@@ -20,6 +28,7 @@ class FromListTransaction(ITransaction):
             is_income=amount >= 0,
             is_transfer=False,
             is_investment=False,
+            transaction_id=transaction_id,
         )
 
     def get_description(self, remove_prefix: bool = False):
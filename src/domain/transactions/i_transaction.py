@@ -1,5 +1,48 @@
+import hashlib
 from abc import ABC, abstractmethod
+from collections import defaultdict
 from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.domain.date_codec import format_date
+
+
+def content_transaction_id(
+    capture_date: Optional[datetime],
+    auth_date: Optional[datetime],
+    description: str,
+    value: float,
+) -> str:
+    """
+    Deterministic id for a movement whose source has none: the same movement
+    pulled again gets the same id.
+    """
+    content = "|".join(
+        [
+            format_date(capture_date) if capture_date else "",
+            format_date(auth_date) if auth_date else "",
+            (description or "").strip(),
+            f"{float(value):.2f}",
+        ]
+    )
+    return hashlib.sha1(content.encode()).hexdigest()[0:20]
+
+
+def number_repeated_transactions(transactions: List["ITransaction"]) -> None:
+    """
+    Identical movements without a source id (two equal purchases on the same
+    day) would share one content id. They are numbered in the order the source
+    returns them, so each keeps its own id and a pull overlapping the same days
+    numbers them the same way.
+    """
+    seen: Dict[str, int] = defaultdict(int)
+    for transaction in transactions:
+        if transaction.transaction_id:
+            continue
+        transaction.occurrence = 1
+        content_id = transaction.get_transaction_id()
+        seen[content_id] += 1
+        transaction.occurrence = seen[content_id]
 
 
 class ITransaction(ABC):
@@ -10,8 +53,9 @@ class ITransaction(ABC):
         value: float,
         description: str,
         is_income: bool,
-        is_transfer: bool,
-        is_investment: bool = False
+        is_transfer: bool = False,
+        is_investment: bool = False,
+        transaction_id: Optional[str] = None,
     ):
         self.auth_date = auth_date
         self.capture_date = capture_date
@@ -21,18 +65,35 @@ class ITransaction(ABC):
         self.is_debt_value = not is_income
         self.is_transfer_value = is_transfer
         self.is_investment_value = is_investment
+        # Id given by the source (bank, statement), if any
+        self.transaction_id = transaction_id
+        # n-th identical movement of the same pull, see number_repeated_transactions
+        self.occurrence = 1
+        # Set by TransferMatcher when the other leg was found in another account
+        self.is_paired_transfer_value = False
         self.type = ""
         self.category = ""
 
     def get_auth_date_str(self, date_format: str = "%Y/%m/%d") -> str:
-        return self.auth_date.strftime(date_format)
+        return format_date(self.auth_date, date_format)
 
     def get_capture_date_str(self, date_format: str = "%Y/%m/%d") -> str:
-        return self.capture_date.strftime(date_format)
+        return format_date(self.capture_date, date_format)
 
     def get_value(self) -> float:
         return self.value
 
+    def get_transaction_id(self) -> str:
+        """The source's id, or a hash of the movement's content when it has none."""
+        if self.transaction_id:
+            return str(self.transaction_id)
+        content_id = content_transaction_id(
+            self.capture_date, self.auth_date, self.description, self.value
+        )
+        if self.occurrence > 1:
+            return f"{content_id}-{self.occurrence}"
+        return content_id
+
     def set_category(self, category: str) -> None:
         self.category = category
 
@@ -46,6 +107,10 @@ class ITransaction(ABC):
             self.is_income_value = False
 
 
+    def set_paired_transfer(self) -> None:
+        self.set_transfer()
+        self.is_paired_transfer_value = True
+
     def get_category(self) -> str:
         return self.category
 
@@ -64,6 +129,9 @@ class ITransaction(ABC):
 
     def is_transfer(self) -> bool:
         return self.is_transfer_value
+
+    def is_paired_transfer(self) -> bool:
+        return self.is_paired_transfer_value
     
     def is_investment(self) -> bool:
         return self.is_investment_value
@@ -1,13 +1,17 @@
 import numbers
 from datetime import datetime
-import dateutil.parser
+from typing import Optional
 
 from src.domain.transactions import ITransaction
 
 
 class MyEdenredTransaction(ITransaction):
     def __init__(
-        self, transaction_date: datetime, transaction_name: str, amount: float
+        self,
+        transaction_date: datetime,
+        transaction_name: str,
+        amount: float,
+        transaction_id: Optional[str] = None,
     ):
         if not isinstance(amount, numbers.Number):
             raise Exception("Value is not a numeric variable")
@@ -17,6 +21,7 @@ class MyEdenredTransaction(ITransaction):
             value=amount,
             description=transaction_name,
             is_income=amount >= 0,
+            transaction_id=transaction_id,
         )
 
     def get_description(self, remove_prefix: bool = False):
@@ -1,5 +1,6 @@
 import numbers
 from datetime import datetime
+from typing import Optional
 
 from src.domain.transactions import ITransaction
 
@@ -11,6 +12,7 @@ class NordigenTransaction(ITransaction):
         value_date: datetime,
         transaction_name: str,
         amount: float,
+        transaction_id: Optional[str] = None,
     ):
         if not isinstance(amount, numbers.Number):
             raise Exception("Value is not a numeric variable")
@@ -21,6 +23,7 @@ class NordigenTransaction(ITransaction):
             description=transaction_name,
             is_income=amount >= 0,
             is_transfer=False,
+            transaction_id=transaction_id,
         )
 
     def get_description(self, remove_prefix: bool = False):
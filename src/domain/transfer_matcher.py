@@ -0,0 +1,119 @@
+"""
+Pairs the two legs of transfers between the user's own accounts: a debit in
+one account and a credit of the same amount in another, at most `window_days`
+apart. Both legs are marked with `set_paired_transfer`, which gives them the
+transfer type; transfers found by the taggers keep their old labelling.
+
+Credits are hashed on (amount in cents, date bucket) with buckets one day wider
+than the window, so a credit close enough to a debit is always in the debit's
+bucket or a neighbouring one: matching a full history is linear in the number
+of transactions instead of comparing every debit with every credit.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.domain.transactions import ITransaction
+
+
+@dataclass
+class TransferPair:
+    debit_account: str
+    debit: ITransaction
+    credit_account: str
+    credit: ITransaction
+
+
+@dataclass
+class _Leg:
+    sequence: int
+    account: str
+    day: int
+    cents: int
+    transaction: ITransaction
+
+
+class TransferMatcher:
+    def __init__(self, window_days: int = 3):
+        if window_days < 0:
+            raise Exception("The transfer window must not be negative")
+        self.window_days = window_days
+
+    def _bucket(self, day: int) -> int:
+        return day // (self.window_days + 1)
+
+    @staticmethod
+    def _legs(
+        transactions_by_account: Iterable[Tuple[str, List[ITransaction]]]
+    ) -> Tuple[List[_Leg], List[_Leg]]:
+        debits, credits = [], []
+        sequence = 0
+        for account, transactions in transactions_by_account:
+            for transaction in transactions:
+                date = transaction.auth_date or transaction.capture_date
+                cents = round(transaction.get_value() * 100)
+                if date is None or cents == 0 or transaction.is_investment():
+                    continue
+                leg = _Leg(sequence, account, date.toordinal(), abs(cents), transaction)
+                sequence += 1
+                (credits if cents > 0 else debits).append(leg)
+        return debits, credits
+
+    def find_pairs(
+        self, transactions_by_account: Iterable[Tuple[str, List[ITransaction]]]
+    ) -> List[TransferPair]:
+        """
+        Pairs one to one, oldest debit first, each with the closest credit (the
+        earliest pulled one on ties) that is not already paired.
+        """
+        debits, credits = self._legs(transactions_by_account)
+        credits_by_key: Dict[Tuple[int, int], List[_Leg]] = defaultdict(list)
+        for credit in credits:
+            credits_by_key[(credit.cents, self._bucket(credit.day))].append(credit)
+
+        paired = set()
+        pairs = []
+        for debit in sorted(debits, key=lambda leg: (leg.day, leg.sequence)):
+            bucket = self._bucket(debit.day)
+            best: Optional[_Leg] = None
+            for key in ((debit.cents, b) for b in (bucket - 1, bucket, bucket + 1)):
+                for credit in credits_by_key.get(key, ()):
+                    distance = abs(credit.day - debit.day)
+                    if (
+                        credit.account == debit.account
+                        or credit.sequence in paired
+                        or distance > self.window_days
+                    ):
+                        continue
+                    if best is None or (distance, credit.sequence) < (
+                        abs(best.day - debit.day),
+                        best.sequence,
+                    ):
+                        best = credit
+            if best is not None:
+                paired.add(best.sequence)
+                pairs.append(
+                    TransferPair(
+                        debit.account, debit.transaction, best.account, best.transaction
+                    )
+                )
+        return pairs
+
+    def match(
+        self, transactions_by_account: Iterable[Tuple[str, List[ITransaction]]]
+    ) -> List[TransferPair]:
+        """Find the pairs and mark both legs as transfers."""
+        pairs = self.find_pairs(transactions_by_account)
+        for pair in pairs:
+            for transaction, counterpart in (
+                (pair.debit, pair.credit_account),
+                (pair.credit, pair.debit_account),
+            ):
+                transaction.set_paired_transfer()
+                # A type from a tagger would win over the transfer description
+                transaction.set_type("")
+                # Like the taggers do, the category names the other account
+                if transaction.get_category() == "":
+                    transaction.set_category(counterpart)
+        return pairs
@@ -1,11 +1,9 @@
 import os
+import threading
 from datetime import datetime
-from random import randint
-from time import sleep
+from time import monotonic, sleep
 from typing import List, Dict, Callable
 
-from openpyxl import load_workbook
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
@@ -20,6 +18,10 @@ from src.infrastructure.bank_account_transactions_fetchers.exceptions import (
 from src.infrastructure.bank_account_transactions_fetchers.i_transactions_fetcher import (
     ITransactionsFetcher,
 )
+from src.infrastructure.bank_account_transactions_fetchers.webdriver_pool import (
+    WebDriverPool,
+    get_default_pool,
+)
 
 LOGINPAGE = "https://ind.activobank.pt/_loginV2/BlueMainLoginCdm.aspx?ReturnUrl=https%3a%2f%2find.activobank.pt%2fpt%2fprivate%2fdia-a-dia%2fPages%2fdia-a-dia.aspx"
 INPUTCODEIDS = [
@@ -27,6 +29,9 @@ INPUTCODEIDS = [
     "BlueMainLoginControlCdm1_txt_2_position",
     "BlueMainLoginControlCdm1_txt_3_position",
 ]
+PARTIAL_DOWNLOAD_SUFFIXES = (".crdownload", ".part", ".tmp")
+DOWNLOAD_TIMEOUT_SECONDS = 60
+DOWNLOAD_POLL_SECONDS = 0.2
 XLSX_PROPS = {
     "MAIN": {
         "start_row": 8,
@@ -73,27 +78,56 @@ class ActiveBankCardCrawler(ITransactionsFetcher):
     def getTransactions(
         self, date_init: datetime = None, date_end: datetime = None
     ) -> List[Dict[str, object]]:
+        # assume the page is the one after login successfully
+        self._clear_download_dir()
+        self._download_transactions_xlsx(date_init, date_end)
+        file_name = self._wait_for_download()
         try:
-            # assume the page is the one after login successfully
-            self._download_transactions_xlsx(date_init, date_end)
-
+            return self._get_trx_from_xlsx(file_name, self.xlsx_props)
+        finally:
+            # Also when parsing fails: the directory is shared by every card and
+            # account of this username
+            os.remove(os.path.join(self.tmp_download_dir, file_name))
+
+    def _clear_download_dir(self) -> None:
+        """Remove what earlier exports left behind, e.g. an interrupted download."""
+        for file_name in os.listdir(self.tmp_download_dir):
+            path = os.path.join(self.tmp_download_dir, file_name)
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def _wait_for_download(
+        self,
+        timeout: float = DOWNLOAD_TIMEOUT_SECONDS,
+        poll_interval: float = DOWNLOAD_POLL_SECONDS,
+    ) -> str:
+        """
+        Block until the browser has finished writing exactly one file into the
+        download directory and return its name.
+        """
+        deadline = monotonic() + timeout
+        while monotonic() < deadline:
             tmp_folder_content = os.listdir(self.tmp_download_dir)
-            transactions = []
-
-            if len(tmp_folder_content) == 1:
-                file_path = tmp_folder_content.pop()
-                transactions = self._get_trx_from_xlsx(file_path, self.xlsx_props)
-            else:
-                raise DownloadTransactionsXlsException("Something went wrong.")
-
-            return transactions
-        except Exception as e:
-            self.driver.quit()
-            raise e
+            in_progress = [
+                f for f in tmp_folder_content if f.endswith(PARTIAL_DOWNLOAD_SUFFIXES)
+            ]
+            finished = [f for f in tmp_folder_content if f not in in_progress]
+            if len(finished) > 1:
+                raise DownloadTransactionsXlsException(
+                    f"Expected one downloaded file, found {finished}"
+                )
+            if finished and not in_progress:
+                return finished[0]
+            sleep(poll_interval)
+        raise DownloadTransactionsXlsException(
+            f"Download did not finish within {timeout} seconds"
+        )
 
     def _get_trx_from_xlsx(
         self, file_path, xls_props: Dict[str, object]
     ) -> List[Dict[str, object]]:
+        from openpyxl import load_workbook
+
         file_path = os.path.join(self.tmp_download_dir, file_path)
         tmp_trx_xlsx = load_workbook(file_path)
         tmp_trx_sheet = tmp_trx_xlsx.worksheets[0]
@@ -117,7 +151,6 @@ class ActiveBankCardCrawler(ITransactionsFetcher):
         ]:
             rows.append(dict(zip(header, [column.value for column in row])))
 
-        os.remove(file_path)
         return rows
 
     def _download_transactions_xlsx(self, date_init: datetime, date_end: datetime):
@@ -131,58 +164,28 @@ class ActiveBankCardCrawler(ITransactionsFetcher):
         ).find_elements_by_xpath(f"//*[contains(text(), '{self.card_number}')]")[0]
         card_element.click()
 
-        self.driver_waiter.until(
-            EC.presence_of_element_located((By.ID, self.search_start_date_element_id))
+        start_date = self.driver_waiter.until(
+            EC.element_to_be_clickable((By.ID, self.search_start_date_element_id))
         )
-        sleep(2)
-
-        start_date = self.driver.find_element_by_id(self.search_start_date_element_id)
         start_date.clear()
         start_date.send_keys(date_init.strftime("%d/%m/%Y"))
-        # date_init_str = date_init.strftime('%d/%m/%Y')
-        # self.driver.execute_script(f"document.getElementById('{self.search_start_date_element_id}').value='{date_init_str}'")
-        sleep(2)
-        end_date = self.driver.find_element_by_id(self.search_end_date_element_id)
+        end_date = self.driver_waiter.until(
+            EC.element_to_be_clickable((By.ID, self.search_end_date_element_id))
+        )
         end_date.clear()
         end_date.send_keys(date_end.strftime("%d/%m/%Y"))
-        # sleep(3)
-        # self.driver.find_element_by_id(self.search_button_element_id).click()
-        clicked_on_search = self._try_action_for_next_seconds(
-            lambda: self.driver.find_element_by_id(
-                self.search_button_element_id
-            ).click(),
-            5,
-        )
-        if not clicked_on_search:
-            raise Exception("Couldn't search transactions")
+        self.driver_waiter.until(
+            EC.element_to_be_clickable((By.ID, self.search_button_element_id))
+        ).click()
         self.driver_waiter.until(
             EC.presence_of_element_located((By.ID, "divShowWaitPanel"))
         )
         self.driver_waiter.until_not(
             EC.presence_of_element_located((By.ID, "divShowWaitPanel"))
         )
-        sleep(10)
-        clicked_on_download = self._try_action_for_next_seconds(
-            lambda: self.driver.find_element_by_id(
-                self.download_excel_button_id
-            ).click(),
-            10,
-        )
-        if not clicked_on_download:
-            raise Exception("Couldn't fetch transactions")
-        sleep(randint(1, 3))
-
-    def _try_action_for_next_seconds(
-        self, action: Callable, seconds, wait_for_seconds=1
-    ):
-
-        for i in range(int(seconds / wait_for_seconds)):
-            try:
-                action()
-                return True
-            except:
-                sleep(wait_for_seconds)
-        return False
+        self.driver_waiter.until(
+            EC.element_to_be_clickable((By.ID, self.download_excel_button_id))
+        ).click()
 
 
 class ActiveBankMainCard(ActiveBankCardCrawler):
@@ -220,12 +223,59 @@ class ActiveBankPreCard(ActiveBankCardCrawler):
 
 
 class ActiveBankCrawler:
+    """
+    Logged-in ActivoBank browser session. Use `shared` so every card configured
+    for the same username reuses one browser and one login.
+
+    The browser comes from a WebDriverPool and is only started (and logged in) the
+    first time a card is requested.
+    """
+
+    _shared: Dict[str, "ActiveBankCrawler"] = dict()
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(
+        cls,
+        username: str,
+        password: str,
+        tmp_download_dir: str,
+        get_password: Callable,
+        headless: bool = True,
+    ) -> "ActiveBankCrawler":
+        with cls._shared_lock:
+            crawler = cls._shared.get(username)
+            if crawler is None:
+                crawler = cls(
+                    username,
+                    password,
+                    tmp_download_dir,
+                    get_password,
+                    headless=headless,
+                )
+                cls._shared[username] = crawler
+            crawler._users += 1
+            return crawler
+
+    def release(self) -> None:
+        """Drop one user of a shared crawler; the last one quits the browser."""
+        with self._shared_lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            if self._shared.get(self.username) is self:
+                del self._shared[self.username]
+        self.driver_pool.release(self.username)
+        self.driver = None
+
     def __init__(
         self,
         username: str,
         password: str,
         tmp_download_dir: str,
         get_password: Callable,
+        headless: bool = True,
+        driver_pool: WebDriverPool = None,
     ):
         self.tmp_download_dir = os.path.join(
             tmp_download_dir, str(datetime.now().strftime("%Y_%m_%d_%H_%M_%S"))
@@ -235,28 +285,33 @@ class ActiveBankCrawler:
         self.trx = None
         self.cards: Dict[str, ActiveBankCardCrawler] = dict()
         self.get_password = get_password
-
-        os.makedirs(self.tmp_download_dir, exist_ok=True)
-
-        prefs = dict()
-        prefs["profile.default_content_settings.popups"] = 0
-        prefs["download.default_directory"] = self.tmp_download_dir
-        prefs["browser.tabs.warnOnClose"] = False
-        opts = webdriver.ChromeOptions()
-        opts.add_experimental_option("prefs", prefs)
-        opts.add_argument("--headless")
-        self.driver = webdriver.Chrome(chrome_options=opts)
-        self.driver_waiter = WebDriverWait(self.driver, timeout=30)
-        try:
-            self.driver.get(LOGINPAGE)
-            self.driver_waiter.until(
-                EC.presence_of_element_located((By.ID, "divBtnShort"))
+        self.headless = headless
+        self.driver_pool = driver_pool or get_default_pool()
+        self.driver = None
+        self.driver_waiter = None
+        self._users = 0
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if self.driver is not None:
+                return
+            os.makedirs(self.tmp_download_dir, exist_ok=True)
+            self.driver = self.driver_pool.get(
+                self.username, self.tmp_download_dir, self.headless
             )
-            self._log_in()
-            self.cards = self.__get_cards()
-        except Exception as e:
-            self.driver.quit()
-            raise e
+            self.driver_waiter = WebDriverWait(self.driver, timeout=30)
+            try:
+                self.driver.get(LOGINPAGE)
+                self.driver_waiter.until(
+                    EC.presence_of_element_located((By.ID, "divBtnShort"))
+                )
+                self._log_in()
+                self.cards = self.__get_cards()
+            except Exception as e:
+                self.driver_pool.release(self.username)
+                self.driver = None
+                raise e
 
     def __get_cards(self) -> Dict[str, Callable]:
         # element get main card ctl00_PlaceHolderMain_DayInfo1__leftMenu1__ddaAccList_rptAccounts_ctl01_lnkTable
@@ -297,6 +352,7 @@ class ActiveBankCrawler:
         return cards_to_fetcher
 
     def get_card(self, card_number: str) -> ITransactionsFetcher:
+        self._ensure_started()
         return self.cards.get(card_number, None)
 
     def _set_username(self):
@@ -351,8 +407,9 @@ class ActiveBankCrawler:
             elemInput.clear()
             elemInput.send_keys(self.password[code_digits[x] - 1])
         self.driver.find_element_by_id("divBtnLogOn").click()
-        sleep(5)
-        self.driver.find_element_by_id("_lnkBtnConfirm").click()
+        self.driver_waiter.until(
+            EC.element_to_be_clickable((By.ID, "_lnkBtnConfirm"))
+        ).click()
 
     def _log_in(self):
 
@@ -0,0 +1,128 @@
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.domain.date_codec import parse_date
+from src.infrastructure.bank_account_transactions_fetchers.i_transactions_fetcher import (
+    ITransactionsFetcher,
+)
+from src.infrastructure.bank_account_transactions_fetchers.statement_source import (
+    StatementFile,
+    open_statement,
+)
+
+CLOSING_BALANCE_CODES = ("CLBD", "CLAV")
+
+
+def _local(tag: str) -> str:
+    # "{urn:iso:std:iso:20022:tech:xsd:camt.053.001.02}Ntry" -> "Ntry"
+    return tag.rsplit("}", 1)[-1]
+
+
+def _find(element: ET.Element, path: str) -> Optional[ET.Element]:
+    """Namespace-agnostic `element.find("A/B")`."""
+    for name in path.split("/"):
+        element = next((child for child in element if _local(child.tag) == name), None)
+        if element is None:
+            return None
+    return element
+
+
+def _text(element: ET.Element, path: str) -> Optional[str]:
+    found = _find(element, path)
+    if found is None or found.text is None:
+        return None
+    return found.text.strip()
+
+
+def _parse_camt_date(element: ET.Element, path: str) -> Optional[datetime]:
+    # <BookgDt><Dt>2024-01-02</Dt></BookgDt> or <DtTm>2024-01-02T10:00:00</DtTm>
+    value = _text(element, f"{path}/Dt") or _text(element, f"{path}/DtTm")
+    if not value:
+        return None
+    return parse_date(value[0:10], "%Y-%m-%d")
+
+
+def _signed_amount(element: ET.Element) -> float:
+    amount = float(_text(element, "Amt") or 0)
+    return -amount if _text(element, "CdtDbtInd") == "DBIT" else amount
+
+
+class Camt053TransactionsFetcher(ITransactionsFetcher):
+    """
+    ISO 20022 CAMT.053 bank-to-customer statements, read with iterparse: each
+    entry (Ntry) is turned into a row and cleared, so memory stays flat. The
+    booking date is the capture date, the value date the auth date and the
+    servicer's reference (AcctSvcrRef, else NtryRef) the transaction id. The
+    closing booked balance is kept in `closing_balance` as (date, amount).
+    """
+
+    def __init__(self):
+        self.closing_balance: Optional[Tuple[datetime, float]] = None
+
+    def getTransactions(
+        self,
+        date_init: datetime = None,
+        date_end: datetime = None,
+        file_path: str = None,
+        file: Optional[StatementFile] = None,
+    ) -> List[Dict[str, object]]:
+        self.closing_balance = None
+        rows = []
+        with open_statement(file_path, file) as stream:
+            for _, element in ET.iterparse(stream, events=("end",)):
+                name = _local(element.tag)
+                if name == "Ntry":
+                    row = self._to_row(element)
+                    element.clear()
+                    if row is None:
+                        continue
+                    if date_init is not None and row["authDate"].date() < date_init.date():
+                        continue
+                    if date_end is not None and row["authDate"].date() > date_end.date():
+                        continue
+                    rows.append(row)
+                elif name == "Bal":
+                    self._set_closing_balance(element)
+                    element.clear()
+        return rows
+
+    def _set_closing_balance(self, balance: ET.Element) -> None:
+        code = _text(balance, "Tp/CdOrPrtry/Cd")
+        if code not in CLOSING_BALANCE_CODES:
+            return
+        date = _parse_camt_date(balance, "Dt")
+        # A booked closing balance wins over an available one
+        if self.closing_balance is None or code == "CLBD":
+            self.closing_balance = (date, _signed_amount(balance))
+
+    @staticmethod
+    def _description(entry: ET.Element) -> str:
+        details = _find(entry, "NtryDtls/TxDtls")
+        if details is not None:
+            for path in (
+                "RmtInf/Ustrd",
+                "AddtlTxInf",
+                "RltdPties/Cdtr/Nm",
+                "RltdPties/Dbtr/Nm",
+            ):
+                value = _text(details, path)
+                if value:
+                    return value
+        return _text(entry, "AddtlNtryInf") or ""
+
+    def _to_row(self, entry: ET.Element) -> Optional[Dict[str, object]]:
+        capture = _parse_camt_date(entry, "BookgDt")
+        auth = _parse_camt_date(entry, "ValDt") or capture
+        if auth is None:
+            return None
+        return {
+            "captureDate": capture or auth,
+            "authDate": auth,
+            "description": self._description(entry),
+            "amount": _signed_amount(entry),
+            "balance": None,
+            "transactionId": _text(entry, "AcctSvcrRef")
+            or _text(entry, "NtryDtls/TxDtls/Refs/AcctSvcrRef")
+            or _text(entry, "NtryRef"),
+        }
@@ -0,0 +1,77 @@
+import csv
+import io
+from datetime import datetime
+from itertools import islice
+from typing import Dict, List, Optional
+
+from src.infrastructure.bank_account_transactions_fetchers.statement_source import (
+    StatementFile,
+    open_statement,
+)
+from src.infrastructure.bank_account_transactions_fetchers.tabular_transactions_fetcher import (
+    TabularTransactionsFetcher,
+)
+
+SNIFF_CHARS = 64 * 1024
+SNIFF_DELIMITERS = ";,\t|"
+
+
+class CsvTransactionsFetcher(TabularTransactionsFetcher):
+    """
+    CSV bank exports, read row by row through a buffered text stream; the
+    whole file is never loaded. `delimiter=None` sniffs it from the start of
+    the file.
+    """
+
+    def __init__(
+        self,
+        header_skip_rows: int,
+        date_format: str,
+        decimal_separator: str,
+        thousands_separator: str,
+        columns: Dict[str, str],
+        footer_skip_rows: int = 0,
+        delimiter: Optional[str] = None,
+        encoding: str = "utf-8-sig",
+    ):
+        super().__init__(
+            header_skip_rows=header_skip_rows,
+            date_format=date_format,
+            decimal_separator=decimal_separator,
+            thousands_separator=thousands_separator,
+            columns=columns,
+            footer_skip_rows=footer_skip_rows,
+        )
+        self.delimiter = delimiter
+        self.encoding = encoding
+
+    def _sniff_delimiter(self, text: io.TextIOBase) -> str:
+        sample = text.read(SNIFF_CHARS)
+        text.seek(0)
+        lines = sample.splitlines()[self.header_skip_rows :]
+        if len(sample) == SNIFF_CHARS:
+            # The last line is likely cut short
+            lines = lines[:-1]
+        try:
+            return csv.Sniffer().sniff("\n".join(lines), SNIFF_DELIMITERS).delimiter
+        except csv.Error:
+            return ","
+
+    def getTransactions(
+        self,
+        date_init: datetime = None,
+        date_end: datetime = None,
+        file_path: str = None,
+        file: Optional[StatementFile] = None,
+    ) -> List[Dict[str, object]]:
+        with open_statement(file_path, file) as stream:
+            text = io.TextIOWrapper(stream, encoding=self.encoding, newline="")
+            try:
+                delimiter = self.delimiter or self._sniff_delimiter(text)
+                reader = csv.reader(text, delimiter=delimiter)
+                rows = islice(reader, self.header_skip_rows, None)
+                headers = [h.strip() for h in next(rows, [])]
+                return self._parse_rows(headers, rows, date_init, date_end)
+            finally:
+                # Leave the caller's stream open
+                text.detach()
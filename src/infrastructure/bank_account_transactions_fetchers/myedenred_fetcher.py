@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 # This code is slightly adapted from https://github.com/ruicovelo/mymoney/blob/master/mymoney/myedenred.py
-from typing import List, Dict, Callable
+from typing import List, Dict, Callable, Optional
 
 import requests
 import json
@@ -9,6 +9,12 @@ from datetime import datetime
 from datetime import date as datetime_date
 import logging
 import urllib.request
+from src.domain.date_codec import ISO_DATETIME, parse_date
+from src.infrastructure import metrics
+from src.infrastructure.cache import Cache
+from src.infrastructure.bank_account_transactions_fetchers.myedenred_movement_store import (
+    MyEdenredMovementStore,
+)
 from src.infrastructure.bank_account_transactions_fetchers.i_transactions_fetcher import (
     ITransactionsFetcher,
 )
@@ -16,14 +22,16 @@ from src.infrastructure.bank_account_transactions_fetchers.exceptions import (
     AuthenticationException,
 )
 
+log = logging.getLogger(__name__)
 
 BASE_URL = "https://www.myedenred.pt/edenred-customer/api/"
 LOGIN_URL = BASE_URL + "authenticate/default?appVersion=1.0&appType=PORTAL&channel=WEB"
 
 
+# No cache-busting timestamp: the movement list is fetched conditionally (ETag)
 GETCARD_TRANSACTIONS_URL = (
     BASE_URL
-    + "protected/card/<card_id>/accountmovement?_=<timestamp>&appVersion=1.0&appType=PORTAL&channel=WEB"
+    + "protected/card/<card_id>/accountmovement?appVersion=1.0&appType=PORTAL&channel=WEB"
 )  # noqa
 GETCARDS_URL = (
     BASE_URL
@@ -43,8 +51,12 @@ class MyEdenred:
         get_password: Callable = None,
         proxy=None,
         debug=False,
+        cache: Optional[Cache] = None,
+        store_dir: Optional[str] = None,
     ):
         self.username = username
+        self.cache = cache
+        self.store_dir = store_dir
         self.password = password
         self.get_password = get_password
         self.debug = debug
@@ -75,7 +87,7 @@ class MyEdenred:
         self.load_session(False)
 
     def load_session(self, file_present=True):
-        self.session = requests.Session()
+        self.session = metrics.count_session_failures(requests.Session(), "myedenred")
 
     def authenticate(self, user, password):
         """ Actual authentication. Needs variables previously loaded """
@@ -120,6 +132,7 @@ class MyEdenred:
 class MyEdenredCard(ITransactionsFetcher):
     def __init__(self, bank, card_info):
         self.bank = bank
+        self.cache: Optional[Cache] = bank.cache
         self.id = card_info["id"]
         self.number = card_info["number"]
         self.owner_name = card_info["ownerName"]
@@ -127,6 +140,12 @@ class MyEdenredCard(ITransactionsFetcher):
         self.full_data = card_info
         self.account_info = None
         self.movement_list = None
+        # With a store only the movements in the requested window are parsed,
+        # each once per process (kept here by movement id)
+        self.store: Optional[MyEdenredMovementStore] = None
+        if bank.store_dir:
+            self.store = MyEdenredMovementStore(bank.store_dir, str(self.id))
+        self._parsed_movements: Dict[str, Dict[str, object]] = dict()
 
     def getTransactions(
         self, date_init: datetime = None, date_end: datetime = None
@@ -138,29 +157,81 @@ class MyEdenredCard(ITransactionsFetcher):
                 lambda trx: date_init_query
                 <= trx["transactionDate"].date()
                 <= date_end_query,
-                self.get_movements(),
+                self.get_movements(date_init),
             )
         )
 
-    def get_movements(self):
-        s = self.bank.session
-        transactions = []
-        ts = str(time.time()).split(".")[0]
+    def _download_movements(self) -> Optional[Dict[str, object]]:
+        """The movement list, or None if it has not changed since the stored ETag."""
+        headers = {"Authorization": self.bank.token}
+        if self.store is not None and self.store.etag:
+            headers["If-None-Match"] = self.store.etag
         r = self.bank.session.get(
-            headers={"Authorization": self.bank.token},
-            url=GETCARD_TRANSACTIONS_URL.replace("<card_id>", str(self.id)).replace(
-                "<timestamp>", ts
-            ),
+            headers=headers,
+            url=GETCARD_TRANSACTIONS_URL.replace("<card_id>", str(self.id)),
         )
+        if r.status_code == 304:
+            log.debug(f"MyEdenred card {self.id}: movements not modified")
+            return None
         response = json.loads(r.text)
-        self.account_info = response["data"]["account"]
-        self.movement_list = response["data"]["movementList"]
-        for movement in self.movement_list:
-            movement["transactionDate"] = datetime.strptime(
-                movement["transactionDate"][0:19], "%Y-%m-%dT%H:%M:%S"
+        data = response["data"]
+        data["etag"] = r.headers.get("ETag")
+        return data
+
+    @staticmethod
+    def _parse_movement(movement: Dict[str, object]) -> Dict[str, object]:
+        movement = dict(movement)
+        movement["transactionDate"] = parse_date(
+            movement["transactionDate"][0:19], ISO_DATETIME
+        )
+        return movement
+
+    def get_movements(self, date_init: datetime = None):
+        """
+        Parsed movements, newest first. With a store, only the ones from
+        `date_init` on: stored dates are ISO strings, so they are compared
+        before parsing.
+        """
+        if self.cache is None:
+            data = self._download_movements()
+        else:
+            # The whole movement list is cached; date filtering happens afterwards
+            data = self.cache.get_or_fetch(
+                f"{self.id}:movements", self._download_movements
             )
-            transactions.append(movement)
-        return transactions
+        if self.store is None:
+            self.account_info = data["account"]
+            self.movement_list = data["movementList"]
+            return [self._parse_movement(movement) for movement in self.movement_list]
+
+        new_movements = []
+        if data is not None:
+            new_movements = self.store.add(data["movementList"])
+            self.store.account = data["account"]
+            self.store.etag = data.get("etag") or self.store.etag
+            if self.store.prune(data["movementList"]):
+                self._parsed_movements = dict()
+            self.store.save()
+        log.info(f"MyEdenred card {self.id}: {len(new_movements)} new movements")
+        self.account_info = self.store.account
+        self.movement_list = self.store.movements
+        movements = self.store.movements
+        if date_init is not None:
+            day = date_init.strftime("%Y-%m-%d")
+            movements = [
+                movement
+                for movement in movements
+                if str(movement["transactionDate"])[0:10] >= day
+            ]
+        parsed_movements = dict()
+        for movement in movements:
+            movement_id = self.store.movement_id(movement)
+            parsed = self._parsed_movements.get(movement_id)
+            if parsed is None:
+                parsed = self._parse_movement(movement)
+            parsed_movements[movement_id] = parsed
+        self._parsed_movements.update(parsed_movements)
+        return list(parsed_movements.values())
 
     def __repr__(self):
         return f"id: {self.id}; number: {self.number}"
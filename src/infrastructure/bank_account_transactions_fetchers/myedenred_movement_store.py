@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+MYEDENRED_STORE_DIR = os.environ.get("MYEDENRED_STORE_DIR") or ".cache/myedenred"
+
+
+class MyEdenredMovementStore:
+    """
+    Local copy of the movements already downloaded for one card, kept in
+    `<directory>/<card_id>.json` together with the newest transactionDate and
+    the ETag of the last response.
+
+    Movements are stored raw (dates as returned by the API), newest first, and
+    only as far back as the API still returns them (see `prune`).
+    """
+
+    def __init__(self, directory: str, card_id: str):
+        self.path = os.path.join(directory, f"{card_id}.json")
+        self.movements: List[Dict[str, object]] = list()
+        self.newest_transaction_date: Optional[str] = None
+        self.etag: Optional[str] = None
+        self.account: Optional[Dict[str, object]] = None
+        self._ids = set()
+        self._load()
+
+    @staticmethod
+    def movement_id(movement: Dict[str, object]) -> str:
+        for key in ("transactionId", "movementId", "id"):
+            if movement.get(key) is not None:
+                return str(movement[key])
+        # No id in the payload: fall back to the fields that identify a movement
+        content = [
+            movement.get("transactionDate"),
+            movement.get("transactionName"),
+            movement.get("amount"),
+            movement.get("balance"),
+        ]
+        return hashlib.sha1(json.dumps(content, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def _date(movement: Dict[str, object]) -> str:
+        return str(movement["transactionDate"])[0:19]
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                payload = json.load(f)
+        except ValueError as e:
+            log.warning(f"Ignoring unreadable MyEdenred store {self.path}: {e}")
+            return
+        self.movements = payload.get("movements", [])
+        self.newest_transaction_date = payload.get("newest_transaction_date")
+        self.etag = payload.get("etag")
+        self.account = payload.get("account")
+        self._ids = {self.movement_id(movement) for movement in self.movements}
+
+    def add(self, movements: List[Dict[str, object]]) -> List[Dict[str, object]]:
+        """
+        Store the movements not seen before and return them. `movements` is the
+        API list, newest first: scanning stops at the first already-stored
+        movement older than the newest stored date. Seen movements on that date
+        are skipped rather than stopping, as same-day order is not guaranteed.
+        """
+        new_movements = []
+        for movement in movements:
+            movement_id = self.movement_id(movement)
+            if movement_id in self._ids:
+                if (
+                    self.newest_transaction_date is not None
+                    and self._date(movement)[0:10] < self.newest_transaction_date[0:10]
+                ):
+                    break
+                continue
+            self._ids.add(movement_id)
+            new_movements.append(movement)
+        if new_movements:
+            self.movements[:0] = new_movements
+            newest = max(self._date(movement) for movement in new_movements)
+            if newest > (self.newest_transaction_date or ""):
+                self.newest_transaction_date = newest
+        return new_movements
+
+    def prune(self, movements: List[Dict[str, object]]) -> int:
+        """
+        Drop the stored movements from before the oldest day of `movements`, the
+        API's current list: they are never returned again, so they are not needed
+        to recognise seen movements. Returns how many were dropped.
+        """
+        if not movements:
+            return 0
+        oldest_day = min(self._date(movement)[0:10] for movement in movements)
+        kept = [
+            movement
+            for movement in self.movements
+            if self._date(movement)[0:10] >= oldest_day
+        ]
+        dropped = len(self.movements) - len(kept)
+        if dropped:
+            self.movements = kept
+            self._ids = {self.movement_id(movement) for movement in kept}
+        return dropped
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        payload = {
+            "newest_transaction_date": self.newest_transaction_date,
+            "etag": self.etag,
+            "account": self.account,
+            "movements": self.movements,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(payload, f, default=str)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -1,8 +1,8 @@
 import requests
 import json
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 from datetime import date as datetime_date
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, TYPE_CHECKING
 import logging
 from pathlib import Path
 from enum import Enum
@@ -14,9 +14,15 @@ from src.infrastructure.bank_account_transactions_fetchers.i_transactions_fetche
 from src.infrastructure.bank_account_transactions_fetchers.exceptions import (
     NordigenAuthExpiredException,
 )
-from src.infrastructure.bank_account_transactions_fetchers.nordigen_token_provider import (
-    NordigenTokenProvider,
-)
+from src.domain.date_codec import parse_date
+from src.infrastructure import metrics
+from src.infrastructure.cache import Cache, DiskBackend
+from src.infrastructure.tracing import span
+
+if TYPE_CHECKING:
+    from src.infrastructure.bank_account_transactions_fetchers.nordigen_token_provider import (
+        NordigenTokenProvider,
+    )
 
 log = logging.getLogger(__name__)
 
@@ -41,59 +47,49 @@ class NordigenFetcher(ITransactionsFetcher):
         secret_id: str,
         secret_key: str,
         account: str,
-        token_provider: Optional[NordigenTokenProvider] = None,
+        token_provider: Optional["NordigenTokenProvider"] = None,
         cache_dir: Optional[str] = None,
         cache_policy: str = CachePolicy.NETWORK_ONLY.value,
         cache_ttl_hours: int = 3,
+        cache: Optional[Cache] = None,
     ):
         self.secret_id = secret_id
         self.secret_key = secret_key
         self.account = account
         self.download_data_url = DOWNLOAD_DATA_TEMPLATE.format(account)
         self.balance_data_url = BALANCE_DATA_TEMPLATE.format(account)
-        self.token_provider = token_provider or NordigenTokenProvider()
-        self.cache_dir = Path(cache_dir or INFRA_CACHE_DIR)
+        if token_provider is None:
+            from src.infrastructure.bank_account_transactions_fetchers.nordigen_token_provider import (
+                NordigenTokenProvider,
+            )
+
+            token_provider = NordigenTokenProvider()
+        self.token_provider = token_provider
         self.cache_policy = CachePolicy(cache_policy)
-        self.cache_ttl = timedelta(hours=cache_ttl_hours)
+        if cache is None:
+            # Without a configured shared cache, responses go to a per-fetcher
+            # directory as before; `network_only` still writes it.
+            cache = Cache(
+                "nordigen",
+                DiskBackend(str(Path(cache_dir or INFRA_CACHE_DIR))),
+                ttl_seconds=cache_ttl_hours * 3600,
+            )
+        self.cache = cache
 
     def _parse_transaction(self, trx):
-        trx["bookingDate"] = datetime.strptime(trx["bookingDate"], "%Y-%m-%d")
-        trx["valueDate"] = datetime.strptime(trx["valueDate"], "%Y-%m-%d")
+        trx["bookingDate"] = parse_date(trx["bookingDate"])
+        trx["valueDate"] = parse_date(trx["valueDate"])
         trx["transactionAmount"] = float(trx["transactionAmount"]["amount"])
         return trx
 
-    def _cache_path(self, resource_name: str) -> Path:
-        return self.cache_dir / "{}_{}.json".format(self.account, resource_name)
-
-    def _read_cache_if_fresh(self, resource_name: str) -> Optional[Dict[str, object]]:
-        cache_path = self._cache_path(resource_name)
-        log.info(f"Reading from {cache_path}")
-        if not cache_path.exists():
-            log.info("Resources does not exists!")
-            return None
-
-        payload = json.loads(cache_path.read_text())
-        fetched_at = datetime.fromisoformat(payload["fetched_at"])
-        if datetime.now(timezone.utc) - fetched_at > self.cache_ttl:
-            log.info(f"Resource exists, but TTL has expired [ttl: {self.cache_ttl}; fetched_at: {fetched_at}; now: {datetime.now(timezone.utc)}]")
-            return None
-
-        return payload["data"]
-
-    def _write_cache(self, resource_name: str, data: Dict[str, object]) -> None:
-        log.info(f"writing to cache for account {self.account}: {resource_name}")
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
-        payload = {
-            "fetched_at": datetime.now(timezone.utc).isoformat(),
-            "data": data,
-        }
-        log.info(f"wirtting cache into {self._cache_path(resource_name)}")
-        self._cache_path(resource_name).write_text(json.dumps(payload))
+    def _cache_key(self, resource_name: str) -> str:
+        return f"{self.account}:{resource_name}"
 
     def _get_json(self, url: str, resource_name: str) -> Dict[str, object]:
         log.info(f"Fetching transactions for {self.account} with cache policy {self.cache_policy}")
         if self.cache_policy == CachePolicy.USE_IF_FRESH:
-            cached = self._read_cache_if_fresh(resource_name)
+            with span("nordigen.cache_read", resource=resource_name):
+                cached = self.cache.get(self._cache_key(resource_name))
             if cached is not None:
                 log.info(
                     "Using cached Nordigen %s response for account %s",
@@ -101,20 +97,26 @@ class NordigenFetcher(ITransactionsFetcher):
                     self.account,
                 )
                 return cached
-            else:
-                log.info(f"reading from resource {resource_name} returned None")
 
+        with span("nordigen.token"):
+            token = self.token_provider.get_valid_token(self.secret_id, self.secret_key)
         headers = {
             "accept": "application/json",
-            "Authorization": "Bearer {}".format(
-                self.token_provider.get_valid_token(self.secret_id, self.secret_key)
-            ),
+            "Authorization": "Bearer {}".format(token),
         }
-        response = requests.get(url, headers=headers)
+        with span("nordigen.http", resource=resource_name):
+            try:
+                response = requests.get(url, headers=headers)
+            except requests.RequestException as e:
+                metrics.count_http_failure("nordigen", error=e)
+                raise
+        metrics.count_http_failure("nordigen", response=response)
         payload = json.loads(response.text)
 
         self._check_auth_error(payload)
-        self._write_cache(resource_name, payload)
+        # Error payloads (e.g. institution unavailable) must not be served later
+        if response.status_code == 200:
+            self.cache.set(self._cache_key(resource_name), payload)
         return payload
 
     def getTransactions(
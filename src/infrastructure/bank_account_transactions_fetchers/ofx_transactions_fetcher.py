@@ -0,0 +1,137 @@
+import html
+import io
+import re
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.domain.date_codec import parse_date
+from src.infrastructure.bank_account_transactions_fetchers.i_transactions_fetcher import (
+    ITransactionsFetcher,
+)
+from src.infrastructure.bank_account_transactions_fetchers.statement_source import (
+    StatementFile,
+    open_statement,
+)
+
+CHUNK_CHARS = 64 * 1024
+TAG = re.compile(r"<(/?)([^>\s/]+)\s*/?>([^<]*)")
+
+
+def _tags(text: io.TextIOBase) -> Iterator[Tuple[bool, str, str]]:
+    """
+    (closing, TAG, text) for every tag, read in chunks. Works for both OFX 1.x
+    (SGML, leaf elements are not closed) and OFX 2.x (XML).
+    """
+    pending = ""
+    while True:
+        chunk = text.read(CHUNK_CHARS)
+        buffer = pending + chunk
+        if not chunk:
+            end = len(buffer)
+        else:
+            # The text of the last tag may go on in the next chunk
+            end = buffer.rfind("<")
+            if end <= 0:
+                pending = buffer
+                continue
+        for match in TAG.finditer(buffer, 0, end):
+            value = match.group(3).strip()
+            if "&" in value:
+                value = html.unescape(value)
+            yield match.group(1) == "/", match.group(2).upper(), value
+        if not chunk:
+            return
+        pending = buffer[end:]
+
+
+def _parse_ofx_date(value: Optional[str]) -> Optional[datetime]:
+    # YYYYMMDD[HHMMSS[.XXX]][[-5:EST]]: only the day is kept, as for the other statements
+    if not value or len(value) < 8:
+        return None
+    return parse_date(value[0:8], "%Y%m%d")
+
+
+def _parse_ofx_amount(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    return float(value.replace(",", "."))
+
+
+class OfxTransactionsFetcher(ITransactionsFetcher):
+    """
+    OFX/QFX statements, tokenized chunk by chunk. Each STMTTRN becomes a row:
+    DTPOSTED is the capture date, DTUSER (or DTPOSTED) the auth date, NAME (or
+    MEMO) the description and FITID the transaction id. The statement's
+    LEDGERBAL is kept in `closing_balance` as (date, amount) since transactions
+    carry no balance.
+    """
+
+    def __init__(self, encoding: str = "utf-8"):
+        self.encoding = encoding
+        self.closing_balance: Optional[Tuple[datetime, float]] = None
+
+    def getTransactions(
+        self,
+        date_init: datetime = None,
+        date_end: datetime = None,
+        file_path: str = None,
+        file: Optional[StatementFile] = None,
+    ) -> List[Dict[str, object]]:
+        self.closing_balance = None
+        rows = []
+        with open_statement(file_path, file) as stream:
+            text = io.TextIOWrapper(stream, encoding=self.encoding, errors="replace")
+            try:
+                transaction = None
+                ledger_balance = None
+                for closing, tag, value in _tags(text):
+                    if tag == "STMTTRN":
+                        if not closing:
+                            transaction = dict()
+                        elif transaction is not None:
+                            row = self._to_row(transaction)
+                            if row is not None and self._in_range(row, date_init, date_end):
+                                rows.append(row)
+                            transaction = None
+                    elif tag == "LEDGERBAL":
+                        ledger_balance = None if closing else dict()
+                    elif not closing and value:
+                        if transaction is not None:
+                            transaction[tag] = value
+                        elif ledger_balance is not None:
+                            ledger_balance[tag] = value
+                            self._set_closing_balance(ledger_balance)
+            finally:
+                # Leave the caller's stream open
+                text.detach()
+        return rows
+
+    def _set_closing_balance(self, ledger_balance: Dict[str, str]) -> None:
+        if "BALAMT" in ledger_balance and "DTASOF" in ledger_balance:
+            self.closing_balance = (
+                _parse_ofx_date(ledger_balance["DTASOF"]),
+                _parse_ofx_amount(ledger_balance["BALAMT"]),
+            )
+
+    @staticmethod
+    def _to_row(transaction: Dict[str, str]) -> Optional[Dict[str, object]]:
+        capture = _parse_ofx_date(transaction.get("DTPOSTED"))
+        auth = _parse_ofx_date(transaction.get("DTUSER")) or capture
+        if auth is None:
+            return None
+        return {
+            "captureDate": capture or auth,
+            "authDate": auth,
+            "description": transaction.get("NAME") or transaction.get("MEMO") or "",
+            "amount": _parse_ofx_amount(transaction.get("TRNAMT")),
+            "balance": None,
+            "transactionId": transaction.get("FITID"),
+        }
+
+    @staticmethod
+    def _in_range(row, date_init: Optional[datetime], date_end: Optional[datetime]) -> bool:
+        if date_init is not None and row["authDate"].date() < date_init.date():
+            return False
+        if date_end is not None and row["authDate"].date() > date_end.date():
+            return False
+        return True
@@ -0,0 +1,145 @@
+"""
+Back-fill of a manual account from many statement files at once.
+
+`resolve_statement_paths` expands a directory or glob into statement files;
+`parse_statements` parses them in a process pool (openpyxl and the CSV/OFX/CAMT
+importers are CPU bound) and merges the rows oldest first. Statements whose
+periods overlap repeat the same movements: rows are keyed by a hash of their
+content and each key is kept as many times as the file that has it most often,
+so overlaps are dropped but identical movements within a statement are kept.
+"""
+
+import glob
+import hashlib
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.infrastructure.bank_account_transactions_fetchers.i_transactions_fetcher import (
+    ITransactionsFetcher,
+)
+
+log = logging.getLogger(__name__)
+
+STATEMENT_EXTENSIONS = (".xlsx", ".csv", ".ofx", ".qfx", ".xml")
+GLOB_CHARACTERS = "*?["
+
+
+def is_statement_collection(path: str) -> bool:
+    """True for a directory or a glob, i.e. a back-fill rather than one file."""
+    return os.path.isdir(path) or any(c in path for c in GLOB_CHARACTERS)
+
+
+def resolve_statement_paths(path: str) -> List[str]:
+    if os.path.isdir(path):
+        paths = [
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if name.lower().endswith(STATEMENT_EXTENSIONS)
+        ]
+    elif any(c in path for c in GLOB_CHARACTERS):
+        paths = glob.glob(os.path.expanduser(path), recursive=True)
+    else:
+        paths = [path]
+    paths = sorted(p for p in paths if os.path.isfile(p))
+    if not paths:
+        raise Exception(f"No statement files found in `{path}`")
+    return paths
+
+
+def row_key(row: Dict[str, object]) -> str:
+    # Not the balance: OFX and CAMT rows have none, so a movement would not
+    # match itself across formats
+    content = "|".join(
+        str(value)
+        for value in (
+            row["captureDate"],
+            row["authDate"],
+            row["description"],
+            round(row["amount"], 2),
+        )
+    )
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+@dataclass
+class BackfillResult:
+    rows: List[Dict[str, object]] = field(default_factory=list)
+    files: int = 0
+    duplicates: int = 0
+    # (date, amount) of the most recent statement that has a closing balance
+    closing_balance: Optional[Tuple[datetime, float]] = None
+
+
+def _parse_statement(
+    fetcher: ITransactionsFetcher,
+    path: str,
+    date_init: Optional[datetime],
+    date_end: Optional[datetime],
+):
+    """Runs in a worker process: rows and closing balance of one file."""
+    rows = fetcher.getTransactions(
+        date_init=date_init, date_end=date_end, file_path=path
+    )
+    return rows, getattr(fetcher, "closing_balance", None)
+
+
+def parse_statements(
+    fetcher: ITransactionsFetcher,
+    paths: List[str],
+    date_init: Optional[datetime] = None,
+    date_end: Optional[datetime] = None,
+    max_workers: Optional[int] = None,
+) -> BackfillResult:
+    """
+    Parse `paths` with copies of `fetcher` (it is pickled to the workers) and
+    merge the rows. `max_workers=1`, or a single file, parses in-process.
+    """
+    workers = max_workers or min(len(paths), os.cpu_count() or 1)
+    if workers <= 1 or len(paths) <= 1:
+        parsed = [
+            _parse_statement(fetcher, path, date_init, date_end) for path in paths
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = list(
+                executor.map(
+                    _parse_statement,
+                    [fetcher] * len(paths),
+                    paths,
+                    [date_init] * len(paths),
+                    [date_end] * len(paths),
+                )
+            )
+
+    result = BackfillResult(files=len(paths))
+    kept: Counter = Counter()
+    for rows, closing_balance in parsed:
+        seen_in_file: Counter = Counter()
+        for row in rows:
+            key = row_key(row)
+            seen_in_file[key] += 1
+            if seen_in_file[key] > kept[key]:
+                kept[key] += 1
+                result.rows.append(row)
+            else:
+                result.duplicates += 1
+        if closing_balance is None or closing_balance[0] is None:
+            continue
+        latest = result.closing_balance
+        if latest is None or closing_balance[0] >= latest[0]:
+            result.closing_balance = closing_balance
+
+    # Stable: movements of the same day keep their statement order
+    result.rows.sort(
+        key=lambda row: (row["authDate"], row["captureDate"] or row["authDate"])
+    )
+    log.info(
+        f"Parsed {len(result.rows)} transactions from {result.files} statements, "
+        f"dropped {result.duplicates} repeated by overlapping statements"
+    )
+    return result
@@ -0,0 +1,50 @@
+import io
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Union
+
+StatementFile = Union[bytes, bytearray, BinaryIO]
+
+XLSX = "xlsx"
+CSV = "csv"
+OFX = "ofx"
+CAMT053 = "camt053"
+FORMATS = (XLSX, CSV, OFX, CAMT053)
+
+SNIFF_BYTES = 4096
+
+
+@contextmanager
+def open_statement(
+    file_path: Optional[str] = None, file: Optional[StatementFile] = None
+) -> Iterator[BinaryIO]:
+    """
+    A seekable binary stream over a statement given as a path, bytes or a
+    binary file-like object. Only streams opened here are closed on exit.
+    """
+    if file is None and not file_path:
+        raise Exception("file_path or file must be provided to read a statement")
+    if isinstance(file, (bytes, bytearray)):
+        yield io.BytesIO(file)
+    elif file is not None:
+        if not file.seekable():
+            file = io.BytesIO(file.read())
+        yield file
+    else:
+        with open(file_path, "rb") as stream:
+            yield stream
+
+
+def detect_statement_format(stream: BinaryIO) -> str:
+    """Sniff the first bytes of `stream` and rewind it."""
+    position = stream.tell()
+    head = stream.read(SNIFF_BYTES)
+    stream.seek(position)
+
+    if head.startswith(b"PK\x03\x04"):
+        return XLSX
+    lowered = head.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if lowered.startswith(b"ofxheader") or b"<ofx>" in lowered:
+        return OFX
+    if b"camt.053" in lowered or b"<bktocstmrstmt" in lowered:
+        return CAMT053
+    return CSV
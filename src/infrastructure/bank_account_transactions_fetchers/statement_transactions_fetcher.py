@@ -0,0 +1,128 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.infrastructure.bank_account_transactions_fetchers.i_transactions_fetcher import (
+    ITransactionsFetcher,
+)
+from src.infrastructure.bank_account_transactions_fetchers.statement_source import (
+    CAMT053,
+    CSV,
+    FORMATS,
+    OFX,
+    XLSX,
+    StatementFile,
+    detect_statement_format,
+    open_statement,
+)
+
+AUTO = "auto"
+
+
+class StatementTransactionsFetcher(ITransactionsFetcher):
+    """
+    Reads a bank statement file with the importer for its format: XLSX, CSV,
+    OFX/QFX or CAMT.053. With `statement_format="auto"` the format is sniffed
+    from each file, so one account can be fed any of them.
+
+    The tabular options (skips, separators, columns, sheet_name) only apply to
+    XLSX and CSV; `delimiter` and `encoding` to CSV and OFX.
+    """
+
+    def __init__(
+        self,
+        header_skip_rows: int,
+        date_format: str,
+        decimal_separator: str,
+        thousands_separator: str,
+        columns: Dict[str, str],
+        sheet_name: Optional[str] = None,
+        footer_skip_rows: int = 0,
+        statement_format: str = AUTO,
+        delimiter: Optional[str] = None,
+        encoding: Optional[str] = None,
+    ):
+        statement_format = (statement_format or AUTO).lower()
+        if statement_format not in FORMATS + (AUTO,):
+            raise Exception(
+                f"Unknown statement format `{statement_format}`, "
+                f"expected one of {', '.join(FORMATS + (AUTO,))}"
+            )
+        self.statement_format = statement_format
+        self.header_skip_rows = header_skip_rows
+        self.date_format = date_format
+        self.decimal_separator = decimal_separator
+        self.thousands_separator = thousands_separator
+        self.columns = columns
+        self.sheet_name = sheet_name
+        self.footer_skip_rows = footer_skip_rows
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self._fetchers: Dict[str, ITransactionsFetcher] = dict()
+        self._last_fetcher: Optional[ITransactionsFetcher] = None
+
+    def _tabular_options(self) -> Dict[str, object]:
+        return dict(
+            header_skip_rows=self.header_skip_rows,
+            date_format=self.date_format,
+            decimal_separator=self.decimal_separator,
+            thousands_separator=self.thousands_separator,
+            columns=self.columns,
+            footer_skip_rows=self.footer_skip_rows,
+        )
+
+    def _build(self, statement_format: str) -> ITransactionsFetcher:
+        # Importers are imported on first use, like the account managers
+        if statement_format == XLSX:
+            from src.infrastructure.bank_account_transactions_fetchers.xlsx_transactions_fetcher import (
+                XlsxTransactionsFetcher,
+            )
+
+            return XlsxTransactionsFetcher(sheet_name=self.sheet_name, **self._tabular_options())
+        if statement_format == CSV:
+            from src.infrastructure.bank_account_transactions_fetchers.csv_transactions_fetcher import (
+                CsvTransactionsFetcher,
+            )
+
+            return CsvTransactionsFetcher(
+                delimiter=self.delimiter,
+                encoding=self.encoding or "utf-8-sig",
+                **self._tabular_options(),
+            )
+        if statement_format == OFX:
+            from src.infrastructure.bank_account_transactions_fetchers.ofx_transactions_fetcher import (
+                OfxTransactionsFetcher,
+            )
+
+            return OfxTransactionsFetcher(encoding=self.encoding or "utf-8")
+        from src.infrastructure.bank_account_transactions_fetchers.camt053_transactions_fetcher import (
+            Camt053TransactionsFetcher,
+        )
+
+        return Camt053TransactionsFetcher()
+
+    def fetcher_for(self, statement_format: str) -> ITransactionsFetcher:
+        if statement_format not in self._fetchers:
+            self._fetchers[statement_format] = self._build(statement_format)
+        return self._fetchers[statement_format]
+
+    @property
+    def closing_balance(self) -> Optional[Tuple[datetime, float]]:
+        """Statement closing balance of the last file read, when its format has one."""
+        return getattr(self._last_fetcher, "closing_balance", None)
+
+    def getTransactions(
+        self,
+        date_init: datetime = None,
+        date_end: datetime = None,
+        file_path: str = None,
+        file: Optional[StatementFile] = None,
+    ) -> List[Dict[str, object]]:
+        with open_statement(file_path, file) as stream:
+            statement_format = self.statement_format
+            if statement_format == AUTO:
+                statement_format = detect_statement_format(stream)
+            fetcher = self.fetcher_for(statement_format)
+            self._last_fetcher = fetcher
+            return fetcher.getTransactions(
+                date_init=date_init, date_end=date_end, file=stream
+            )
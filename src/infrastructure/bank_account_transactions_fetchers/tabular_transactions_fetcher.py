@@ -0,0 +1,151 @@
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from src.domain.date_codec import parse_date
+from src.infrastructure.bank_account_transactions_fetchers.i_transactions_fetcher import (
+    ITransactionsFetcher,
+)
+
+
+class TabularTransactionsFetcher(ITransactionsFetcher):
+    """
+    Shared parsing for statements laid out as a table (XLSX, CSV): banner rows,
+    a header row, one row per movement and optional footer rows.
+
+    `columns` maps capture_date, auth_date (optional), description, balance
+    (optional) and either debit and credit or a single signed amount to the
+    statement's header names. Rows come out as the dicts XlsxManualAccountManager
+    consumes: captureDate, authDate, description, amount and balance.
+    """
+
+    def __init__(
+        self,
+        header_skip_rows: int,
+        date_format: str,
+        decimal_separator: str,
+        thousands_separator: str,
+        columns: Dict[str, str],
+        footer_skip_rows: int = 0,
+    ):
+        self.header_skip_rows = header_skip_rows
+        self.date_format = date_format
+        self.decimal_separator = decimal_separator
+        self.thousands_separator = thousands_separator
+        self.columns = columns
+        self.footer_skip_rows = footer_skip_rows
+
+    def _parse_date(self, value) -> Optional[datetime]:
+        try:
+            if value is None or value == "":
+                return None
+            if isinstance(value, datetime):
+                return value
+            # treat as string
+            return parse_date(str(value).strip(), self.date_format)
+        except Exception:
+            # Non-date footer or malformed cell
+            return None
+
+    def _parse_amount(self, value: Optional[str]) -> float:
+        if value is None or value == "":
+            return 0.0
+        s = str(value).strip()
+        if self.thousands_separator:
+            s = s.replace(self.thousands_separator, "")
+        if self.decimal_separator and self.decimal_separator != ".":
+            s = s.replace(self.decimal_separator, ".")
+        return float(s)
+
+    def _without_footer(self, rows: Iterable[Sequence]) -> Iterator[Sequence]:
+        """
+        Streamed rows without the footer. The size of the statement is not
+        known up front, so the last `footer_skip_rows` rows are held back; like
+        before, they are kept when there are no more data rows than that.
+        """
+        if not self.footer_skip_rows:
+            yield from rows
+            return
+        held = deque()
+        skipped = False
+        for row in rows:
+            held.append(row)
+            if len(held) > self.footer_skip_rows:
+                skipped = True
+                yield held.popleft()
+        if not skipped:
+            yield from held
+
+    def _parse_rows(
+        self,
+        headers: Sequence,
+        rows: Iterable[Sequence],
+        date_init: Optional[datetime],
+        date_end: Optional[datetime],
+    ) -> List[Dict[str, object]]:
+        """`rows` are the data rows after the header, footer included."""
+        col_idx = {h: i for i, h in enumerate(headers)}
+
+        def idx(name: str) -> int:
+            if name not in col_idx:
+                raise Exception(f"Column '{name}' not found in statement headers")
+            return col_idx[name]
+
+        capture_idx = idx(self.columns["capture_date"])
+        auth_idx = idx(self.columns.get("auth_date", self.columns["capture_date"]))
+        description_idx = idx(self.columns["description"])
+        if "amount" in self.columns:
+            amount_idx = idx(self.columns["amount"])
+        else:
+            debit_idx = idx(self.columns["debit"])
+            credit_idx = idx(self.columns["credit"])
+        balance_idx = None
+        if "balance" in self.columns:
+            balance_idx = col_idx.get(self.columns["balance"])
+
+        parsed = []
+        for row in self._without_footer(rows):
+            # Trailing empty cells may be missing
+            if len(row) < len(headers):
+                row = tuple(row) + (None,) * (len(headers) - len(row))
+            capture = self._parse_date(row[capture_idx])
+            auth = self._parse_date(row[auth_idx])
+            if auth is None:
+                auth = capture
+
+            # Skip rows without any valid date (likely footers or banners)
+            if capture is None and auth is None:
+                continue
+
+            # Date range filter
+            if date_init is not None and auth.date() < date_init.date():
+                continue
+            if date_end is not None and auth.date() > date_end.date():
+                continue
+
+            description_cell = row[description_idx]
+            description = str(description_cell).strip() if description_cell is not None else ""
+            if "amount" in self.columns:
+                amount = self._parse_amount(row[amount_idx])
+            else:
+                amount = self._parse_amount(row[credit_idx]) - self._parse_amount(
+                    row[debit_idx]
+                )
+            balance = None
+            if balance_idx is not None:
+                try:
+                    balance = self._parse_amount(row[balance_idx])
+                except Exception:
+                    balance = None
+
+            parsed.append(
+                {
+                    "captureDate": capture,
+                    "authDate": auth,
+                    "description": description,
+                    "amount": amount,
+                    "balance": balance,
+                }
+            )
+
+        return parsed
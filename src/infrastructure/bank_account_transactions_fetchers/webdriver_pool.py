@@ -0,0 +1,88 @@
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+log = logging.getLogger(__name__)
+
+
+def start_chrome(download_dir: str, headless: bool = True):
+    # Selenium is imported here so that configuring a crawler-based account does
+    # not pay for it until a browser is really needed.
+    from selenium import webdriver
+
+    prefs = dict()
+    prefs["profile.default_content_settings.popups"] = 0
+    prefs["download.default_directory"] = download_dir
+    prefs["browser.tabs.warnOnClose"] = False
+    opts = webdriver.ChromeOptions()
+    opts.add_experimental_option("prefs", prefs)
+    if headless:
+        opts.add_argument("--headless")
+    return webdriver.Chrome(chrome_options=opts)
+
+
+class WebDriverPool:
+    """
+    Lazily started Selenium drivers, one per key (e.g. a bank username).
+
+    A driver is only started the first time `get` is called for its key, and the
+    same driver is handed to every caller using that key until it is released or
+    the pool is shut down.
+    """
+
+    def __init__(self, driver_factory: Callable = start_chrome):
+        self.driver_factory = driver_factory
+        self._drivers: Dict[str, object] = dict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, download_dir: str, headless: bool = True):
+        with self._lock:
+            driver = self._drivers.get(key)
+            if driver is None:
+                log.info(f"Starting WebDriver for {key} (headless={headless})")
+                driver = self.driver_factory(download_dir, headless)
+                self._drivers[key] = driver
+            return driver
+
+    def is_started(self, key: str) -> bool:
+        return key in self._drivers
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            driver = self._drivers.pop(key, None)
+        if driver is not None:
+            self._quit(key, driver)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            drivers = list(self._drivers.items())
+            self._drivers.clear()
+        for key, driver in drivers:
+            self._quit(key, driver)
+
+    @staticmethod
+    def _quit(key: str, driver) -> None:
+        try:
+            driver.quit()
+        except Exception as e:
+            log.warning(f"Failed to quit WebDriver for {key}: {e}")
+
+
+_default_pool: Optional[WebDriverPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool() -> WebDriverPool:
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = WebDriverPool()
+        return _default_pool
+
+
+def shutdown_default_pool() -> None:
+    """Quit every browser started through the default pool, if any."""
+    with _default_pool_lock:
+        pool = _default_pool
+    if pool is not None:
+        pool.shutdown()
@@ -0,0 +1,214 @@
+"""
+Bloom filter over string keys, persisted to a file.
+
+A repository keeps the keys of every row it holds in a `KeyFilter` so that a
+batch of incoming rows can be split, without reading the stored data, into
+rows that are definitely new and the few that may be duplicates. False
+positives only cost a lookup; there are no false negatives as long as every
+write adds its keys, which is why the filter is rebuilt from the stored data
+once it is older than `max_age_hours` (rows may be written by other clients).
+"""
+
+import hashlib
+import logging
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Iterable, Optional
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"BLM1"
+# magic, bit count, hash count, capacity, keys added, built at
+HEADER = struct.Struct("<4sQIQQd")
+
+
+class BloomFilter:
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float = 0.001,
+        bits: Optional[int] = None,
+        hashes: Optional[int] = None,
+    ):
+        if capacity <= 0:
+            raise Exception("Bloom filter capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise Exception("Bloom filter error_rate must be between 0 and 1")
+        self.capacity = capacity
+        if bits is None:
+            bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        if hashes is None:
+            hashes = max(1, round(bits / capacity * math.log(2)))
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray((bits + 7) // 8)
+        self.count = 0
+        self.built_at = time.time()
+
+    def _positions(self, key: str):
+        # Double hashing: k positions out of two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[0:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.array[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def is_full(self) -> bool:
+        """More keys than it was sized for: the false positive rate is above target."""
+        return self.count > self.capacity
+
+    def union(self, other: "BloomFilter") -> None:
+        if (other.bits, other.hashes) != (self.bits, self.hashes):
+            raise Exception("Only Bloom filters of the same size can be merged")
+        merged = int.from_bytes(self.array, "little") | int.from_bytes(
+            other.array, "little"
+        )
+        self.array = bytearray(merged.to_bytes(len(self.array), "little"))
+        self.count = max(self.count, other.count)
+
+    def to_bytes(self) -> bytes:
+        return (
+            HEADER.pack(
+                MAGIC, self.bits, self.hashes, self.capacity, self.count, self.built_at
+            )
+            + self.array
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        magic, bits, hashes, capacity, count, built_at = HEADER.unpack_from(data)
+        if magic != MAGIC or len(data) - HEADER.size != (bits + 7) // 8:
+            raise Exception("Not a Bloom filter file")
+        bloom_filter = cls(capacity, bits=bits, hashes=hashes)
+        bloom_filter.array = bytearray(data[HEADER.size :])
+        bloom_filter.count = count
+        bloom_filter.built_at = built_at
+        return bloom_filter
+
+
+class KeyFilter:
+    """
+    A BloomFilter stored at `path`. `load` returns None when there is no usable
+    filter (missing, unreadable, too old or over capacity) and the caller has
+    to `rebuild` it from the stored data. One instance may be shared by threads
+    (e.g. the onboarding app's concurrent uploads): every method holds its lock.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        capacity: int = 100_000,
+        error_rate: float = 0.001,
+        max_age_hours: Optional[float] = 24,
+    ):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.max_age_hours = max_age_hours
+        self.bloom_filter: Optional[BloomFilter] = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_config(cls, config) -> "KeyFilter":
+        return cls(
+            path=config["path"],
+            capacity=int(config.get("capacity", 100_000)),
+            error_rate=float(config.get("error_rate", 0.001)),
+            max_age_hours=config.get("max_age_hours", 24),
+        )
+
+    def _read(self) -> Optional[BloomFilter]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                return BloomFilter.from_bytes(f.read())
+        except Exception as e:
+            log.warning(f"Ignoring unreadable key filter {self.path}: {e}")
+            return None
+
+    def _is_usable(self, bloom_filter: BloomFilter) -> bool:
+        if bloom_filter.is_full():
+            return False
+        if self.max_age_hours is None:
+            return True
+        return time.time() - bloom_filter.built_at < self.max_age_hours * 3600
+
+    def load(self) -> Optional[BloomFilter]:
+        with self._lock:
+            if self.bloom_filter is None or not self._is_usable(self.bloom_filter):
+                bloom_filter = self._read()
+                if bloom_filter is not None and not self._is_usable(bloom_filter):
+                    bloom_filter = None
+                self.bloom_filter = bloom_filter
+            return self.bloom_filter
+
+    def contains_any(self, keys: Iterable[str]) -> bool:
+        """Whether any key may be stored (True while there is no filter)."""
+        with self._lock:
+            if self.bloom_filter is None:
+                return True
+            return any(key in self.bloom_filter for key in keys)
+
+    def rebuild(self, keys: Iterable[str]) -> BloomFilter:
+        keys = list(keys)
+        # Room for the stored data to double before the next rebuild is needed
+        bloom_filter = BloomFilter(max(self.capacity, 2 * len(keys)), self.error_rate)
+        bloom_filter.update(keys)
+        with self._lock:
+            self.bloom_filter = bloom_filter
+            self._write(bloom_filter)
+        log.info(f"Rebuilt key filter {self.path} with {len(keys)} keys")
+        return bloom_filter
+
+    def add(self, keys: Iterable[str]) -> None:
+        """Add the keys of rows just written; a no-op until the filter is built."""
+        keys = list(keys)
+        with self._lock:
+            if self.load() is None:
+                return
+            self.bloom_filter.update(keys)
+            # Another process may have added keys, or rebuilt the filter, since
+            # we loaded it: merge rather than overwrite its file
+            on_disk = self._read()
+            if on_disk is not None:
+                try:
+                    self.bloom_filter.union(on_disk)
+                    self.bloom_filter.built_at = min(
+                        self.bloom_filter.built_at, on_disk.built_at
+                    )
+                except Exception:
+                    on_disk.update(keys)
+                    self.bloom_filter = on_disk
+            self._write(self.bloom_filter)
+
+    def _write(self, bloom_filter: BloomFilter) -> None:
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(bloom_filter.to_bytes())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,460 @@
+"""
+Shared, bounded TTL cache for fetchers and repositories.
+
+A `Cache` adds a time-to-live and hit/miss accounting on top of a backend that
+enforces the size limits:
+
+- MemoryBackend: in-process LRU, gone when the process exits.
+- DiskBackend: one file per key in a directory, oldest entries evicted first.
+- SqliteBackend: one table shared by every cache stored in the same file, LRU.
+
+Values are pickled on the way in, so each lookup returns a fresh copy that the
+caller may mutate. Caching is opt-in: `configure` sets the defaults from the
+top-level `cache` section and `cache_for` builds a cache only for the accounts
+and repositories whose own configuration has a `cache` entry.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.infrastructure import metrics
+
+log = logging.getLogger(__name__)
+
+BACKENDS = ("memory", "disk", "sqlite")
+DEFAULT_PATHS = {"disk": ".cache/fetchers", "sqlite": ".cache/fetchers.sqlite"}
+DEFAULT_TTL_SECONDS = 15 * 60
+OPTION_KEYS = ("backend", "path", "ttl_seconds", "max_entries", "max_bytes")
+
+
+class ICacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        """Return (stored_at, blob) or None."""
+
+    @abstractmethod
+    def set(self, key: str, stored_at: float, blob: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> int:
+        """Drop every entry. Returns how many were dropped."""
+
+    @abstractmethod
+    def usage(self) -> Tuple[int, int]:
+        """Return (entries, bytes) currently stored."""
+
+
+def _over_limits(
+    entries: int, size: int, max_entries: Optional[int], max_bytes: Optional[int]
+) -> bool:
+    return (max_entries is not None and entries > max_entries) or (
+        max_bytes is not None and size > max_bytes
+    )
+
+
+class MemoryBackend(ICacheBackend):
+    def __init__(
+        self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, stored_at: float, blob: bytes) -> None:
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (stored_at, blob)
+            self._bytes += len(blob)
+            while self._entries and _over_limits(
+                len(self._entries), self._bytes, self.max_entries, self.max_bytes
+            ):
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> int:
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            return dropped
+
+    def usage(self) -> Tuple[int, int]:
+        with self._lock:
+            return len(self._entries), self._bytes
+
+
+class DiskBackend(ICacheBackend):
+    """
+    Stores each entry as `<sha1 of key>.cache` under `directory`; the file's
+    modification time is the time it was stored.
+    """
+
+    suffix = ".cache"
+
+    def __init__(
+        self,
+        directory: str,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + self.suffix)
+
+    def _files(self) -> List[Tuple[float, int, str]]:
+        if not os.path.isdir(self.directory):
+            return []
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        path = self._path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            with open(path, "rb") as f:
+                return stored_at, f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, stored_at: float, blob: bytes) -> None:
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.utime(tmp_path, (stored_at, stored_at))
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def _evict(self) -> None:
+        files = sorted(self._files())
+        size = sum(file_size for _, file_size, _ in files)
+        while files and _over_limits(
+            len(files), size, self.max_entries, self.max_bytes
+        ):
+            _, file_size, path = files.pop(0)
+            os.remove(path)
+            size -= file_size
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> int:
+        with self._lock:
+            files = self._files()
+            for _, _, path in files:
+                os.remove(path)
+            return len(files)
+
+    def usage(self) -> Tuple[int, int]:
+        files = self._files()
+        return len(files), sum(file_size for _, file_size, _ in files)
+
+
+class SqliteBackend(ICacheBackend):
+    """Entries of every cache sharing `path` live in one table, keyed by namespace."""
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    value BLOB NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT stored_at, value FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (time.time(), self.namespace, key),
+            )
+            return row[0], bytes(row[1])
+
+    def set(self, key: str, stored_at: float, blob: bytes) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache "
+                "(namespace, key, stored_at, accessed_at, value) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, stored_at, time.time(), blob),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        rows = conn.execute(
+            "SELECT key, length(value) FROM cache WHERE namespace = ? "
+            "ORDER BY accessed_at",
+            (self.namespace,),
+        ).fetchall()
+        size = sum(row_size for _, row_size in rows)
+        evicted = []
+        while rows and _over_limits(len(rows), size, self.max_entries, self.max_bytes):
+            key, row_size = rows.pop(0)
+            evicted.append((self.namespace, key))
+            size -= row_size
+        conn.executemany("DELETE FROM cache WHERE namespace = ? AND key = ?", evicted)
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+
+    def clear(self) -> int:
+        with self._lock, self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM cache WHERE namespace = ?", (self.namespace,)
+            ).rowcount
+
+    def usage(self) -> Tuple[int, int]:
+        with self._lock, self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT count(*), coalesce(sum(length(value)), 0) FROM cache "
+                "WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+            return entries, size
+
+
+@dataclass
+class CacheStats:
+    name: str
+    backend: str
+    ttl_seconds: Optional[float]
+    hits: int
+    misses: int
+    entries: int
+    bytes: int
+
+
+class Cache:
+    def __init__(
+        self, name: str, backend: ICacheBackend, ttl_seconds: Optional[float] = None
+    ):
+        self.name = name
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def _is_fresh(self, stored_at: float) -> bool:
+        return self.ttl_seconds is None or time.time() - stored_at <= self.ttl_seconds
+
+    def get(self, key: str) -> Optional[object]:
+        entry = self.backend.get(key)
+        if entry is not None and not self._is_fresh(entry[0]):
+            self.backend.delete(key)
+            entry = None
+        if entry is not None:
+            try:
+                value = pickle.loads(entry[1])
+            except Exception as e:
+                log.warning(f"Dropping unreadable {self.name} cache entry {key}: {e}")
+                self.backend.delete(key)
+                entry = None
+        self._record(hit=entry is not None)
+        return None if entry is None else value
+
+    def set(self, key: str, value: object) -> None:
+        self.backend.set(key, time.time(), pickle.dumps(value))
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], object]) -> object:
+        """Return the cached value for `key`, or call `fetch` and cache its result."""
+        value = self.get(key)
+        if value is None:
+            value = fetch()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def invalidate(self, key: Optional[str] = None) -> int:
+        if key is not None:
+            self.backend.delete(key)
+            return 1
+        dropped = self.backend.clear()
+        log.info(f"Cache {self.name}: dropped {dropped} entries")
+        return dropped
+
+    def _record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        metrics.CACHE_REQUESTS.inc(cache=self.name, result="hit" if hit else "miss")
+
+    def stats(self) -> CacheStats:
+        entries, size = self.backend.usage()
+        return CacheStats(
+            name=self.name,
+            backend=type(self.backend).__name__,
+            ttl_seconds=self.ttl_seconds,
+            hits=self.hits,
+            misses=self.misses,
+            entries=entries,
+            bytes=size,
+        )
+
+
+def validate_options(options: Dict[str, object], where: str) -> None:
+    unknown = set(options) - set(OPTION_KEYS)
+    if unknown:
+        raise Exception(
+            f"Unknown cache options for {where}: {', '.join(sorted(unknown))}"
+        )
+    if options.get("backend", "memory") not in BACKENDS:
+        raise Exception(
+            f"Cache backend for {where} must be one of {', '.join(BACKENDS)}"
+        )
+
+
+class CacheRegistry:
+    """Builds caches from configuration and keeps them for stats and invalidation."""
+
+    def __init__(self):
+        self.defaults: Dict[str, object] = {
+            "backend": "memory",
+            "ttl_seconds": DEFAULT_TTL_SECONDS,
+        }
+        self.caches: Dict[str, Cache] = dict()
+        self._lock = threading.Lock()
+
+    def configure(self, settings: Optional[Dict[str, object]]) -> None:
+        settings = dict(settings or {})
+        validate_options(settings, "cache")
+        self.defaults.update(settings)
+
+    def create(self, name: str, options: Dict[str, object]) -> Cache:
+        validate_options(options, name)
+        settings = dict(self.defaults)
+        if "backend" in options and "path" not in options:
+            settings.pop("path", None)
+        settings.update(options)
+        backend_type = settings["backend"]
+        limits = dict(
+            max_entries=settings.get("max_entries"), max_bytes=settings.get("max_bytes")
+        )
+        if backend_type == "memory":
+            backend = MemoryBackend(**limits)
+        elif backend_type == "disk":
+            directory = settings.get("path", DEFAULT_PATHS["disk"])
+            backend = DiskBackend(os.path.join(directory, name), **limits)
+        else:
+            path = settings.get("path", DEFAULT_PATHS["sqlite"])
+            backend = SqliteBackend(path, name, **limits)
+        cache = Cache(name, backend, settings.get("ttl_seconds"))
+        self.register(cache)
+        return cache
+
+    def register(self, cache: Cache) -> None:
+        with self._lock:
+            self.caches[cache.name] = cache
+
+    def get(self, name: str) -> Optional[Cache]:
+        return self.caches.get(name)
+
+    def invalidate(self, name: Optional[str] = None) -> int:
+        if name is not None:
+            if name not in self.caches:
+                raise Exception(f"Unknown cache `{name}`")
+            return self.caches[name].invalidate()
+        return sum(cache.invalidate() for cache in list(self.caches.values()))
+
+    def stats(self) -> List[CacheStats]:
+        return [cache.stats() for cache in list(self.caches.values())]
+
+
+_registry = CacheRegistry()
+
+
+def get_registry() -> CacheRegistry:
+    return _registry
+
+
+def configure(settings: Optional[Dict[str, object]]) -> None:
+    _registry.configure(settings)
+
+
+def cache_for(name: str, options) -> Optional[Cache]:
+    """
+    Cache for one account or repository, from its `cache` option: absent or
+    false disables caching, true uses the defaults and a mapping overrides them.
+    """
+    if not options:
+        return None
+    return _registry.create(name, {} if options is True else dict(options))
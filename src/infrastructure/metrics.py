@@ -0,0 +1,318 @@
+import logging
+import math
+import os
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    labels = list(labels)
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(v))}"' for name, v in labels) + "}"
+
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        raise NotImplementedError
+
+    def render(self, name_prefix: str = "") -> List[str]:
+        samples = self._samples()
+        if not samples:
+            # Families without samples are left out so that textfiles written by
+            # different jobs can be concatenated without duplicate TYPE lines.
+            return []
+        lines = [
+            f"# HELP {name_prefix}{self.name} {self.documentation}",
+            f"# TYPE {name_prefix}{self.name} {self.metric_type}",
+        ]
+        for sample_name, labels, value in samples:
+            labels_text = _format_labels(labels)
+            lines.append(
+                f"{name_prefix}{sample_name}{labels_text} {_format_value(value)}"
+            )
+        return lines
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = dict()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, tuple(zip(self.labelnames, key)), v) for key, v in items]
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[Tuple[str, ...], List[int]] = dict()
+        self._sums: Dict[Tuple[str, ...], float] = dict()
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, **labels) -> int:
+        counts = self._counts.get(self._key(labels))
+        return counts[-1] if counts else 0
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            items = sorted(self._counts.items())
+            sums = dict(self._sums)
+        for key, counts in items:
+            labels = tuple(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, counts):
+                bucket_labels = labels + (("le", _format_value(bound)),)
+                samples.append((f"{self.name}_bucket", bucket_labels, count))
+            samples.append((f"{self.name}_sum", labels, sums[key]))
+            samples.append((f"{self.name}_count", labels, counts[-1]))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus registry rendering the text exposition format.
+
+    Asking for a metric that is already registered returns the existing one, so
+    modules can declare the metrics they update without import-order concerns.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = dict()
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_class, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif type(metric) is not metric_class:
+                raise ValueError(
+                    f"metric {name} already registered as {metric.metric_type}"
+                )
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(
+            Histogram, name, documentation, labelnames, buckets=buckets
+        )
+
+    def render(self, prefix: str = "", name_prefix: str = "") -> str:
+        """
+        Render every metric, or only those whose name starts with `prefix`.
+        Names not starting with `name_prefix` get it prepended, so a process can
+        serve the pipeline metrics it updated next to the textfiles of other
+        jobs without exposing the same metric family twice.
+        """
+        with self._lock:
+            metrics = [
+                self._metrics[name]
+                for name in sorted(self._metrics)
+                if name.startswith(prefix)
+            ]
+        lines = []
+        for metric in metrics:
+            renamed = not metric.name.startswith(name_prefix)
+            lines.extend(metric.render(name_prefix if renamed else ""))
+        return "".join(line + "\n" for line in lines)
+
+    def write_textfile(self, path: str) -> None:
+        """
+        Write the registry for the node_exporter textfile collector. The file is
+        replaced atomically so the collector never reads a partial file.
+        """
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        log.info(f"Metrics written to {path}")
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+def read_textfiles(directory: Optional[str]) -> str:
+    """Concatenate the *.prom files written by cron jobs into `directory`."""
+    if not directory or not os.path.isdir(directory):
+        return ""
+    parts = []
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(".prom"):
+            continue
+        try:
+            with open(os.path.join(directory, file_name)) as f:
+                parts.append(f.read())
+        except OSError as e:
+            log.warning(f"Could not read metrics file {file_name}: {e}")
+    return "".join(parts)
+
+
+# Metrics shared by the sync pipeline.
+STAGE_DURATION = _registry.histogram(
+    "expenses_fetcher_stage_duration_seconds",
+    "Duration of each traced pipeline stage",
+    ("stage",),
+)
+TRANSACTIONS_FETCHED = _registry.counter(
+    "expenses_fetcher_transactions_fetched_total",
+    "Transactions pulled from an account",
+    ("account",),
+)
+TRANSACTIONS_DEDUPLICATED = _registry.counter(
+    "expenses_fetcher_transactions_deduplicated_total",
+    "Staged transactions skipped because the repository already had them",
+    ("repository", "account"),
+)
+TRANSACTIONS_WRITTEN = _registry.counter(
+    "expenses_fetcher_transactions_written_total",
+    "Transactions written to a repository",
+    ("repository", "account"),
+)
+CACHE_REQUESTS = _registry.counter(
+    "expenses_fetcher_cache_requests_total",
+    "Cache lookups by outcome (hit or miss)",
+    ("cache", "result"),
+)
+HTTP_RETRIES = _registry.counter(
+    "expenses_fetcher_http_retries_total",
+    "HTTP requests retried by clients with automatic retries (Buxfer)",
+    ("client",),
+)
+HTTP_FAILURES = _registry.counter(
+    "expenses_fetcher_http_failures_total",
+    "HTTP requests answered with an error status, or failed with an exception",
+    ("client", "status"),
+)
+
+
+def count_http_failure(client: str, response=None, error=None) -> None:
+    """Count `response` if it has an error status, or the exception `error`."""
+    if error is not None:
+        HTTP_FAILURES.inc(client=client, status=type(error).__name__)
+    elif response is not None and response.status_code >= 400:
+        HTTP_FAILURES.inc(client=client, status=str(response.status_code))
+
+
+def count_session_failures(session, client: str):
+    """Count every failed request made through a requests Session."""
+    request = session.request
+
+    def counted(*args, **kwargs):
+        try:
+            response = request(*args, **kwargs)
+        except Exception as e:
+            count_http_failure(client, error=e)
+            raise
+        count_http_failure(client, response=response)
+        return response
+
+    session.request = counted
+    return session
+
+
+def observe_stages(tracer, histogram: Histogram = STAGE_DURATION) -> None:
+    """Feed every span of a finished run into a stage duration histogram."""
+    for span in tracer.spans:
+        histogram.observe(span.duration_seconds, stage=span.name)
+
+
+def count_by_account(
+    rows: Iterable[List[object]], account_index: int = 3
+) -> Dict[str, int]:
+    counts: Dict[str, int] = dict()
+    for row in rows:
+        account = str(row[account_index]).strip()
+        counts[account] = counts.get(account, 0) + 1
+    return counts
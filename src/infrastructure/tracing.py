@@ -0,0 +1,240 @@
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    span_id: int
+    name: str
+    parent_id: Optional[int]
+    thread: str
+    start_seconds: float
+    duration_seconds: float = 0.0
+    child_seconds: float = 0.0
+    calls: int = 1
+    attributes: Dict[str, object] = field(default_factory=dict)
+
+    @property
+    def self_seconds(self) -> float:
+        return max(self.duration_seconds - self.child_seconds, 0.0)
+
+
+@dataclass
+class StageTiming:
+    name: str
+    calls: int
+    total_seconds: float
+    self_seconds: float
+    max_seconds: float
+
+
+class Tracer:
+    """
+    Collects timed spans for one run.
+
+    Spans nest per thread: a span opened while another is active in the same
+    thread becomes its child, and the parent's self time excludes it. Work handed
+    to a thread pool joins the submitting span when wrapped with
+    `in_current_span`. Hot loops that would produce thousands of tiny spans (e.g.
+    taggers) should time themselves and report one aggregated entry through
+    `record`.
+
+    Stage timings are aggregated as spans finish; only the last `max_spans`
+    spans are kept, so a long-lived process does not grow without bound.
+    """
+
+    def __init__(self, max_spans: int = 10_000):
+        self.started_at = datetime.now(timezone.utc)
+        self._origin = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._spans = deque(maxlen=max_spans)
+        self._stages: Dict[str, StageTiming] = dict()
+        self._finished = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[Span]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = list()
+        return self._local.stack
+
+    def current_span(self) -> Optional[Span]:
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def attach(self, parent: Optional[Span]) -> Iterator[None]:
+        """Make `parent`, opened in another thread, the parent of spans opened here."""
+        if parent is None:
+            yield
+            return
+        stack = self._stack()
+        stack.append(parent)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    def _finish(self, current: Span, parent: Optional[Span]) -> None:
+        with self._lock:
+            # Under the lock: workers attached to the same parent finish together
+            if parent is not None:
+                parent.child_seconds += current.duration_seconds
+            self._spans.append(current)
+            self._finished += 1
+            stage = self._stages.setdefault(
+                current.name, StageTiming(current.name, 0, 0.0, 0.0, 0.0)
+            )
+            stage.calls += current.calls
+            stage.total_seconds += current.duration_seconds
+            stage.self_seconds += current.self_seconds
+            stage.max_seconds = max(stage.max_seconds, current.duration_seconds)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        current = Span(
+            span_id=next(self._ids),
+            name=name,
+            parent_id=parent.span_id if parent else None,
+            thread=threading.current_thread().name,
+            start_seconds=time.perf_counter() - self._origin,
+            attributes=attributes,
+        )
+        stack.append(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            stack.pop()
+            current.duration_seconds = (
+                time.perf_counter() - self._origin - current.start_seconds
+            )
+            self._finish(current, parent)
+
+    def record(self, name: str, seconds: float, calls: int = 1, **attributes) -> None:
+        """Add an already measured timing as a child of the current span."""
+        parent = self.current_span()
+        self._finish(
+            Span(
+                span_id=next(self._ids),
+                name=name,
+                parent_id=parent.span_id if parent else None,
+                thread=threading.current_thread().name,
+                start_seconds=time.perf_counter() - self._origin - seconds,
+                duration_seconds=seconds,
+                calls=calls,
+                attributes=attributes,
+            ),
+            parent,
+        )
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    @property
+    def dropped_spans(self) -> int:
+        """Finished spans no longer kept in `spans` (still counted in `stages`)."""
+        with self._lock:
+            return self._finished - len(self._spans)
+
+    def stages(self) -> List[StageTiming]:
+        """Timings aggregated by span name, slowest self time first."""
+        with self._lock:
+            stages = [StageTiming(**asdict(stage)) for stage in self._stages.values()]
+        return sorted(stages, key=lambda s: s.self_seconds, reverse=True)
+
+    def slowest_stages(self, limit: int = 3) -> List[StageTiming]:
+        return self.stages()[:limit]
+
+    def report(self) -> Dict[str, object]:
+        return {
+            "started_at": self.started_at.isoformat(),
+            "elapsed_seconds": time.perf_counter() - self._origin,
+            "stages": [asdict(stage) for stage in self.stages()],
+            "dropped_spans": self.dropped_spans,
+            "spans": [
+                dict(asdict(span), self_seconds=span.self_seconds)
+                for span in sorted(self.spans, key=lambda s: s.start_seconds)
+            ],
+        }
+
+    def write_report(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2, default=str)
+        log.info(f"Timing report written to {path}")
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def reset_tracer() -> Tracer:
+    """Start a new run: spans recorded from now on go to a fresh tracer."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def span(name: str, **attributes):
+    return get_tracer().span(name, **attributes)
+
+
+def in_current_span(function: Callable) -> Callable:
+    """
+    Wrap `function` to run, e.g. in a thread pool, as part of the span active
+    where it is wrapped: its spans become children of that span, whose self time
+    then excludes them instead of counting the worker time twice.
+    """
+    tracer = get_tracer()
+    parent = tracer.current_span()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with tracer.attach(parent):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator that wraps every call of the function in a span."""
+
+    def decorator(function: Callable) -> Callable:
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(span_name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def format_stages(stages: List[StageTiming]) -> str:
+    return ", ".join(f"{stage.name} {stage.self_seconds:.1f}s" for stage in stages)
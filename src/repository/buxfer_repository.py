@@ -1,15 +1,18 @@
+import math
 import os.path
 import pickle
-from typing import Dict, List, Callable, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Callable, Optional, Tuple
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 import json
 
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-
+from src.domain.date_codec import parse_date
+from src.infrastructure import metrics
+from src.infrastructure.tracing import traced
 from src.repository.i_repository import IRepository
 
 LOGIN_URL = "https://www.buxfer.com/api/login"
@@ -17,6 +20,33 @@ GET_ACCOUNTS_INFO_URL = "https://www.buxfer.com/api/accounts"
 ADD_TRANSACTION = "https://www.buxfer.com/api/add_transaction"
 GET_TRANSACTIONS = "https://www.buxfer.com/api/transactions"
 
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+log = logging.getLogger(__name__)
+
+
+class _CountingRetry(Retry):
+    """
+    urllib3 Retry that counts every retry in the HTTP retry metric.
+
+    Only idempotent methods are retried on every RETRY_STATUS_CODES: a 502 or
+    504 to add_transaction may come after Buxfer applied it, and posting it again
+    would duplicate the transaction. POSTs are retried on 429, which is answered
+    before the request is handled, and on connection errors (urllib3 never
+    retries a POST on read errors).
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method and not self._is_method_retryable(method):
+            return status_code == 429
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def increment(self, *args, **kwargs):
+        # Raises once the retries are exhausted: the last attempt is not counted
+        retry = super().increment(*args, **kwargs)
+        metrics.HTTP_RETRIES.inc(client="buxfer")
+        return retry
+
 
 class TransferDefinitionMacth:
     def __init__(self, settings: Dict[str, str]):
@@ -31,6 +61,9 @@ class TransferDefinitionMacth:
             and self.category == category.strip()
         )
 
+    def key(self) -> Tuple[str, str, str]:
+        return (self.account_name, self.description, self.category)
+
 
 class TransferDefinition:
     def __init__(self, conditions_obj: Dict):
@@ -38,6 +71,24 @@ class TransferDefinition:
         self.from_definition = TransferDefinitionMacth(conditions_obj["from"])
 
 
+def build_transfers_index(
+    transfers: List[TransferDefinition],
+) -> Dict[Tuple[str, str, str], Tuple[TransferDefinition, bool, bool]]:
+    """
+    Map (account, description, category) -> (definition, is_from, is_to).
+    Later definitions win, as they did with the linear scan.
+    """
+    index = {}
+    for definition in transfers:
+        index[definition.from_definition.key()] = (definition, True, False)
+        to_key = definition.to_definition.key()
+        if to_key in index and index[to_key][0] is definition:
+            index[to_key] = (definition, True, True)
+        else:
+            index[to_key] = (definition, False, True)
+    return index
+
+
 class BuxferRepository(IRepository):
     def __init__(
         self,
@@ -47,6 +98,8 @@ class BuxferRepository(IRepository):
         proxy=None,
         debug=False,
         transfers: List = None,
+        max_workers: int = 1,
+        max_retries: int = 3,
     ):
         # token_path = 'token.pickle'
         # credentials_path = 'account_transactions_massager/taggers/credentials.json'
@@ -59,9 +112,12 @@ class BuxferRepository(IRepository):
         self.token = None
         self.accounts_accountsId = None
         self.debug = debug
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
         self._login()
         self._get_accounts()
-        self.transfers = list(map(lambda x: TransferDefinition(x), transfers))
+        self.transfers = list(map(lambda x: TransferDefinition(x), transfers or []))
+        self.transfers_index = build_transfers_index(self.transfers)
 
     def _login(self) -> Dict:
         self._start()  # load cookies and parameters
@@ -78,7 +134,19 @@ class BuxferRepository(IRepository):
         self._load_session(False)
 
     def _load_session(self, file_present=True):
-        self.session = requests.Session()
+        self.session = metrics.count_session_failures(requests.Session(), "buxfer")
+        retry = _CountingRetry(
+            total=self.max_retries,
+            backoff_factor=0.5,
+            status_forcelist=RETRY_STATUS_CODES,
+            # Hand the last error response to the caller, which checks the status
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.max_workers, max_retries=retry
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
     def _authenticate(self, user, password):
         """ Actual authentication. Needs variables previously loaded """
@@ -123,58 +191,68 @@ class BuxferRepository(IRepository):
         """
         Get pair (description, category) for historic
         """
-        total_trx = 1
-        fetched_trx = []
-        page = 1
-        while total_trx - len(fetched_trx) > 0:
-            response = self.session.get(
-                GET_TRANSACTIONS, params={"token": self.token, "page": page}
-            )
-            if response.status_code != 200:
-                log.debug(response.text)
-                raise Exception("Something happened")
-            response_obj = json.loads(response.text)
-            total_trx = int(response_obj["response"]["numTransactions"])
-            fetched_trx.extend(
-                [
-                    (el["description"], self._getCategoryFromTags(el["tagNames"]))
-                    for el in response_obj["response"]["transactions"]
-                ]
-            )
-            page += 1
-        return fetched_trx
+        return list(self.iter_description_category())
+
+    def _get_transactions_page(self, page: int) -> Dict:
+        response = self.session.get(
+            GET_TRANSACTIONS, params={"token": self.token, "page": page}
+        )
+        if response.status_code != 200:
+            log.debug(response.text)
+            raise Exception("Something happened")
+        return json.loads(response.text)["response"]
+
+    def _description_category_pairs(
+        self, page_response: Dict
+    ) -> Iterator[Tuple[str, Optional[str]]]:
+        for el in page_response["transactions"]:
+            yield el["description"], self._getCategoryFromTags(el["tagNames"])
+
+    def iter_description_category(self) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Stream (description, category) pairs for the whole history.
+
+        The first page tells how many transactions exist; the remaining pages are
+        fetched concurrently (up to max_workers) over the pooled session and yielded
+        in page order as they arrive.
+        """
+        first_page = self._get_transactions_page(1)
+        yield from self._description_category_pairs(first_page)
+
+        total_trx = int(first_page["numTransactions"])
+        page_size = len(first_page["transactions"])
+        if page_size == 0 or total_trx <= page_size:
+            return
+        remaining_pages = range(2, math.ceil(total_trx / page_size) + 1)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for page_response in executor.map(
+                self._get_transactions_page, remaining_pages
+            ):
+                yield from self._description_category_pairs(page_response)
 
     def _is_transfer(
         self, trx_account: str, trx_description: str, trx_category: str
     ) -> Tuple[Optional[TransferDefinition], bool, bool]:
-        condition_match = None
-        for condition in self.transfers:
-            is_from = condition.from_definition.match(
-                account_name=trx_account,
-                description=trx_description,
-                category=trx_category,
-            )
-            is_to = condition.to_definition.match(
-                account_name=trx_account,
-                description=trx_description,
-                category=trx_category,
-            )
-            if is_from or is_to:
-                condition_match = condition
-
-        return condition_match, is_from, is_to
+        return self.transfers_index.get(
+            (trx_account.strip(), trx_description.strip(), trx_category.strip()),
+            (None, False, False),
+        )
 
     def batch_insert(self, data: List[List[str]], check_duplicates=True) -> None:
         accounts = {trx[3].strip() for trx in data}
         data.sort(reverse=False, key=lambda x: x[1])
+        payloads = []
+        written_by_account: Dict[str, int] = {}
+        trx_by_account: Dict[str, List[List[str]]] = {}
+        for trx in data:
+            trx_by_account.setdefault(trx[3].strip(), []).append(trx)
         for account in accounts:
             if account not in self.accounts_accountsId:
                 raise Exception(f"Account {account} not recognized")
-            current_account_trx = list(filter(lambda x: x[3] == account, data))
+            current_account_trx = trx_by_account.get(account, [])
+            staged_count = len(current_account_trx)
             if check_duplicates:
-                first_trx_date = datetime.strptime(
-                    current_account_trx[0][1], "%Y-%m-%d"
-                )
+                first_trx_date = parse_date(current_account_trx[0][1])
                 repository_latest_trx_for_account = self.get_last_transaction_for_account(
                     account
                 )
@@ -189,46 +267,75 @@ class BuxferRepository(IRepository):
                     if latest_datetime >= first_trx_date:
                         current_account_trx = list(
                             filter(
-                                lambda x: f"{datetime.strptime(x[1], '%Y-%m-%d')}-{x[3]}-{x[2].strip()}-{x[7]}"
+                                lambda x: f"{parse_date(x[1])}-{x[3]}-{x[2].strip()}-{x[7]}"
                                 not in latest_trx_serielized
-                                and datetime.strptime(x[1], "%Y-%m-%d")
+                                and parse_date(x[1])
                                 >= latest_datetime,
                                 current_account_trx,
                             )
                         )
+            metrics.TRANSACTIONS_DEDUPLICATED.inc(
+                staged_count - len(current_account_trx),
+                repository="buxfer",
+                account=account,
+            )
             for trx in current_account_trx:
-                description = trx[2].strip()
-                trx_category = trx[5].strip()
-                transfer_condition, is_from, is_to = self._is_transfer(
-                    account, description, trx_category
-                )
-                if transfer_condition is not None:
-                    """
-                        This means this is an between-accounts transference.
-                        We only want to catch the "from" account trx
-                    """
-                    if is_from:
-                        self._insert_transaction(
-                            accountId=self.accounts_accountsId[account],
-                            amount=trx[7],
-                            description=description,
-                            date=trx[1],
-                            category=trx_category,
-                            trx_type="transfer",
-                            from_account_id=self.accounts_accountsId[account],
-                            to_account_id=self.accounts_accountsId[
-                                transfer_condition.to_definition.account_name
-                            ],
-                        )
-                else:
-                    self._insert_transaction(
-                        accountId=self.accounts_accountsId[account],
-                        amount=trx[7],
-                        description=description,
-                        date=trx[1],
-                        category=trx[5],
-                        trx_type=trx[4],
-                    )
+                payload = self._build_payload(account, trx)
+                if payload is not None:
+                    payloads.append(payload)
+                    written_by_account[account] = written_by_account.get(account, 0) + 1
+        self._post_transactions(payloads)
+        for account, count in written_by_account.items():
+            metrics.TRANSACTIONS_WRITTEN.inc(count, repository="buxfer", account=account)
+
+    def _build_payload(self, account: str, trx: List[str]) -> Optional[Dict]:
+        description = trx[2].strip()
+        trx_category = trx[5].strip()
+        transfer_condition, is_from, is_to = self._is_transfer(
+            account, description, trx_category
+        )
+        if transfer_condition is not None:
+            """
+                This means this is an between-accounts transference.
+                We only want to catch the "from" account trx
+            """
+            if not is_from:
+                return None
+            return self._transaction_payload(
+                accountId=self.accounts_accountsId[account],
+                amount=trx[7],
+                description=description,
+                date=trx[1],
+                category=trx_category,
+                trx_type="transfer",
+                from_account_id=self.accounts_accountsId[account],
+                to_account_id=self.accounts_accountsId[
+                    transfer_condition.to_definition.account_name
+                ],
+            )
+        return self._transaction_payload(
+            accountId=self.accounts_accountsId[account],
+            amount=trx[7],
+            description=description,
+            date=trx[1],
+            category=trx[5],
+            trx_type=trx[4],
+        )
+
+    @traced("buxfer.post_transactions")
+    def _post_transactions(self, payloads: List[Dict]) -> None:
+        """
+        Post every payload. With max_workers > 1 the requests run through a bounded
+        thread pool sharing the pooled session.
+        """
+        if self.max_workers == 1 or len(payloads) <= 1:
+            for payload in payloads:
+                self._post_transaction(payload)
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # list() re-raises the first failure
+            list(executor.map(self._post_transaction, payloads))
+        log.debug(f"posted {len(payloads)} transactions with {self.max_workers} workers")
 
     def _insert_transaction(
         self,
@@ -242,6 +349,31 @@ class BuxferRepository(IRepository):
         to_account_id=None,
         debug=True,
     ):
+        self._post_transaction(
+            self._transaction_payload(
+                accountId,
+                amount,
+                description,
+                date,
+                category,
+                trx_type,
+                from_account_id,
+                to_account_id,
+            ),
+            debug,
+        )
+
+    def _transaction_payload(
+        self,
+        accountId,
+        amount,
+        description,
+        date,
+        category,
+        trx_type,
+        from_account_id=None,
+        to_account_id=None,
+    ) -> Dict:
         trx_type = trx_type.lower()
         trx_type_bxf = None
         if trx_type == "debt":
@@ -253,7 +385,7 @@ class BuxferRepository(IRepository):
         else:
             trx_type_bxf = "expense"
 
-        payload = {
+        return {
             "amount": amount,
             "description": description,
             "accountId": accountId,
@@ -263,6 +395,8 @@ class BuxferRepository(IRepository):
             "fromAccountId": from_account_id,
             "toAccountId": to_account_id,
         }
+
+    def _post_transaction(self, payload: Dict, debug=True) -> None:
         response = self.session.post(
             url=ADD_TRANSACTION, json=payload, params={"token": self.token}
         )
@@ -293,7 +427,7 @@ class BuxferRepository(IRepository):
             0
         ]
         most_recent_transaction_date = most_recent_transaction["date"]
-        last_datetime = datetime.strptime(most_recent_transaction_date, "%Y-%m-%d")
+        last_datetime = parse_date(most_recent_transaction_date)
         return last_datetime
 
     def get_last_transaction_for_account(self, account_name: str) -> List[str]:
@@ -353,8 +487,8 @@ class BuxferRepository(IRepository):
             buxfer_transaction["description"],
         )
         return [
-            datetime.strptime(buxfer_transaction["date"], "%Y-%m-%d"),
-            datetime.strptime(buxfer_transaction["date"], "%Y-%m-%d"),
+            parse_date(buxfer_transaction["date"]),
+            parse_date(buxfer_transaction["date"]),
             buxfer_transaction["description"],
             account_name,
             trx_type,
@@ -3,18 +3,31 @@ import os.path
 import pickle
 import sys
 import webbrowser
-from typing import Dict, List
+from typing import Dict, List, Optional, TYPE_CHECKING
 from datetime import datetime
 
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-
+from src.domain.date_codec import parse_date
+from src.infrastructure import metrics
+from src.infrastructure.bloom_filter import KeyFilter
+from src.infrastructure.cache import Cache
+from src.infrastructure.tracing import span
+from src.repository.google_sheets_client import get_sheets_client
 from src.repository.i_repository import IRepository
 
+if TYPE_CHECKING:
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
 
 log = logging.getLogger(__name__)
 
+# Expenses schema: capture date, auth date, description, account, type,
+# category, absolute value, value and the transaction id (a column that can be
+# hidden in the sheet)
+LEDGER_COLUMNS = 9
+ABSOLUTE_VALUE_INDEX = 6
+VALUE_INDEX = 7
+ID_INDEX = 8
+
 
 class GoogleSheetRepository(IRepository):
     def __init__(
@@ -29,6 +42,8 @@ class GoogleSheetRepository(IRepository):
         accounts_balance_start_cell,
         token_cache_path,
         credentials_path,
+        cache: Optional[Cache] = None,
+        key_filter: Optional[KeyFilter] = None,
     ):
         self.spreadsheet_id = spreadsheet_id
         self.accounts_balance_sheet_name = accounts_balance_sheet_name
@@ -39,12 +54,19 @@ class GoogleSheetRepository(IRepository):
         self.__start_of_sheet = f"{expenses_sheet_name}!{expenses_start_cell}"
         self.metadata_sheet_name = metadata_sheet_name
         self.scopes = scopes
-        self.credentials = self._getOrRefreshCredentials(
-            token_cache_path, credentials_path
+        # One client per token cache for the whole process: credentials are only
+        # loaded and the service only built the first time.
+        self.sheet = get_sheets_client(
+            token_cache_path,
+            scopes,
+            lambda: self._getOrRefreshCredentials(token_cache_path, credentials_path),
         )
-        self.sheet = build("sheets", "v4", credentials=self.credentials).spreadsheets()
+        self.credentials = self.sheet.credentials
         self.last_transaction_date_by_account = None
         self.categories = None
+        self.cache = cache
+        # Bloom filter over the keys of the stored rows, see remove_duplicates
+        self.key_filter = key_filter
 
     def _getOrRefreshCredentials(self, token_cache_path, credentials_path) -> Dict:
         creds = None
@@ -57,8 +79,12 @@ class GoogleSheetRepository(IRepository):
         # If there are no (valid) credentials available, let the user log in.
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
+                from google.auth.transport.requests import Request
+
                 creds.refresh(Request())
             else:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+
                 flow = InstalledAppFlow.from_client_secrets_file(
                     credentials_path, self.scopes
                 )
@@ -73,7 +99,7 @@ class GoogleSheetRepository(IRepository):
         return creds
 
     def _run_installed_app_flow(
-        self, flow: InstalledAppFlow, token_cache_path: str, credentials_path: str
+        self, flow: "InstalledAppFlow", token_cache_path: str, credentials_path: str
     ):
         is_interactive = sys.stdin.isatty() and sys.stdout.isatty()
         if not is_interactive:
@@ -91,12 +117,16 @@ class GoogleSheetRepository(IRepository):
             )
             return flow.run_local_server(port=0, open_browser=False)
 
-    def get_transactions(self):
+    def get_transactions(self, refresh: bool = False):
         transactions = self.get_data(
-            f"{self.expenses_sheet_name}", columns_indexes=list(range(0, 8))
+            f"{self.expenses_sheet_name}",
+            columns_indexes=list(range(0, LEDGER_COLUMNS)),
+            refresh=refresh,
         )
         transactions_staging = self.get_data(
-            f"{self.expenses_staging_name}", columns_indexes=list(range(0, 8))
+            f"{self.expenses_staging_name}",
+            columns_indexes=list(range(0, LEDGER_COLUMNS)),
+            refresh=refresh,
         )
         # remove header
         transactions.pop(0)
@@ -108,39 +138,68 @@ class GoogleSheetRepository(IRepository):
         transactions = [self._parse_pulled_transaction(trx) for trx in transactions]
         return transactions
 
-    def _parse_pulled_transaction(self, transaction) -> List:
-        if "," in transaction[-1]:
-            transaction[-1] = transaction[-1].replace(",", "")
-
-        if "," in transaction[-2]:
-            transaction[-2] = transaction[-2].replace(",", "")
-        try:
-            float_parse = float(transaction[-1])
-        except Exception as e:
-            print(transaction)
-            raise e
-        int_parse = int(float(transaction[-1]))
-        if int_parse == float_parse:
-            transaction[-1] = int_parse
-        else:
-            transaction[-1] = float_parse
-
-        float_parse = float(transaction[-2])
-        int_parse = int(float(transaction[-2]))
+    @staticmethod
+    def _parse_number(value):
+        if isinstance(value, str) and "," in value:
+            value = value.replace(",", "")
+        float_parse = float(value)
+        int_parse = int(float_parse)
         if int_parse == float_parse:
-            transaction[-2] = int_parse
-        else:
-            transaction[-2] = float_parse
+            return int_parse
+        return float_parse
 
+    def _parse_pulled_transaction(self, transaction) -> List:
+        # Absolute value and value; rows written before the id column have 8 cells
+        for index in (ABSOLUTE_VALUE_INDEX, VALUE_INDEX):
+            try:
+                transaction[index] = self._parse_number(transaction[index])
+            except Exception as e:
+                print(transaction)
+                raise e
+        if len(transaction) > ID_INDEX and isinstance(transaction[ID_INDEX], str):
+            # Ids are written with a leading quote so Sheets keeps them as text
+            transaction[ID_INDEX] = transaction[ID_INDEX].lstrip("'")
         return transaction
 
-    def get_data(self, data_range, columns_indexes: List[int] = None) -> List[List[object]]:
-        result = (
-            self.sheet.values()
-            .get(spreadsheetId=self.spreadsheet_id, range=data_range)
-            .execute()
-        )
-        values = result.get("values", [])
+    @staticmethod
+    def _transaction_key(transaction: List) -> Optional[tuple]:
+        """(account, id) of a ledger row, None for rows without an id."""
+        if len(transaction) <= ID_INDEX or not transaction[ID_INDEX]:
+            return None
+        return str(transaction[3]).strip(), str(transaction[ID_INDEX])
+
+    def _get_values(self, data_range: str, refresh: bool = False) -> List[List[object]]:
+        """
+        Read a range, through the cache when one is configured. With `refresh`
+        the sheet is read anyway and the cached copy replaced.
+        """
+
+        def fetch():
+            result = (
+                self.sheet.values()
+                .get(spreadsheetId=self.spreadsheet_id, range=data_range)
+                .execute()
+            )
+            return result.get("values", [])
+
+        if self.cache is None:
+            return fetch()
+        key = f"{self.spreadsheet_id}!{data_range}"
+        if refresh:
+            values = fetch()
+            self.cache.set(key, values)
+            return values
+        return self.cache.get_or_fetch(key, fetch)
+
+    def _invalidate_cache(self) -> None:
+        # Called after every write, which may change what any cached range reads
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    def get_data(
+        self, data_range, columns_indexes: List[int] = None, refresh: bool = False
+    ) -> List[List[object]]:
+        values = self._get_values(data_range, refresh)
         # validate all entries have 4 cells
         if columns_indexes is None:
             data = values
@@ -172,8 +231,8 @@ class GoogleSheetRepository(IRepository):
         Matches on: capture_date, auth_date, account, amount
         Plus: one description contains the other (min 5 chars for containment)
 
-        Schema: [capture_date, auth_date, description, account, type, category, ?, amount]
-        Indexes:     0            1           2          3       4       5      6    7
+        Schema: [capture_date, auth_date, description, account, type, category, abs, amount, id]
+        Indexes:     0            1           2          3       4       5       6     7     8
         """
         # Need at least 4 elements (up to account) and 8 for amount
         if len(new_trx) < 4 or len(existing_trx) < 4:
@@ -206,20 +265,119 @@ class GoogleSheetRepository(IRepository):
 
         return False
 
+    @classmethod
+    def _row_keys(cls, transaction: List) -> List[str]:
+        """
+        Key filter keys of a parsed row: the fields _is_duplicate requires to be
+        equal (dates, account and amount) and, when there is one, the id.
+        """
+        keys = ["|".join(str(transaction[i]) for i in (0, 1, 3, VALUE_INDEX))]
+        id_key = cls._transaction_key(transaction)
+        if id_key is not None:
+            keys.append("id|" + "|".join(id_key))
+        return keys
+
     def remove_duplicates(self, data: List[List[str]]) -> List[List[str]]:
-        stored_data = self.get_transactions()
+        # The ledger is always read from the sheet here: a cached copy may miss
+        # rows another process (the CLI, cron or the onboarding app) wrote since
+        if self.key_filter is None:
+            with span("googlesheet.read_transactions"):
+                stored_data = self.get_transactions(refresh=True)
+            with span("duplicate_detection", rows=len(data)):
+                return self._remove_duplicates(data, stored_data)
+
+        data = [self._parse_pulled_transaction(trx) for trx in data]
+        if self.key_filter.load() is None:
+            with span("googlesheet.read_transactions"):
+                stored_data = self.get_transactions(refresh=True)
+            with span("key_filter.rebuild", rows=len(stored_data)):
+                self.key_filter.rebuild(
+                    key for row in stored_data for key in self._row_keys(row)
+                )
+            with span("duplicate_detection", rows=len(data)):
+                return self._remove_duplicates(data, stored_data)
+
+        # Rows with no key in the filter are definitely not stored; the ledger
+        # is only read when some row may be, and only the stored rows sharing
+        # a key with one of those are compared.
+        with span("key_filter.lookup", rows=len(data)):
+            maybe_stored = [
+                self.key_filter.contains_any(self._row_keys(trx)) for trx in data
+            ]
+        candidates = [trx for trx, maybe in zip(data, maybe_stored) if maybe]
+        log.debug(f"Key filter: {len(candidates)} of {len(data)} rows may be stored")
+        if not candidates:
+            return data
+        with span("googlesheet.read_transactions"):
+            stored_data = self.get_transactions(refresh=True)
+        candidate_keys = {key for trx in candidates for key in self._row_keys(trx)}
+        stored_data = [
+            row
+            for row in stored_data
+            if any(key in candidate_keys for key in self._row_keys(row))
+        ]
+        with span("duplicate_detection", rows=len(candidates)):
+            kept = self._remove_duplicates(candidates, stored_data)
+        kept_ids = {id(trx) for trx in kept}
+        return [
+            trx
+            for trx, maybe in zip(data, maybe_stored)
+            if not maybe or id(trx) in kept_ids
+        ]
+
+    def _remove_duplicates(
+        self, data: List[List[str]], stored_data: List[List[str]]
+    ) -> List[List[str]]:
         data_normalized = [self._parse_pulled_transaction(trx) for trx in data]
+        if not stored_data:
+            return data_normalized
+
+        # Rows with an id are matched on it first. The others are compared with
+        # _is_duplicate to the stored rows with the same dates, account and
+        # amount: rows written before the id column existed, and rows whose id
+        # changed (a content-hash id follows the description, which the bank
+        # may edit between pending and booked). A stored row with an id
+        # absorbs one incoming row at most, so repeated identical movements
+        # are not merged into the stored ones.
+        stored_by_id = dict()
+        stored_by_fields: Dict[str, List[List]] = dict()
+        for existing in stored_data:
+            key = self._transaction_key(existing)
+            if key is not None:
+                stored_by_id[key] = existing
+            stored_by_fields.setdefault(self._row_keys(existing)[0], []).append(
+                existing
+            )
 
-        new_transactions = []
-
-        if stored_data is not None and len(stored_data) > 0:
-            for trx in data_normalized:
-                is_dup = any(self._is_duplicate(trx, existing) for existing in stored_data)
-                if not is_dup:
-                    new_transactions.append(trx)
+        unmatched = []
+        matched = set()
+        for trx in data_normalized:
+            existing = stored_by_id.get(self._transaction_key(trx))
+            if existing is None:
+                unmatched.append(trx)
+            else:
+                matched.add(id(existing))
 
-            return new_transactions
-        return data_normalized
+        new_transactions = []
+        for trx in unmatched:
+            for existing in stored_by_fields.get(self._row_keys(trx)[0], []):
+                if id(existing) in matched or not self._is_duplicate(trx, existing):
+                    continue
+                if self._transaction_key(existing) is not None:
+                    matched.add(id(existing))
+                break
+            else:
+                new_transactions.append(trx)
+        return new_transactions
+
+    @staticmethod
+    def _with_text_id(transaction: List) -> List:
+        # USER_ENTERED would turn numeric ids (and hashes like "12e45") into numbers
+        if len(transaction) <= ID_INDEX or not transaction[ID_INDEX]:
+            return transaction
+        return transaction[:ID_INDEX] + [f"'{transaction[ID_INDEX]}"] + transaction[
+            ID_INDEX + 1 :
+        ]
 
     def batch_insert(self, data: List[List[str]], check_duplicates=True) -> None:
         if check_duplicates:
@@ -227,35 +385,47 @@ class GoogleSheetRepository(IRepository):
         else:
             data_to_insert = data
 
-        self.__append_in_range(
-            data_to_insert, f"{self.expenses_staging_name}!{self.expenses_start_cell}"
-        )
+        with span("googlesheet.append", rows=len(data_to_insert)):
+            self.__append_in_range(
+                [self._with_text_id(trx) for trx in data_to_insert],
+                f"{self.expenses_staging_name}!{self.expenses_start_cell}",
+            )
+        if self.key_filter is not None:
+            self.key_filter.add(
+                key
+                for trx in data_to_insert
+                for key in self._row_keys(self._parse_pulled_transaction(list(trx)))
+            )
+        written = metrics.count_by_account(data_to_insert)
+        for account, staged in metrics.count_by_account(data).items():
+            metrics.TRANSACTIONS_DEDUPLICATED.inc(
+                staged - written.get(account, 0),
+                repository="googlesheet",
+                account=account,
+            )
+        for account, count in written.items():
+            metrics.TRANSACTIONS_WRITTEN.inc(
+                count, repository="googlesheet", account=account
+            )
 
     def sort_transactions(self, column_index_order_by: int):
         data: List[str] = self.get_transactions()
         data.sort(key=lambda key: key[column_index_order_by])
 
         self.__upsert_range(
-            data,
+            [self._with_text_id(trx) for trx in data],
             f"{self.expenses_sheet_name}!"
             f"{self.expenses_start_cell[0]}{int(self.expenses_start_cell[1:]) + 1}",
         )
 
     def get_last_transaction_date_for_account(self, account_name: str) -> datetime:
-        result = (
-            self.sheet.values()
-            .get(
-                spreadsheetId=self.spreadsheet_id,
-                range=f"{self.metadata_sheet_name}!A2:B",
-            )
-            .execute()
-        )
+        values = self._get_values(f"{self.metadata_sheet_name}!A2:B")
         print(account_name)
-        print(result)
-        self.last_transaction_date_by_account = dict(result.get("values", []))
+        print(values)
+        self.last_transaction_date_by_account = dict(values)
         last_date = self.last_transaction_date_by_account.get(account_name, None)
         if last_date is not None:
-            last_date = datetime.strptime(last_date, "%Y-%m-%d")
+            last_date = parse_date(last_date)
 
         return last_date
 
@@ -263,15 +433,7 @@ class GoogleSheetRepository(IRepository):
         self.__upsert_range(categories, f"{self.metadata_sheet_name}!E2:E")
 
     def pull_categories(self) -> List[str]:
-        result = (
-            self.sheet.values()
-            .get(
-                spreadsheetId=self.spreadsheet_id,
-                range=f"{self.metadata_sheet_name}!E2:E",
-            )
-            .execute()
-        )
-        self.categories = result.get("values", [])
+        self.categories = self._get_values(f"{self.metadata_sheet_name}!E2:E")
         return self.categories
 
     def add_category(self, category: str):
@@ -280,45 +442,46 @@ class GoogleSheetRepository(IRepository):
         self.categories.append(category)
 
     def pull_accounts(self):
-        result = (
-            self.sheet.values()
-            .get(
-                spreadsheetId=self.spreadsheet_id,
-                range=f"{self.metadata_sheet_name}!A2:A",
-            )
-            .execute()
-        )
-        return result.get("values", [])
+        return self._get_values(f"{self.metadata_sheet_name}!A2:A")
 
     def __clear_range(self, sheet_range: str) -> None:
-        response = (
-            self.sheet.values()
-            .clear(spreadsheetId=self.spreadsheet_id, range=sheet_range)
-            .execute()
-        )
+        try:
+            response = (
+                self.sheet.values()
+                .clear(spreadsheetId=self.spreadsheet_id, range=sheet_range)
+                .execute()
+            )
+        finally:
+            self._invalidate_cache()
         return response
 
     def __append_in_range(
         self, values: List[object], sheet_range: str, axis: str = "ROWS"
     ) -> None:
-        self.sheet.values().append(
-            spreadsheetId=self.spreadsheet_id,
-            range=sheet_range,
-            insertDataOption="INSERT_ROWS",
-            body={"majorDimension": axis, "values": values},
-            valueInputOption="USER_ENTERED",
-        ).execute()
+        try:
+            self.sheet.values().append(
+                spreadsheetId=self.spreadsheet_id,
+                range=sheet_range,
+                insertDataOption="INSERT_ROWS",
+                body={"majorDimension": axis, "values": values},
+                valueInputOption="USER_ENTERED",
+            ).execute()
+        finally:
+            self._invalidate_cache()
 
     def __upsert_range(
         self, values: List[object], update_range: str, axis: str = "ROWS"
     ) -> None:
-        self.sheet.values().update(
-            spreadsheetId=self.spreadsheet_id,
-            range=update_range,
-            valueInputOption="USER_ENTERED",
-            includeValuesInResponse=True,
-            body={"range": update_range, "majorDimension": axis, "values": values},
-        ).execute()
+        try:
+            self.sheet.values().update(
+                spreadsheetId=self.spreadsheet_id,
+                range=update_range,
+                valueInputOption="USER_ENTERED",
+                includeValuesInResponse=True,
+                body={"range": update_range, "majorDimension": axis, "values": values},
+            ).execute()
+        finally:
+            self._invalidate_cache()
 
     def append_balances(self, data_to_insert: List[List[str]]) -> None:
         """
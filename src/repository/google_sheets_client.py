@@ -0,0 +1,141 @@
+"""
+Process-wide Google Sheets clients.
+
+Building a Sheets service and loading the token cache is done once per token
+file, not once per GoogleSheetRepository: `get_sheets_client` hands the same
+SheetsClient to every repository configured with the same token cache.
+
+- The discovery document is the one packaged with google-api-python-client,
+  loaded and parsed once, so no network round trip is made to build a client.
+- Each thread gets its own service over its own authorized httplib2.Http (which
+  is not thread-safe), and that connection is kept alive between requests.
+- Credentials are refreshed before they expire, once for all threads, and the
+  refreshed token is written back to the token cache.
+"""
+
+import json
+import logging
+import pickle
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+REFRESH_MARGIN = timedelta(minutes=5)
+HTTP_TIMEOUT_SECONDS = 60
+
+_discovery_document: Optional[Dict] = None
+_discovery_lock = threading.Lock()
+
+
+def _sheets_discovery_document() -> Dict:
+    global _discovery_document
+    with _discovery_lock:
+        if _discovery_document is None:
+            from googleapiclient.discovery_cache import get_static_doc
+
+            _discovery_document = json.loads(get_static_doc("sheets", "v4"))
+        return _discovery_document
+
+
+class SheetsClient:
+    """
+    Drop-in for `build("sheets", "v4", ...).spreadsheets()`: `values()` and the
+    other collections resolve to the calling thread's service.
+    """
+
+    def __init__(
+        self,
+        credentials,
+        token_cache_path: Optional[str] = None,
+        refresh_margin: timedelta = REFRESH_MARGIN,
+    ):
+        self.credentials = credentials
+        self.token_cache_path = token_cache_path
+        self.refresh_margin = refresh_margin
+        self.refreshes = 0
+        self._refresh_lock = threading.Lock()
+        self._local = threading.local()
+        self._token_request = None
+
+    def _needs_refresh(self) -> bool:
+        if not getattr(self.credentials, "refresh_token", None):
+            return False
+        expiry = self.credentials.expiry
+        if expiry is None:
+            return not self.credentials.valid
+        # google-auth keeps expiry as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return expiry - now <= self.refresh_margin
+
+    def ensure_fresh(self) -> None:
+        if not self._needs_refresh():
+            return
+        with self._refresh_lock:
+            if not self._needs_refresh():
+                return
+            from google.auth.transport.requests import Request
+
+            if self._token_request is None:
+                self._token_request = Request()
+            log.info("Refreshing Google Sheets credentials")
+            self.credentials.refresh(self._token_request)
+            self.refreshes += 1
+            if self.token_cache_path:
+                with open(self.token_cache_path, "wb") as token:
+                    pickle.dump(self.credentials, token)
+
+    def spreadsheets(self):
+        """The calling thread's `spreadsheets()` resource, built on first use."""
+        self.ensure_fresh()
+        resource = getattr(self._local, "spreadsheets", None)
+        if resource is None:
+            import google_auth_httplib2
+            import httplib2
+            from googleapiclient.discovery import build_from_document
+
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT_SECONDS)
+            )
+            service = build_from_document(_sheets_discovery_document(), http=http)
+            resource = service.spreadsheets()
+            self._local.spreadsheets = resource
+        return resource
+
+    def values(self):
+        return self.spreadsheets().values()
+
+    def __getattr__(self, name):
+        # Other collections (get, batchUpdate, ...) of the thread's resource
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.spreadsheets(), name)
+
+
+_clients: Dict[Tuple[str, Tuple[str, ...]], SheetsClient] = dict()
+_clients_lock = threading.Lock()
+
+
+def get_sheets_client(
+    token_cache_path: str,
+    scopes: List[str],
+    load_credentials: Callable[[], object],
+) -> SheetsClient:
+    """
+    Shared client for a token cache. `load_credentials` (token file, refresh or
+    OAuth flow) only runs the first time a token cache is seen in the process.
+    """
+    key = (token_cache_path, tuple(scopes or ()))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = SheetsClient(load_credentials(), token_cache_path)
+            _clients[key] = client
+        return client
+
+
+def reset_sheets_clients() -> None:
+    """Forget every shared client, e.g. after the token cache was replaced."""
+    with _clients_lock:
+        _clients.clear()
@@ -2,4 +2,6 @@ from abc import ABC
 
 
 class IRepository(ABC):
-    pass
+    def close(self) -> None:
+        """Release connections or flush pending writes. No-op by default."""
+        pass
@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+TRANSACTIONS = "transactions"
+BALANCES = "balances"
+
+
+class LocalOutbox:
+    """
+    Durable local store for rows that still have to reach a repository.
+
+    Rows are committed to a SQLite file before any network call is made, so a
+    failing sink never loses staged data. Each row is keyed by its enqueue call
+    and its position in it: identical rows are all kept, and duplicates are left
+    to the repository's own check when the rows are flushed.
+
+    Transaction rows keep the `check_duplicates` flag they were queued with. A
+    row that was already attempted is always flushed with the check, since the
+    failed attempt may have written part of its batch.
+
+    A row that failed `max_attempts` flushes is moved to a dead-letter state so
+    it stops blocking the rows queued after it; `retry_dead` queues it again.
+    """
+
+    def __init__(self, path: str, max_attempts: Optional[int] = None):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    row_key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    flushed_at TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    dead_at TEXT,
+                    check_duplicates INTEGER NOT NULL DEFAULT 1,
+                    UNIQUE (kind, row_key)
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(outbox)")}
+            if "dead_at" not in columns:
+                conn.execute("ALTER TABLE outbox ADD COLUMN dead_at TEXT")
+            if "check_duplicates" not in columns:
+                conn.execute(
+                    "ALTER TABLE outbox "
+                    "ADD COLUMN check_duplicates INTEGER NOT NULL DEFAULT 1"
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def enqueue(
+        self, kind: str, rows: List[List[object]], check_duplicates: bool = True
+    ) -> int:
+        """Store rows for a later flush. Returns how many rows were stored."""
+        now = datetime.now(timezone.utc).isoformat()
+        batch_id = uuid.uuid4().hex
+        records = [
+            (
+                kind,
+                f"{batch_id}:{position}",
+                json.dumps(row, default=str),
+                now,
+                int(check_duplicates),
+            )
+            for position, row in enumerate(rows)
+        ]
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO outbox "
+                "(kind, row_key, payload, created_at, check_duplicates) "
+                "VALUES (?, ?, ?, ?, ?)",
+                records,
+            )
+        log.debug(f"Outbox {self.path}: {len(rows)} {kind} rows queued")
+        return len(rows)
+
+    def pending(self, kind: str, limit: int) -> List[Tuple[int, List[object]]]:
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "SELECT id, payload FROM outbox "
+                "WHERE kind = ? AND flushed_at IS NULL AND dead_at IS NULL "
+                "ORDER BY id LIMIT ?",
+                (kind, limit),
+            )
+            return [(row_id, json.loads(payload)) for row_id, payload in cursor]
+
+    def next_batch(
+        self, kind: str, limit: int
+    ) -> Tuple[bool, List[Tuple[int, List[object]]]]:
+        """
+        The oldest pending rows of `kind`, up to `limit` and up to the first row
+        to be flushed with a different `check_duplicates`, and that flag.
+        """
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "SELECT id, payload, check_duplicates OR attempts > 0 FROM outbox "
+                "WHERE kind = ? AND flushed_at IS NULL AND dead_at IS NULL "
+                "ORDER BY id LIMIT ?",
+                (kind, limit),
+            )
+            batch = []
+            check_duplicates = True
+            for row_id, payload, check in cursor:
+                if batch and bool(check) != check_duplicates:
+                    break
+                check_duplicates = bool(check)
+                batch.append((row_id, json.loads(payload)))
+            return check_duplicates, batch
+
+    def _count(self, condition: str, kind: Optional[str]) -> int:
+        query = f"SELECT COUNT(*) FROM outbox WHERE flushed_at IS NULL AND {condition}"
+        params: Tuple = ()
+        if kind is not None:
+            query += " AND kind = ?"
+            params = (kind,)
+        with self._lock, self._connect() as conn:
+            return conn.execute(query, params).fetchone()[0]
+
+    def pending_count(self, kind: Optional[str] = None) -> int:
+        return self._count("dead_at IS NULL", kind)
+
+    def mark_flushed(self, ids: List[int]) -> None:
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "UPDATE outbox SET flushed_at = ?, attempts = attempts + 1, "
+                "last_error = NULL WHERE id = ?",
+                [(now, row_id) for row_id in ids],
+            )
+
+    def record_failure(self, ids: List[int], error: str) -> int:
+        """Count a failed flush of `ids`. Returns how many were dead-lettered."""
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+                [(error, row_id) for row_id in ids],
+            )
+            if self.max_attempts is None:
+                return 0
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE outbox SET dead_at = ? WHERE id = ? AND attempts >= ?",
+                [(now, row_id, self.max_attempts) for row_id in ids],
+            )
+            return conn.total_changes - before
+
+    def dead_count(self, kind: Optional[str] = None) -> int:
+        return self._count("dead_at IS NOT NULL", kind)
+
+    def retry_dead(self) -> int:
+        """Queue the dead-lettered rows again. Returns how many there were."""
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE outbox SET dead_at = NULL, attempts = 0 "
+                "WHERE flushed_at IS NULL AND dead_at IS NOT NULL"
+            )
+            return cursor.rowcount
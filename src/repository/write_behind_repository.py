@@ -0,0 +1,184 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.repository.i_repository import IRepository
+from src.repository.local_outbox import BALANCES, TRANSACTIONS, LocalOutbox
+
+log = logging.getLogger(__name__)
+
+
+class WriteBehindRepository(IRepository):
+    """
+    Repository decorator that commits writes to a LocalOutbox and drains them to
+    the wrapped repository from a background thread.
+
+    Writes (batch_insert, append_balances) return as soon as the rows are durable
+    on disk. Reads are delegated to the wrapped repository. Transactions are flushed
+    with the `check_duplicates` they were queued with, and always with the check
+    once a flush of them failed, so retrying a partially written batch is safe.
+    A batch still failing after the outbox's `max_attempts` is
+    dead-lettered so the batches behind it are flushed.
+    """
+
+    def __init__(
+        self,
+        repository: IRepository,
+        outbox: LocalOutbox,
+        batch_size: int = 500,
+        max_retries: int = 5,
+        retry_backoff_seconds: float = 2.0,
+        flush_interval_seconds: float = 5.0,
+    ):
+        self.repository = repository
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.flush_interval_seconds = flush_interval_seconds
+        self._repository_lock = threading.RLock()
+        self._drain_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def from_config(repository: IRepository, config: Dict) -> "WriteBehindRepository":
+        """
+        Wrap `repository` using a `write_behind` config block, e.g.:
+
+            write_behind:
+              outbox_path: data/googlesheet_outbox.sqlite
+              batch_size: 500
+              max_retries: 5        # per flush
+              max_attempts: 20      # over all runs, then the rows are dead-lettered
+        """
+        return WriteBehindRepository(
+            repository,
+            LocalOutbox(
+                config.get("outbox_path", "data/outbox.sqlite"),
+                max_attempts=config.get("max_attempts", 20),
+            ),
+            batch_size=config.get("batch_size", 500),
+            max_retries=config.get("max_retries", 5),
+            retry_backoff_seconds=config.get("retry_backoff_seconds", 2.0),
+            flush_interval_seconds=config.get("flush_interval_seconds", 5.0),
+        )
+
+    def __getattr__(self, name):
+        if name == "repository":
+            raise AttributeError(name)
+        attribute = getattr(self.repository, name)
+        if not callable(attribute):
+            return attribute
+
+        def locked(*args, **kwargs):
+            with self._repository_lock:
+                return attribute(*args, **kwargs)
+
+        return locked
+
+    def batch_insert(self, data: List[List[str]], check_duplicates=True) -> None:
+        self.outbox.enqueue(TRANSACTIONS, data, check_duplicates)
+        self._wake.set()
+
+    def append_balances(self, data_to_insert: List[List[str]]) -> None:
+        self.outbox.enqueue(BALANCES, data_to_insert)
+        self._wake.set()
+
+    def pending_count(self) -> int:
+        return self.outbox.pending_count()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="write-behind-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._drain()
+            self._wake.wait(self.flush_interval_seconds)
+            self._wake.clear()
+
+    def _write_batch(
+        self, kind: str, rows: List[List[object]], check_duplicates: bool
+    ) -> None:
+        with self._repository_lock:
+            if kind == TRANSACTIONS:
+                self.repository.batch_insert(rows, check_duplicates=check_duplicates)
+            else:
+                self.repository.append_balances(rows)
+
+    def _flush_batch(self, kind: str) -> Optional[int]:
+        """
+        Push the next batch of `kind`. Returns the number of rows written or
+        dead-lettered, or None if every retry failed.
+        """
+        check_duplicates, batch = self.outbox.next_batch(kind, self.batch_size)
+        if not batch:
+            return 0
+        ids = [row_id for row_id, _ in batch]
+        rows = [row for _, row in batch]
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                # A failed attempt may have written part of the batch
+                self._write_batch(kind, rows, check_duplicates or attempt > 1)
+                self.outbox.mark_flushed(ids)
+                log.info(f"Flushed {len(rows)} {kind} rows from outbox")
+                return len(rows)
+            except Exception as e:
+                dead = self.outbox.record_failure(ids, str(e))
+                log.warning(
+                    f"Outbox flush of {len(rows)} {kind} rows failed "
+                    f"(attempt {attempt}/{self.max_retries}): {e}"
+                )
+                if dead:
+                    log.error(
+                        f"Moved {dead} {kind} rows to the dead letters of "
+                        f"{self.outbox.path} after {self.outbox.max_attempts} attempts"
+                    )
+                    return dead
+                if attempt < self.max_retries and not self._stop.is_set():
+                    time.sleep(self.retry_backoff_seconds * 2 ** (attempt - 1))
+        return None
+
+    def _drain(self) -> bool:
+        """Flush until the outbox is empty. Returns False if a batch gave up."""
+        with self._drain_lock:
+            for kind in (TRANSACTIONS, BALANCES):
+                while True:
+                    flushed = self._flush_batch(kind)
+                    if flushed is None:
+                        return False
+                    if flushed == 0:
+                        break
+            return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Drain the outbox from the calling thread. Returns True when nothing is left
+        pending. Rows that could not be written stay in the outbox for the next run.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.outbox.pending_count() > 0:
+            if not self._drain():
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                break
+        return self.outbox.pending_count() == 0
+
+    def close(self, timeout: Optional[float] = 30) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if not self.flush(timeout):
+            log.warning(
+                f"{self.outbox.pending_count()} rows left in outbox {self.outbox.path}"
+            )
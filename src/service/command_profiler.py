@@ -0,0 +1,152 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+SORT_KEYS = ("cumulative", "tottime", "ncalls")
+
+
+class _ThreadProfile:
+    """
+    Profiler of a thread started while a command ran. A profiler can only be
+    disabled from its own thread, so the timer does it there on the thread's
+    first event after the command ended: threads that outlive the command
+    (pool workers, the write-behind flusher) stop being profiled then.
+    """
+
+    def __init__(self, command_ended: threading.Event):
+        self.thread = threading.current_thread()
+        self.command_ended = command_ended
+        self.stopped = False
+        self.profiler = cProfile.Profile(self._timer)
+
+    def _timer(self) -> float:
+        if not self.stopped and self.command_ended.is_set():
+            sys.setprofile(None)
+            self.stopped = True
+        return time.perf_counter()
+
+    def finished(self) -> bool:
+        return self.stopped or not self.thread.is_alive()
+
+
+class CommandProfiler:
+    """
+    Runs shell commands under cProfile while enabled.
+
+    Stats are accumulated per command name across calls, so `dump` writes one
+    .prof file per command (readable with `python -m pstats` or snakeviz), and
+    the hottest functions of each call are returned for printing inline.
+
+    Threads started by the command (e.g. the pool `push` writes repositories
+    from) get a profiler of their own, merged into the command's stats once
+    the thread stopped being profiled: when it ends, or on its next event after
+    the command for threads that outlive it.
+    """
+
+    def __init__(self, top: int = 15, sort: str = "cumulative"):
+        self.enabled = False
+        self.top = top
+        self.sort = sort
+        self.stats: Dict[str, pstats.Stats] = dict()
+        # Thread profilers still running after their command, by command
+        self.pending: List[Tuple[str, _ThreadProfile]] = list()
+
+    def enable(self, top: Optional[int] = None, sort: Optional[str] = None) -> None:
+        if sort is not None and sort not in SORT_KEYS:
+            raise Exception(f"sort must be one of {', '.join(SORT_KEYS)}")
+        if top is not None:
+            self.top = top
+        if sort is not None:
+            self.sort = sort
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def run(self, command: str, function: Callable, *args, **kwargs):
+        """
+        Call `function` under the profiler. Returns (result, report) where report
+        lists the `top` hottest functions of this call.
+        """
+        profiler = cProfile.Profile()
+        command_ended = threading.Event()
+        thread_profiles = []
+        lock = threading.Lock()
+
+        def profile_thread(frame, event, arg):
+            # First event of a new thread: replace this hook with a profiler
+            thread_profile = _ThreadProfile(command_ended)
+            try:
+                thread_profile.profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler, which sees every thread
+                sys.setprofile(None)
+                return
+            with lock:
+                thread_profiles.append(thread_profile)
+
+        threading.setprofile(profile_thread)
+        try:
+            result = profiler.runcall(function, *args, **kwargs)
+        finally:
+            threading.setprofile(None)
+            command_ended.set()
+            stats = pstats.Stats(profiler)
+            with lock:
+                self.pending.extend((command, profile) for profile in thread_profiles)
+            for finished_command, thread_profiler in self._finished_threads():
+                if finished_command == command:
+                    stats.add(thread_profiler)
+                else:
+                    self._add(finished_command, thread_profiler)
+            self._add(command, stats)
+        return result, self.report(stats)
+
+    def _finished_threads(self) -> List[Tuple[str, cProfile.Profile]]:
+        # Only profilers that stopped: one still running cannot be read safely
+        finished = []
+        pending = []
+        for command, profile in self.pending:
+            if profile.finished():
+                finished.append((command, profile.profiler))
+            else:
+                pending.append((command, profile))
+        self.pending = pending
+        return finished
+
+    def _add(self, command: str, profile) -> None:
+        if command not in self.stats:
+            self.stats[command] = pstats.Stats()
+        self.stats[command].add(profile)
+
+    def report(self, profile) -> str:
+        stream = io.StringIO()
+        stats = pstats.Stats(stream=stream)
+        stats.add(profile)
+        stats.strip_dirs().sort_stats(self.sort).print_stats(self.top)
+        return stream.getvalue()
+
+    def dump(self, path: str) -> Dict[str, str]:
+        """Write `<path>/<command>.prof` for every profiled command."""
+        for command, thread_profiler in self._finished_threads():
+            self._add(command, thread_profiler)
+        os.makedirs(path, exist_ok=True)
+        written = dict()
+        for command, stats in self.stats.items():
+            file_path = os.path.join(path, f"{command}.prof")
+            stats.dump_stats(file_path)
+            written[command] = file_path
+        log.info(f"Profiles written to {path}: {', '.join(written) or 'none'}")
+        return written
+
+    def clear(self) -> None:
+        self.stats = dict()
+        self.pending = list()
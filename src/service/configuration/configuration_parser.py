@@ -1,23 +1,40 @@
-from typing import List, Dict
+from typing import List, Dict, TYPE_CHECKING
 import os
 import importlib
 
 from src.application.account_manager.i_account_manager import IAccountManager
-from src.application.account_manager.myedenred_account_manager import (
-    MyEdenredAccountManager,
-)
-from src.application.account_manager.nordigen_account_manager import (
-    NordigenAccountManager,
-)
-from src.infrastructure.bank_account_transactions_fetchers.nordigen_token_provider import (
-    NordigenTokenProvider,
-)
 from src.domain.category_taggers.historic_tagger import HistoricTagger
 from src.domain.category_taggers.i_tagger import ITagger
 from src.domain.category_taggers.regex_tagger import RegexTaggerBuilder
-from src.repository.google_sheet_repository import GoogleSheetRepository
-# BuxferRepository imported lazily under feature flag
+from src.infrastructure import cache
+# Account managers, GoogleSheetRepository and BuxferRepository are imported lazily,
+# when an account or repository of that type is built, to keep startup fast.
 from src.repository.i_repository import IRepository
+from src.repository.write_behind_repository import WriteBehindRepository
+from src.service.configuration.lazy_proxies import LazyAccountManager, LazyRepository
+
+if TYPE_CHECKING:
+    from src.infrastructure.bank_account_transactions_fetchers.nordigen_token_provider import (
+        NordigenTokenProvider,
+    )
+
+
+REQUIRED_ACCOUNT_KEYS = {
+    "activebank-debit": ["card_number"],
+    "activebank-precard": ["card_number"],
+    "myedenred": ["card_number"],
+    "nordigen-account": ["secret_id", "secret_key", "account"],
+    "xlsx-manual": ["columns"],
+}
+
+# Statement formats read without a column mapping
+SELF_DESCRIBING_STATEMENT_FORMATS = ("ofx", "camt053")
+STATEMENT_FORMATS = ("auto", "xlsx", "csv") + SELF_DESCRIBING_STATEMENT_FORMATS
+
+REQUIRED_REPOSITORY_KEYS = {
+    "googlesheet": ["spreadsheet_id", "token_cache_path", "credentials_path"],
+    "buxfer": ["username"],
+}
 
 
 class GeneralAccountInfo:
@@ -67,9 +84,36 @@ def parse_taggers(
     return taggers
 
 
+def configure_cache(config) -> None:
+    """Apply the top-level `cache` section (backend, path and default limits)."""
+    cache.configure(config.get("cache"))
+
+
+def wrap_write_behind(repository: IRepository, write_behind) -> IRepository:
+    if not write_behind:
+        return repository
+    write_behind_repository = WriteBehindRepository.from_config(
+        repository, write_behind if isinstance(write_behind, dict) else {}
+    )
+    write_behind_repository.start()
+    return write_behind_repository
+
+
 def parse_repository(repository, repository_type, password_getter):
     if repository_type == "googlesheet":
-        return GoogleSheetRepository(**repository)
+        from src.repository.google_sheet_repository import GoogleSheetRepository
+
+        repository = dict(repository)
+        write_behind = repository.pop("write_behind", None)
+        repository["cache"] = cache.cache_for(
+            repository_type, repository.pop("cache", None)
+        )
+        key_filter = repository.pop("key_filter", None)
+        if key_filter:
+            from src.infrastructure.bloom_filter import KeyFilter
+
+            repository["key_filter"] = KeyFilter.from_config(key_filter)
+        return wrap_write_behind(GoogleSheetRepository(**repository), write_behind)
     elif repository_type == "buxfer":
         if not _is_buxfer_enabled():
             raise Exception(
@@ -97,6 +141,8 @@ def parse_repository(repository, repository_type, password_getter):
                 account_id=repository_type
             ),
             transfers=transfers_definitions,
+            max_workers=repository.get("max_workers", 1),
+            max_retries=repository.get("max_retries", 3),
         )
 
 
@@ -146,7 +192,7 @@ def parse_account(
     repositories,
     tmp_directory,
     password_getter,
-    nordigen_token_provider: NordigenTokenProvider = None,
+    nordigen_token_provider: "NordigenTokenProvider" = None,
 ) -> IAccountManager:
     account_type = account["type"].lower().strip()
     if account_type == "activebank-debit" or account_type == "activebank-precard":
@@ -170,6 +216,8 @@ def parse_account(
             general_account_info.taggers,
             tmp_directory,
             password_getter,
+            headless=account.get("headless", True),
+            cache=cache.cache_for(account_name, account.get("cache")),
         )
     elif account_type == "myedenred":
 
@@ -192,6 +240,9 @@ def parse_account(
             general_account_info.remove_transaction_description_prefix,
             general_account_info.taggers,
             password_getter,
+            cache=cache.cache_for(account_name, account.get("cache")),
+            incremental=account.get("incremental", True),
+            store_dir=account.get("store_dir"),
         )
     elif account_type == "nordigen-account":
 
@@ -200,6 +251,11 @@ def parse_account(
             package=__package__,
         ).NordigenAccountManager
 
+        # A configured shared cache is read by default; the legacy per-account
+        # cache directory is only read with `cache_policy: use_if_fresh`.
+        shared_cache = cache.cache_for(account_name, account.get("cache"))
+        default_policy = "use_if_fresh" if shared_cache else "network_only"
+
         return NordigenAccountManager(
             account["secret_id"],
             account["secret_key"],
@@ -208,8 +264,9 @@ def parse_account(
             parse_taggers(account.get("category_taggers", {}), next(iter(repositories))),
             token_provider=nordigen_token_provider,
             cache_dir=account.get("cache_dir", ".cache/nordigen"),
-            cache_policy=account.get("cache_policy", "network_only"),
+            cache_policy=account.get("cache_policy", default_policy),
             cache_ttl_hours=account.get("cache_ttl_hours", 3),
+            cache=shared_cache,
         )
     elif account_type == "xlsx-manual":
         XlsxManualAccountManager = importlib.import_module(
@@ -219,7 +276,7 @@ def parse_account(
 
         taggers = parse_taggers(account.get("category_taggers", {}), next(iter(repositories)))
         remove_prefix = parse_remove_transaction_description_prefix(account)
-        columns = account["columns"]
+        columns = account.get("columns", {})
 
         return XlsxManualAccountManager(
             account_name=account_name,
@@ -233,4 +290,82 @@ def parse_account(
             sheet_name=account.get("sheet_name"),
             prompt_for_file_path=account.get("prompt_for_file_path", True),
             file_path=account.get("file_path"),
+            footer_skip_rows=account.get("footer_skip_rows", 0),
+            statement_format=account.get("format", "auto"),
+            delimiter=account.get("delimiter"),
+            encoding=account.get("encoding"),
+            parse_workers=account.get("parse_workers"),
+        )
+
+
+def validate_account(account, account_name) -> None:
+    """Fail fast on configuration errors, without connecting to the account."""
+    if "type" not in account:
+        raise Exception(f"You must define a type for the account {account_name}")
+    account_type = account["type"].lower().strip()
+    if account_type not in REQUIRED_ACCOUNT_KEYS:
+        raise Exception(f"Unknown type `{account_type}` for the account {account_name}")
+    statement_format = str(account.get("format", "auto")).lower()
+    if account_type == "xlsx-manual" and statement_format not in STATEMENT_FORMATS:
+        raise Exception(
+            f"Unknown format `{statement_format}` for the account {account_name}, "
+            f"expected one of {', '.join(STATEMENT_FORMATS)}"
         )
+    for key in REQUIRED_ACCOUNT_KEYS[account_type]:
+        if key == "columns" and statement_format in SELF_DESCRIBING_STATEMENT_FORMATS:
+            continue
+        if key not in account:
+            raise Exception(f"You must define `{key}` for the account {account_name}")
+    if account_type in ("activebank-debit", "activebank-precard", "myedenred"):
+        if "username" not in account and "username_env" not in account:
+            raise Exception(f"You must define a username for the account {account_name}")
+    parse_remove_transaction_description_prefix(account)
+    validate_cache_option(account.get("cache"), account_name)
+
+
+def validate_cache_option(options, name) -> None:
+    if options is None or isinstance(options, bool):
+        return
+    if not isinstance(options, dict):
+        raise Exception(f"property `cache` of {name} must be a bool or a mapping")
+    cache.validate_options(options, name)
+
+
+def validate_repository(repository, repository_type) -> None:
+    """Fail fast on configuration errors, without connecting to the repository."""
+    if repository_type not in REQUIRED_REPOSITORY_KEYS:
+        raise Exception(f"Unknown repository `{repository_type}`")
+    for key in REQUIRED_REPOSITORY_KEYS[repository_type]:
+        if key not in repository:
+            raise Exception(f"You must define `{key}` for the repository {repository_type}")
+    validate_cache_option(repository.get("cache"), repository_type)
+
+
+def parse_repository_lazily(repository, repository_type, password_getter) -> IRepository:
+    validate_repository(repository, repository_type)
+    return LazyRepository(
+        repository_type,
+        lambda: parse_repository(repository, repository_type, password_getter),
+    )
+
+
+def parse_account_lazily(
+    account,
+    account_name,
+    repositories,
+    tmp_directory,
+    password_getter,
+    nordigen_token_provider=None,
+) -> IAccountManager:
+    validate_account(account, account_name)
+    return LazyAccountManager(
+        account_name,
+        lambda: parse_account(
+            account,
+            account_name,
+            repositories,
+            tmp_directory,
+            password_getter,
+            nordigen_token_provider=nordigen_token_provider,
+        ),
+    )
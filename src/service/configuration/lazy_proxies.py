@@ -0,0 +1,112 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Generic, List, Optional, TypeVar
+
+from src.application.account_manager.i_account_manager import IAccountManager
+from src.domain.balance import Balance
+from src.domain.category_taggers.i_tagger import ITagger
+from src.domain.transactions import ITransaction
+from src.repository.i_repository import IRepository
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _LazyInstance(Generic[T]):
+    """Builds an object with `factory` the first time it is needed."""
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self.factory = factory
+        self.instance: Optional[T] = None
+        self.lock = threading.Lock()
+
+    def get(self) -> T:
+        if self.instance is None:
+            with self.lock:
+                if self.instance is None:
+                    log.info(f"Connecting {self.name}")
+                    self.instance = self.factory()
+        return self.instance
+
+
+class LazyRepository(IRepository):
+    """
+    Stand-in for a repository whose configuration has been validated but which
+    only authenticates and connects on first use.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], IRepository]):
+        self._lazy = _LazyInstance(f"repository {name}", factory)
+
+    @property
+    def built_instance(self) -> Optional[IRepository]:
+        return self._lazy.instance
+
+    def __getattr__(self, name):
+        if name == "_lazy":
+            raise AttributeError(name)
+        return getattr(self._lazy.get(), name)
+
+    def close(self) -> None:
+        if self._lazy.instance is not None:
+            self._lazy.instance.close()
+
+
+class LazyAccountManager(IAccountManager):
+    """
+    Stand-in for an account manager whose configuration has been validated but
+    which only logs into the bank on first use.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], IAccountManager]):
+        self._lazy = _LazyInstance(f"account {name}", factory)
+        self._account_names: Optional[List[str]] = None
+
+    @property
+    def built_instance(self) -> Optional[IAccountManager]:
+        return self._lazy.instance
+
+    def _account_manager(self) -> IAccountManager:
+        is_new = self._lazy.instance is None
+        account_manager = self._lazy.get()
+        if is_new and self._account_names is not None:
+            if hasattr(account_manager, "set_accounts"):
+                account_manager.set_accounts(self._account_names)
+        return account_manager
+
+    def __getattr__(self, name):
+        if name in ("_lazy", "_account_names"):
+            raise AttributeError(name)
+        return getattr(self._account_manager(), name)
+
+    def set_accounts(self, account_names: List[str]) -> None:
+        self._account_names = account_names
+        if self._lazy.instance is not None and hasattr(
+            self._lazy.instance, "set_accounts"
+        ):
+            self._lazy.instance.set_accounts(account_names)
+
+    def _get_transactions(
+        self, date_start: datetime, date_end: datetime
+    ) -> List[ITransaction]:
+        return self._account_manager()._get_transactions(date_start, date_end)
+
+    def get_transactions(
+        self, date_start: datetime, date_end: datetime, apply_taggers: bool = False
+    ) -> List[ITransaction]:
+        return self._account_manager().get_transactions(
+            date_start, date_end, apply_taggers
+        )
+
+    def getCategoryTaggers(self) -> List[ITagger]:
+        return self._account_manager().getCategoryTaggers()
+
+    def get_balance(self) -> Balance:
+        return self._account_manager().get_balance()
+
+    def close(self):
+        if self._lazy.instance is not None:
+            self._lazy.instance.close()
@@ -0,0 +1,39 @@
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.application.account_manager.active_bank_account_manager import (
+    ActiveBankAccountManager,
+)
+from src.application.account_manager.exceptions import AccountNotFoundException
+
+
+class ActiveBankAccount(ActiveBankAccountManager):
+    # ActiveBankAccountManager does not implement get_balance yet
+    def get_balance(self):
+        return None
+
+
+def account_manager(bank):
+    with patch(
+        "src.application.account_manager.active_bank_account_manager"
+        ".ActiveBankCrawler.shared",
+        return_value=bank,
+    ):
+        return ActiveBankAccount("1234", "user", "pw", False, [], "/tmp", MagicMock())
+
+
+class TestUnknownCard:
+    def test_browser_reference_is_released_once(self):
+        bank = MagicMock()
+        bank.get_card.return_value = None
+        manager = account_manager(bank)
+
+        for _ in range(2):
+            with pytest.raises(AccountNotFoundException):
+                manager.get_transactions(datetime(2024, 1, 1), datetime(2024, 1, 31))
+        manager.close()
+
+        bank.get_card.assert_called_once_with("1234")
+        bank.release.assert_called_once_with()
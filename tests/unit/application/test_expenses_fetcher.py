@@ -0,0 +1,238 @@
+import threading
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from src.application.account_manager.i_account_manager import IAccountManager
+from src.application.expenses_fetcher.expenses_fetcher import ExpensesFetcher
+from src.domain.transactions import NordigenTransaction
+
+
+class SortingRepository:
+    """Mimics BuxferRepository, which sorts the rows it receives in place."""
+
+    def __init__(self):
+        self.received = None
+
+    def batch_insert(self, data, check_duplicates=True):
+        data.sort(key=lambda row: row[1])
+        data[0][0] = "mutated"
+        self.received = data
+
+    def append_balances(self, data_to_insert):
+        pass
+
+
+class TestPushTransactions(unittest.TestCase):
+    def _fetcher(self, repositories):
+        fetcher = ExpensesFetcher(repositories, {})
+        fetcher.staged_transactions = [["b", "2"], ["a", "1"]]
+        fetcher.staged_balances = [["balance"]]
+        return fetcher
+
+    def test_each_repository_gets_its_own_copy(self):
+        first, second = SortingRepository(), SortingRepository()
+        fetcher = self._fetcher({"first": first, "second": second})
+
+        results = fetcher.push_transactions()
+
+        self.assertTrue(all(result.ok for result in results.values()))
+        self.assertEqual(fetcher.staged_transactions, [["b", "2"], ["a", "1"]])
+        self.assertIsNot(first.received, second.received)
+        self.assertEqual(second.received[1], ["b", "2"])
+
+    def test_failing_repository_does_not_stop_the_others(self):
+        broken = MagicMock()
+        broken.batch_insert.side_effect = Exception("quota exceeded")
+        working = MagicMock()
+        fetcher = self._fetcher({"broken": broken, "working": working})
+
+        results = fetcher.push_transactions()
+
+        self.assertFalse(results["broken"].ok)
+        self.assertEqual(results["broken"].error, "quota exceeded")
+        self.assertTrue(results["working"].ok)
+        self.assertEqual(results["working"].transactions, 2)
+        self.assertEqual(results["working"].balances, 1)
+        working.append_balances.assert_called_once_with([["balance"]])
+
+    def test_repositories_are_written_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait_for_other(data, check_duplicates=True):
+            barrier.wait()
+
+        repositories = dict()
+        for name in ("sheets", "buxfer"):
+            repositories[name] = MagicMock()
+            repositories[name].batch_insert.side_effect = wait_for_other
+        fetcher = self._fetcher(repositories)
+
+        results = fetcher.push_transactions()
+
+        self.assertTrue(all(result.ok for result in results.values()))
+
+    def test_unknown_repository(self):
+        fetcher = self._fetcher({"sheets": MagicMock()})
+
+        with self.assertRaises(Exception):
+            fetcher.push_transactions(repository_name="missing")
+
+
+class StaticAccount(IAccountManager):
+    def __init__(self, *transactions):
+        self.transactions = transactions
+
+    def set_accounts(self, account_names):
+        pass
+
+    def getCategoryTaggers(self):
+        return []
+
+    def get_balance(self):
+        return None
+
+    def close(self):
+        pass
+
+    def _get_transactions(self, date_start, date_end):
+        return [
+            NordigenTransaction(date, date, description, amount)
+            for date, description, amount in self.transactions
+            if date_start <= date <= date_end
+        ]
+
+
+class TestPullTransactions(unittest.TestCase):
+    def _fetcher(self, transfer_window_days):
+        accounts = {
+            "Checking": StaticAccount(
+                (datetime(2024, 1, 2), "TRF SAVINGS", -200.0),
+                (datetime(2024, 1, 3), "GROCERIES", -40.0),
+            ),
+            "Savings": StaticAccount((datetime(2024, 1, 3), "TRF CHECKING", 200.0)),
+        }
+        return ExpensesFetcher(
+            {},
+            accounts,
+            date_format="%Y-%m-%d",
+            transfer_window_days=transfer_window_days,
+        )
+
+    @staticmethod
+    def types(rows):
+        return {(row[3], row[2]): (row[4], row[5]) for row in rows}
+
+    def test_transfers_between_pulled_accounts_are_paired(self):
+        fetcher = self._fetcher(transfer_window_days=2)
+        fetcher.pull_transactions(datetime(2024, 1, 1), datetime(2024, 1, 31))
+        self.assertEqual(fetcher.match_transfers(), 1)
+
+        types = self.types(fetcher.staged_transactions)
+        self.assertEqual(types[("Checking", "TRF SAVINGS")], ("Transfer", "Savings"))
+        self.assertEqual(types[("Savings", "TRF CHECKING")], ("Transfer", "Checking"))
+        self.assertEqual(types[("Checking", "GROCERIES")], ("Debt", ""))
+        self.assertEqual(fetcher.match_transfers(), 0)
+
+    def test_accounts_pulled_one_at_a_time_are_paired_on_push(self):
+        # As the cron job does: one pull per account, then one push
+        fetcher = self._fetcher(transfer_window_days=2)
+        repository = MagicMock()
+        fetcher.repositories = {"sheets": repository}
+        for account_name in ("Checking", "Savings"):
+            fetcher.pull_transactions(
+                datetime(2024, 1, 1), datetime(2024, 1, 31), account_name=account_name
+            )
+        fetcher.sort_transactions()
+
+        fetcher.push_transactions()
+        types = self.types(repository.batch_insert.call_args[0][0])
+        self.assertEqual(types[("Checking", "TRF SAVINGS")], ("Transfer", "Savings"))
+        self.assertEqual(types[("Savings", "TRF CHECKING")], ("Transfer", "Checking"))
+
+    def test_removed_rows_are_not_paired(self):
+        fetcher = self._fetcher(transfer_window_days=2)
+        fetcher.pull_transactions(datetime(2024, 1, 1), datetime(2024, 1, 31))
+        fetcher.staged_transactions = [
+            row for row in fetcher.staged_transactions if row[3] != "Savings"
+        ]
+
+        self.assertEqual(fetcher.match_transfers(), 0)
+        self.assertEqual(
+            {entry[0] for entry in fetcher.unpaired_transactions}, {"Checking"}
+        )
+
+    def test_pairing_is_off_by_default(self):
+        fetcher = self._fetcher(transfer_window_days=None)
+        fetcher.pull_transactions(datetime(2024, 1, 1), datetime(2024, 1, 31))
+
+        self.assertEqual(fetcher.match_transfers(), 0)
+        self.assertNotIn("Transfer", [row[4] for row in fetcher.staged_transactions])
+
+
+class TestCheckDuplicates(unittest.TestCase):
+    def setUp(self):
+        coffee = (datetime(2024, 1, 2), "COFFEE", -1.5)
+        self.fetcher = ExpensesFetcher(
+            {},
+            {
+                "Checking": StaticAccount(
+                    coffee, coffee, (datetime(2024, 1, 5), "RENT", -700.0)
+                ),
+                "Card": StaticAccount(coffee),
+            },
+            date_format="%Y-%m-%d",
+        )
+
+    def descriptions(self, account_name):
+        return [
+            row[2] for row in self.fetcher.staged_transactions if row[3] == account_name
+        ]
+
+    def test_overlapping_pulls_are_staged_once(self):
+        self.fetcher.pull_transactions(datetime(2024, 1, 1), datetime(2024, 1, 3))
+        self.fetcher.pull_transactions(datetime(2024, 1, 2), datetime(2024, 1, 31))
+        self.assertEqual(len(self.fetcher.staged_transactions), 7)
+
+        self.assertEqual(self.fetcher.check_duplicates(), 3)
+        # Two identical purchases in one pull are two movements
+        self.assertEqual(self.descriptions("Checking"), ["COFFEE", "COFFEE", "RENT"])
+        self.assertEqual(self.descriptions("Card"), ["COFFEE"])
+
+    def test_only_the_given_account_is_checked(self):
+        for _ in range(2):
+            self.fetcher.pull_transactions(datetime(2024, 1, 1), datetime(2024, 1, 31))
+
+        self.assertEqual(self.fetcher.check_duplicates(account_name="Card"), 1)
+        self.assertEqual(len(self.descriptions("Checking")), 6)
+        self.assertEqual(len(self.descriptions("Card")), 1)
+
+    def test_push_sends_each_row_once(self):
+        repository = MagicMock()
+        self.fetcher.repositories = {"sheets": repository}
+        self.fetcher.pull_transactions(datetime(2024, 1, 1), datetime(2024, 1, 31))
+        self.fetcher.pull_transactions(datetime(2024, 1, 1), datetime(2024, 1, 31))
+
+        results = self.fetcher.push_transactions(deduplicate=True)
+        self.assertEqual(results["sheets"].transactions, 4)
+        self.assertEqual(len(repository.batch_insert.call_args[0][0]), 4)
+
+    def test_push_keeps_repeats_unless_asked(self):
+        repository = MagicMock()
+        self.fetcher.repositories = {"sheets": repository}
+        self.fetcher.pull_transactions(datetime(2024, 1, 1), datetime(2024, 1, 31))
+        self.fetcher.pull_transactions(datetime(2024, 1, 1), datetime(2024, 1, 31))
+
+        self.assertEqual(self.fetcher.push_transactions()["sheets"].transactions, 8)
+
+    def test_rows_without_an_id_are_kept(self):
+        # e.g. two equal purchases loaded from a sheet written before ids
+        row = ["2024-01-02", "2024-01-02", "COFFEE", "Card", "Debt", "", "1.5", "-1.5"]
+        self.fetcher.staged_transactions = [list(row), list(row), row + [""]]
+
+        self.assertEqual(self.fetcher.check_duplicates(), 0)
+        self.assertEqual(len(self.fetcher.staged_transactions), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from datetime import datetime
+
+from src.domain import date_codec
+from src.domain.date_codec import ISO_DATETIME, format_date, parse_date
+
+
+class TestDateCodec(unittest.TestCase):
+    def setUp(self):
+        date_codec.clear_caches()
+
+    def test_parse_matches_strptime(self):
+        cases = [
+            ("2024-03-05", "%Y-%m-%d"),
+            ("2024-3-5", "%Y-%m-%d"),
+            ("05-03-2024", "%d-%m-%Y"),
+            ("2024-03-05T10:11:12", ISO_DATETIME),
+            ("2024-03-05T10:11:12Z", "%Y-%m-%dT%H:%M:%SZ"),
+        ]
+        for value, date_format in cases:
+            with self.subTest(value=value):
+                self.assertEqual(
+                    parse_date(value, date_format),
+                    datetime.strptime(value, date_format),
+                )
+
+    def test_iso_fast_path_does_not_accept_more_than_strptime(self):
+        with self.assertRaises(ValueError):
+            parse_date("20240305", "%Y-%m-%d")
+        with self.assertRaises(ValueError):
+            parse_date("2024-02-30", "%Y-%m-%d")
+
+    def test_format_matches_strftime(self):
+        value = datetime(2024, 3, 5, 10, 11, 12)
+        for date_format in ("%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y %H:%M"):
+            with self.subTest(date_format=date_format):
+                self.assertEqual(
+                    format_date(value, date_format), value.strftime(date_format)
+                )
+
+    def test_repeated_dates_hit_the_cache(self):
+        for _ in range(3):
+            parse_date("2024-03-05")
+            format_date(datetime(2024, 3, 5), "%Y/%m/%d")
+
+        info = date_codec.cache_info()
+        self.assertEqual((info["parse"].hits, info["parse"].misses), (2, 1))
+        self.assertEqual((info["format"].hits, info["format"].misses), (2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
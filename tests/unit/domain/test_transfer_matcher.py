@@ -0,0 +1,99 @@
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from src.application.transactions.expense_fetcher_transaction import (
+    ExpenseFetcherTransaction,
+)
+from src.domain.transactions import NordigenTransaction
+from src.domain.transfer_matcher import TransferMatcher
+
+START = datetime(2024, 1, 1)
+
+
+def transaction(day, amount, description="MOVEMENT"):
+    date = START + timedelta(days=day)
+    return NordigenTransaction(date, date, description, amount)
+
+
+class TestTransferMatcher(unittest.TestCase):
+    def test_debit_and_credit_within_the_window_are_paired(self):
+        debit, credit = transaction(0, -100.0), transaction(2, 100.0)
+        late_credit = transaction(9, 50.0)
+        pairs = TransferMatcher(window_days=3).match(
+            [
+                ("Checking", [debit, transaction(5, -50.0)]),
+                ("Savings", [credit, late_credit]),
+            ]
+        )
+
+        self.assertEqual(len(pairs), 1)
+        self.assertEqual(
+            (pairs[0].debit_account, pairs[0].credit_account), ("Checking", "Savings")
+        )
+        self.assertTrue(debit.is_transfer() and credit.is_transfer())
+        self.assertFalse(late_credit.is_transfer())
+        self.assertEqual(
+            (debit.get_category(), credit.get_category()), ("Savings", "Checking")
+        )
+
+        row = ExpenseFetcherTransaction(
+            debit, "Checking", "Debt", "Income", "Transfer", "Investment", "%Y/%m/%d"
+        ).to_list()
+        self.assertEqual(row[4], "Transfer")
+
+    def test_tagger_transfers_keep_their_old_label(self):
+        # Without the matcher, a transfer found by a tagger stays a debt
+        tagged = transaction(0, -30.0)
+        tagged.set_transfer()
+        row = ExpenseFetcherTransaction(
+            tagged, "Checking", "Debt", "Income", "Transfer", "Investment", "%Y/%m/%d"
+        ).to_list()
+        self.assertEqual(row[4], "Debt")
+        self.assertFalse(tagged.is_paired_transfer())
+
+    def test_same_account_is_not_a_transfer(self):
+        refund = [transaction(0, -20.0), transaction(1, 20.0)]
+        self.assertEqual(TransferMatcher().match([("Checking", refund)]), [])
+        self.assertFalse(refund[0].is_transfer())
+
+    def test_each_credit_pairs_once_with_the_closest_debit(self):
+        debits = [transaction(0, -10.0), transaction(3, -10.0)]
+        credits = [transaction(3, 10.0)]
+        pairs = TransferMatcher(window_days=5).find_pairs(
+            [("Checking", debits), ("Card", credits)]
+        )
+        self.assertEqual(len(pairs), 1)
+        self.assertIs(pairs[0].debit, debits[0])
+
+        credits = [transaction(4, 10.0), transaction(1, 10.0)]
+        pairs = TransferMatcher(window_days=5).find_pairs(
+            [("Checking", debits[0:1]), ("Card", credits)]
+        )
+        self.assertEqual(pairs[0].credit.auth_date, START + timedelta(days=1))
+
+    def test_window_edges_across_buckets(self):
+        for window in (0, 1, 3, 7):
+            for gap in range(0, 10):
+                with self.subTest(window=window, gap=gap):
+                    debit = transaction(gap * 3 + 1, -5.0)
+                    credit = transaction(gap * 4 + 1, 5.0)
+                    pairs = TransferMatcher(window).find_pairs(
+                        [("A", [debit]), ("B", [credit])]
+                    )
+                    self.assertEqual(len(pairs), int(gap <= window))
+
+    def test_full_history_is_matched_in_linear_time(self):
+        days = range(20000)
+        checking = [transaction(day % 3650, -(day % 997) - 1.0) for day in days]
+        savings = [transaction(day % 3650 + 1, (day % 997) + 1.0) for day in days]
+        start = time.perf_counter()
+        pairs = TransferMatcher(window_days=2).find_pairs(
+            [("Checking", checking), ("Savings", savings)]
+        )
+        self.assertEqual(len(pairs), 20000)
+        self.assertLess(time.perf_counter() - start, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+"""Tests for the ActivoBank crawler download wait and shared sessions."""
+
+import os
+import tempfile
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.infrastructure.bank_account_transactions_fetchers.active_bank_fetcher_crawler import (
+    ActiveBankCrawler,
+    ActiveBankMainCard,
+)
+from src.infrastructure.bank_account_transactions_fetchers.exceptions import (
+    DownloadTransactionsXlsException,
+)
+
+
+class TestWaitForDownload:
+    def test_returns_file_once_partial_download_is_gone(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            card = ActiveBankMainCard("1234", MagicMock(), MagicMock(), tmpdir)
+            partial = os.path.join(tmpdir, "movements.xlsx.crdownload")
+            open(partial, "w").close()
+
+            def finish_download():
+                os.rename(partial, os.path.join(tmpdir, "movements.xlsx"))
+
+            timer = threading.Timer(0.1, finish_download)
+            timer.start()
+            assert card._wait_for_download(timeout=5, poll_interval=0.01) == "movements.xlsx"
+            timer.join()
+
+    def test_times_out_when_nothing_is_downloaded(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            card = ActiveBankMainCard("1234", MagicMock(), MagicMock(), tmpdir)
+            with pytest.raises(DownloadTransactionsXlsException):
+                card._wait_for_download(timeout=0.05, poll_interval=0.01)
+
+
+class TestGetTransactions:
+    def test_failed_parse_does_not_block_the_next_export(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            card = ActiveBankMainCard("1234", MagicMock(), MagicMock(), tmpdir)
+            # Left behind by an export that was interrupted
+            open(os.path.join(tmpdir, "old.xlsx"), "w").close()
+
+            def download(date_init, date_end):
+                open(os.path.join(tmpdir, "movements.xlsx"), "w").close()
+
+            card._download_transactions_xlsx = download
+            card._get_trx_from_xlsx = MagicMock(side_effect=AssertionError("header"))
+            with pytest.raises(AssertionError):
+                card.getTransactions()
+            assert os.listdir(tmpdir) == []
+
+            card._get_trx_from_xlsx = MagicMock(return_value=[{"Valor": 1}])
+            assert card.getTransactions() == [{"Valor": 1}]
+            card._get_trx_from_xlsx.assert_called_once_with(
+                "movements.xlsx", card.xlsx_props
+            )
+
+
+class TestSharedCrawler:
+    def test_one_browser_per_username(self):
+        def fake_init(self, username, password, tmp_download_dir, get_password, **kwargs):
+            self.username = username
+            self.driver_pool = MagicMock()
+            self._users = 0
+
+        with patch.object(ActiveBankCrawler, "__init__", fake_init):
+            first = ActiveBankCrawler.shared("user", "pw", "/tmp", None)
+            second = ActiveBankCrawler.shared("user", "pw", "/tmp", None)
+            other = ActiveBankCrawler.shared("someone-else", "pw", "/tmp", None)
+
+        assert first is second
+        assert first is not other
+
+        first.release()
+        first.driver_pool.release.assert_not_called()
+        second.release()
+        first.driver_pool.release.assert_called_once_with("user")
+        other.release()
+        assert ActiveBankCrawler._shared == {}
+
+
+class TestLazyStart:
+    def test_browser_starts_on_first_card_lookup(self):
+        pool = MagicMock()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            crawler = ActiveBankCrawler("user", "pw", tmpdir, None, driver_pool=pool)
+            pool.get.assert_not_called()
+
+            with patch.object(ActiveBankCrawler, "_log_in"), patch.object(
+                ActiveBankCrawler, "_ActiveBankCrawler__get_cards", return_value={"1": "card"}
+            ), patch(
+                "src.infrastructure.bank_account_transactions_fetchers.active_bank_fetcher_crawler.WebDriverWait"
+            ):
+                assert crawler.get_card("1") == "card"
+                assert crawler.get_card("1") == "card"
+            pool.get.assert_called_once()
+
+
+class TestWebDriverPool:
+    def test_driver_is_started_once_per_key_and_quit_on_shutdown(self):
+        from src.infrastructure.bank_account_transactions_fetchers.webdriver_pool import (
+            WebDriverPool,
+        )
+
+        factory = MagicMock(side_effect=lambda download_dir, headless: MagicMock())
+        pool = WebDriverPool(driver_factory=factory)
+        driver = pool.get("user", "/tmp")
+        assert pool.get("user", "/tmp") is driver
+        assert factory.call_count == 1
+
+        pool.shutdown()
+        driver.quit.assert_called_once()
+        assert not pool.is_started("user")
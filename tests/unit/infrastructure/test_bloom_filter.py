@@ -0,0 +1,103 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from src.infrastructure.bloom_filter import BloomFilter, KeyFilter
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_no_false_negatives_and_few_false_positives(self):
+        bloom_filter = BloomFilter(capacity=5000, error_rate=0.01)
+        bloom_filter.update(f"stored-{i}" for i in range(5000))
+
+        self.assertTrue(all(f"stored-{i}" in bloom_filter for i in range(5000)))
+        false_positives = sum(f"new-{i}" in bloom_filter for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_round_trip_through_bytes(self):
+        bloom_filter = BloomFilter(capacity=100)
+        bloom_filter.add("a")
+        copy = BloomFilter.from_bytes(bloom_filter.to_bytes())
+        self.assertIn("a", copy)
+        self.assertEqual(
+            (copy.bits, copy.hashes, copy.count),
+            (bloom_filter.bits, bloom_filter.hashes, 1),
+        )
+        with self.assertRaises(Exception):
+            BloomFilter.from_bytes(b"not a filter" * 10)
+
+
+class TestKeyFilter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, "filters", "ledger.bloom")
+
+    def test_needs_a_rebuild_until_built(self):
+        key_filter = KeyFilter(self.path, capacity=100)
+        self.assertIsNone(key_filter.load())
+        key_filter.add(["ignored"])
+        self.assertFalse(os.path.exists(self.path))
+
+        key_filter.rebuild(["a", "b"])
+        self.assertIn("a", KeyFilter(self.path).load())
+
+    def test_old_or_overfull_filters_are_not_used(self):
+        KeyFilter(self.path, capacity=2).rebuild(["a"])
+        self.assertIsNotNone(KeyFilter(self.path).load())
+        self.assertIsNone(KeyFilter(self.path, max_age_hours=0).load())
+
+        key_filter = KeyFilter(self.path)
+        key_filter.load()
+        key_filter.add(["b", "c", "d", "e"])
+        self.assertIsNone(KeyFilter(self.path).load())
+
+    def test_writers_merge_their_keys(self):
+        KeyFilter(self.path).rebuild(["a"])
+        first, second = KeyFilter(self.path), KeyFilter(self.path)
+        first.load()
+        second.load()
+        first.add(["from-first"])
+        second.add(["from-second"])
+
+        merged = KeyFilter(self.path).load()
+        self.assertIn("from-first", merged)
+        self.assertIn("from-second", merged)
+
+    def test_threads_sharing_a_filter_keep_every_key(self):
+        key_filter = KeyFilter(self.path)
+        key_filter.rebuild(["a"])
+        # Switch threads as often as possible to interleave the adds
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+
+        def add(thread):
+            for i in range(50):
+                key_filter.add([f"{thread}-{i}"])
+
+        threads = [threading.Thread(target=add, args=(t,)) for t in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for loaded in (key_filter.load(), KeyFilter(self.path).load()):
+            missing = [
+                f"{t}-{i}" for t in range(4) for i in range(50)
+                if f"{t}-{i}" not in loaded
+            ]
+            self.assertEqual(missing, [])
+
+    def test_rebuilt_filter_keeps_its_age(self):
+        key_filter = KeyFilter(self.path)
+        built_at = key_filter.rebuild(["a"]).built_at
+        time.sleep(0.01)
+        key_filter.add(["b"])
+        self.assertEqual(KeyFilter(self.path).load().built_at, built_at)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from benchmarks.fakes import InMemorySpreadsheet, in_memory_sheet_repository
+from src.infrastructure import metrics
+from src.infrastructure.cache import (
+    Cache,
+    CacheRegistry,
+    DiskBackend,
+    MemoryBackend,
+    SqliteBackend,
+)
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def backends(self):
+        return {
+            "memory": lambda **limits: MemoryBackend(**limits),
+            "disk": lambda **limits: DiskBackend(
+                os.path.join(self.tmp_dir.name, "disk"), **limits
+            ),
+            "sqlite": lambda **limits: SqliteBackend(
+                os.path.join(self.tmp_dir.name, "cache.sqlite"), "test", **limits
+            ),
+        }
+
+    def test_round_trip_returns_independent_copies(self):
+        for name, backend in self.backends().items():
+            with self.subTest(backend=name):
+                cache = Cache(name, backend())
+                cache.set("rows", [["2024-01-01", "COMPRA"]])
+
+                rows = cache.get("rows")
+                rows[0].append("mutated")
+
+                self.assertEqual(cache.get("rows"), [["2024-01-01", "COMPRA"]])
+                self.assertIsNone(cache.get("missing"))
+                self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_expired_entries_are_misses_and_dropped(self):
+        for name, backend in self.backends().items():
+            with self.subTest(backend=name):
+                cache = Cache(name, backend(), ttl_seconds=60)
+                cache.set("balances", {"amount": 1})
+                with mock.patch("time.time", return_value=time.time() + 120):
+                    self.assertIsNone(cache.get("balances"))
+                self.assertEqual(cache.stats().entries, 0)
+
+    def test_max_entries_evicts_least_recently_used(self):
+        for name, backend in self.backends().items():
+            if name == "disk":
+                continue  # evicts by store time, covered below
+            with self.subTest(backend=name):
+                cache = Cache(name, backend(max_entries=2))
+                cache.set("a", 1)
+                cache.set("b", 2)
+                cache.get("a")
+                cache.set("c", 3)
+
+                self.assertEqual(cache.get("a"), 1)
+                self.assertIsNone(cache.get("b"))
+                self.assertEqual(cache.get("c"), 3)
+
+    def test_disk_max_entries_evicts_oldest(self):
+        backend = DiskBackend(os.path.join(self.tmp_dir.name, "disk"), max_entries=2)
+        backend.set("a", 100.0, b"1")
+        backend.set("b", 200.0, b"2")
+        backend.set("c", 300.0, b"3")
+
+        self.assertIsNone(backend.get("a"))
+        self.assertEqual(backend.get("c"), (300.0, b"3"))
+        self.assertEqual(backend.usage(), (2, 2))
+
+    def test_max_bytes_bounds_memory_backend(self):
+        backend = MemoryBackend(max_bytes=10)
+        backend.set("a", 0.0, b"123456")
+        backend.set("b", 0.0, b"123456")
+
+        self.assertIsNone(backend.get("a"))
+        self.assertEqual(backend.usage(), (1, 6))
+
+    def test_sqlite_namespaces_are_cleared_independently(self):
+        path = os.path.join(self.tmp_dir.name, "cache.sqlite")
+        first = Cache("first", SqliteBackend(path, "first"))
+        second = Cache("second", SqliteBackend(path, "second"))
+        first.set("key", "one")
+        second.set("key", "two")
+
+        self.assertEqual(first.invalidate(), 1)
+        self.assertIsNone(first.get("key"))
+        self.assertEqual(second.get("key"), "two")
+
+    def test_get_or_fetch_only_fetches_on_miss(self):
+        cache = Cache("fetch", MemoryBackend())
+        fetch = mock.Mock(return_value=[1, 2])
+
+        self.assertEqual(cache.get_or_fetch("k", fetch), [1, 2])
+        self.assertEqual(cache.get_or_fetch("k", fetch), [1, 2])
+        fetch.assert_called_once_with()
+
+    def test_lookups_are_counted_in_metrics(self):
+        cache = Cache("metrics-test", MemoryBackend())
+        cache.get("k")
+        cache.set("k", 1)
+        cache.get("k")
+
+        rendered = metrics.get_registry().render()
+        self.assertIn('cache="metrics-test",result="hit"} 1', rendered)
+        self.assertIn('cache="metrics-test",result="miss"} 1', rendered)
+
+
+class TestCacheRegistry(unittest.TestCase):
+    def test_create_merges_defaults_and_per_resource_options(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            registry = CacheRegistry()
+            registry.configure(
+                {"backend": "sqlite", "path": os.path.join(tmp_dir, "c.sqlite")}
+            )
+            cache = registry.create("Main", {"ttl_seconds": 30, "max_entries": 5})
+
+            self.assertIsInstance(cache.backend, SqliteBackend)
+            self.assertEqual(cache.ttl_seconds, 30)
+            self.assertEqual(cache.backend.max_entries, 5)
+            self.assertIs(registry.get("Main"), cache)
+
+            memory = registry.create("Other", {"backend": "memory"})
+            self.assertIsInstance(memory.backend, MemoryBackend)
+
+    def test_invalid_options_are_rejected(self):
+        registry = CacheRegistry()
+        with self.assertRaises(Exception):
+            registry.configure({"backend": "redis"})
+        with self.assertRaises(Exception):
+            registry.create("Main", {"ttl": 5})
+
+    def test_invalidate_by_name(self):
+        registry = CacheRegistry()
+        first = registry.create("first", {})
+        second = registry.create("second", {})
+        first.set("k", 1)
+        second.set("k", 2)
+
+        self.assertEqual(registry.invalidate("first"), 1)
+        self.assertIsNone(first.get("k"))
+        self.assertEqual(second.get("k"), 2)
+        with self.assertRaises(Exception):
+            registry.invalidate("unknown")
+
+
+class TestGoogleSheetRepositoryCache(unittest.TestCase):
+    def test_reads_are_cached_until_a_write(self):
+        spreadsheet = InMemorySpreadsheet()
+        repository = in_memory_sheet_repository(spreadsheet)
+        repository.cache = Cache("googlesheet", MemoryBackend())
+
+        repository.get_transactions()
+        repository.get_transactions()
+        self.assertEqual(spreadsheet.requests["get"], 2)  # two tabs, read once
+
+        row = ["2024-01-01", "2024-01-01", "COMPRA", "Main", "", "", "10", "-10"]
+        repository.batch_insert([row], check_duplicates=False)
+        self.assertEqual(len(repository.get_transactions()), 1)
+        self.assertEqual(spreadsheet.requests["get"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
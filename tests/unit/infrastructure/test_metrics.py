@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from src.infrastructure import metrics
+from src.infrastructure.metrics import MetricsRegistry, observe_stages, read_textfiles
+from src.infrastructure.tracing import Tracer
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_counter_renders_labelled_samples(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("fetched_total", "Fetched", ("account",))
+
+        counter.inc(3, account="bank")
+        counter.inc(account="bank")
+
+        self.assertEqual(
+            registry.render(),
+            "# HELP fetched_total Fetched\n"
+            "# TYPE fetched_total counter\n"
+            'fetched_total{account="bank"} 4\n',
+        )
+
+    def test_counter_rejects_wrong_labels_and_decrements(self):
+        counter = MetricsRegistry().counter("fetched_total", "Fetched", ("account",))
+
+        with self.assertRaises(ValueError):
+            counter.inc(repository="sheets")
+        with self.assertRaises(ValueError):
+            counter.inc(-1, account="bank")
+
+    def test_registering_twice_returns_the_same_metric(self):
+        registry = MetricsRegistry()
+
+        first = registry.counter("fetched_total", "Fetched")
+
+        self.assertIs(registry.counter("fetched_total", "Fetched"), first)
+        with self.assertRaises(ValueError):
+            registry.gauge("fetched_total", "Fetched")
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("stage_seconds", "Stages", ("stage",), (1, 5))
+
+        histogram.observe(0.5, stage="http")
+        histogram.observe(3, stage="http")
+
+        lines = registry.render().splitlines()
+        self.assertIn('stage_seconds_bucket{stage="http",le="1"} 1', lines)
+        self.assertIn('stage_seconds_bucket{stage="http",le="5"} 2', lines)
+        self.assertIn('stage_seconds_bucket{stage="http",le="+Inf"} 2', lines)
+        self.assertIn('stage_seconds_sum{stage="http"} 3.5', lines)
+        self.assertIn('stage_seconds_count{stage="http"} 2', lines)
+
+    def test_empty_families_and_other_prefixes_are_not_rendered(self):
+        registry = MetricsRegistry()
+        registry.counter("cron_total", "Never incremented")
+        registry.gauge("onboarding_up", "Up").set(1)
+        registry.gauge("cron_up", "Up").set(1)
+
+        self.assertEqual(
+            registry.render(prefix="onboarding_"),
+            "# HELP onboarding_up Up\n# TYPE onboarding_up gauge\nonboarding_up 1\n",
+        )
+
+    def test_name_prefix_keeps_families_apart_from_other_jobs(self):
+        registry = MetricsRegistry()
+        registry.counter("written_total", "Written", ("account",)).inc(2, account="a")
+        registry.gauge("onboarding_up", "Up").set(1)
+
+        lines = registry.render(name_prefix="onboarding_").splitlines()
+        self.assertIn('onboarding_written_total{account="a"} 2', lines)
+        self.assertIn("# TYPE onboarding_written_total counter", lines)
+        self.assertIn("onboarding_up 1", lines)
+
+    def test_http_failures_are_counted_by_status(self):
+        def response(status_code):
+            return SimpleNamespace(status_code=status_code)
+
+        before = metrics.HTTP_FAILURES.value(client="test", status="503")
+        metrics.count_http_failure("test", response=response(503))
+        metrics.count_http_failure("test", response=response(200))
+        metrics.count_http_failure("test", error=ConnectionError())
+
+        self.assertEqual(
+            metrics.HTTP_FAILURES.value(client="test", status="503") - before, 1
+        )
+        self.assertEqual(
+            metrics.HTTP_FAILURES.value(client="test", status="ConnectionError"), 1
+        )
+
+    def test_observe_stages_from_tracer(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("stage_seconds", "Stages", ("stage",))
+        tracer = Tracer()
+        with tracer.span("pull"):
+            pass
+
+        observe_stages(tracer, histogram)
+
+        self.assertEqual(histogram.count(stage="pull"), 1)
+
+    def test_textfile_round_trip(self):
+        registry = MetricsRegistry()
+        registry.gauge("last_run_success", "Success").set(1)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            registry.write_textfile(os.path.join(tmp_dir, "cron.prom"))
+            with open(os.path.join(tmp_dir, "ignored.txt"), "w") as f:
+                f.write("not metrics")
+
+            self.assertEqual(read_textfiles(tmp_dir), registry.render())
+            self.assertEqual(os.listdir(tmp_dir).count("cron.prom"), 1)
+            self.assertEqual(len(os.listdir(tmp_dir)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
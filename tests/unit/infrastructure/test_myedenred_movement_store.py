@@ -0,0 +1,161 @@
+import json
+import tempfile
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+from src.infrastructure.bank_account_transactions_fetchers.myedenred_fetcher import (
+    MyEdenredCard,
+)
+from src.infrastructure.bank_account_transactions_fetchers.myedenred_movement_store import (
+    MyEdenredMovementStore,
+)
+
+
+def movement(transaction_id, date, name="COMPRA", amount=-5.0):
+    return {
+        "transactionId": transaction_id,
+        "transactionDate": f"{date}T12:00:00.000+0000",
+        "transactionName": name,
+        "amount": amount,
+    }
+
+
+class TestMyEdenredMovementStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_add_returns_only_unseen_movements_and_persists(self):
+        store = MyEdenredMovementStore(self.tmp_dir.name, "1")
+        store.add([movement(2, "2024-01-02"), movement(1, "2024-01-01")])
+        store.save()
+
+        reloaded = MyEdenredMovementStore(self.tmp_dir.name, "1")
+        new = reloaded.add(
+            [
+                movement(3, "2024-01-03"),
+                movement(2, "2024-01-02"),
+                movement(1, "2024-01-01"),
+            ]
+        )
+
+        self.assertEqual([m["transactionId"] for m in new], [3])
+        self.assertEqual([m["transactionId"] for m in reloaded.movements], [3, 2, 1])
+        self.assertEqual(reloaded.newest_transaction_date, "2024-01-03T12:00:00")
+
+    def test_stops_at_seen_movements_older_than_the_newest_date(self):
+        store = MyEdenredMovementStore(self.tmp_dir.name, "1")
+        store.add([movement(2, "2024-01-02"), movement(1, "2024-01-01")])
+
+        # A movement after the first old seen one is never looked at
+        new = store.add(
+            [
+                movement(2, "2024-01-02"),
+                movement(1, "2024-01-01"),
+                movement(0, "2023-12-31"),
+            ]
+        )
+        self.assertEqual(new, [])
+
+        # Seen movements on the newest day do not stop the scan
+        new = store.add([movement(2, "2024-01-02"), movement(4, "2024-01-02")])
+        self.assertEqual([m["transactionId"] for m in new], [4])
+
+    def test_movements_the_api_no_longer_returns_are_pruned(self):
+        store = MyEdenredMovementStore(self.tmp_dir.name, "1")
+        store.add([movement(2, "2024-01-02"), movement(1, "2024-01-01")])
+
+        latest = [movement(3, "2024-01-03"), movement(2, "2024-01-02")]
+        store.add(latest)
+        self.assertEqual(store.prune(latest), 1)
+        self.assertEqual([m["transactionId"] for m in store.movements], [3, 2])
+        # Nothing left to skip: the pruned movement is new if it comes back
+        self.assertEqual(len(store.add([movement(1, "2024-01-01")])), 1)
+
+    def test_movements_without_id_are_identified_by_content(self):
+        first = {
+            "transactionDate": "2024-01-01T10:00:00",
+            "transactionName": "A",
+            "amount": 1,
+        }
+        second = dict(first, amount=2)
+
+        self.assertEqual(
+            MyEdenredMovementStore.movement_id(first),
+            MyEdenredMovementStore.movement_id(dict(first)),
+        )
+        self.assertNotEqual(
+            MyEdenredMovementStore.movement_id(first),
+            MyEdenredMovementStore.movement_id(second),
+        )
+
+
+class TestMyEdenredCardIncremental(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.session = mock.Mock()
+        bank = SimpleNamespace(
+            session=self.session, token="token", cache=None, store_dir=self.tmp_dir.name
+        )
+        card_info = {"id": 7, "number": "1", "ownerName": "Owner", "status": "Active"}
+        self.card = MyEdenredCard(bank, card_info)
+
+    def respond(self, status_code, movements=None, etag=None):
+        text = ""
+        if movements is not None:
+            text = json.dumps({"data": {"account": {}, "movementList": movements}})
+        self.session.get.return_value = SimpleNamespace(
+            status_code=status_code, text=text, headers={"ETag": etag} if etag else {}
+        )
+
+    def test_only_new_movements_are_parsed_and_etag_is_sent(self):
+        self.respond(200, [movement(1, "2024-01-01")], etag='"v1"')
+        self.assertEqual(len(self.card.get_movements()), 1)
+
+        latest = [movement(2, "2024-01-02"), movement(1, "2024-01-01")]
+        self.respond(200, latest, etag='"v2"')
+        with mock.patch.object(
+            MyEdenredCard, "_parse_movement", wraps=MyEdenredCard._parse_movement
+        ) as parse:
+            movements = self.card.get_movements()
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(
+            [m["transactionDate"] for m in movements],
+            [datetime(2024, 1, 2, 12), datetime(2024, 1, 1, 12)],
+        )
+        self.assertEqual(
+            self.session.get.call_args.kwargs["headers"]["If-None-Match"], '"v1"'
+        )
+
+    def test_only_movements_in_the_window_are_parsed(self):
+        self.respond(200, [movement(2, "2024-01-02"), movement(1, "2024-01-01")])
+        self.card.get_movements(datetime(2024, 1, 2))
+
+        # A new process: the store is read back, then served unmodified
+        self.card = MyEdenredCard(self.card.bank, self.card.full_data)
+        self.respond(304)
+        with mock.patch.object(
+            MyEdenredCard, "_parse_movement", wraps=MyEdenredCard._parse_movement
+        ) as parse:
+            movements = self.card.getTransactions(
+                datetime(2024, 1, 2), datetime(2024, 1, 31)
+            )
+        self.assertEqual([m["transactionId"] for m in movements], [2])
+        self.assertEqual(parse.call_count, 1)
+
+    def test_not_modified_serves_the_store(self):
+        self.respond(200, [movement(1, "2024-01-01")], etag='"v1"')
+        self.card.get_movements()
+
+        self.respond(304)
+        movements = self.card.getTransactions(
+            datetime(2024, 1, 1), datetime(2024, 1, 31)
+        )
+        self.assertEqual([m["transactionId"] for m in movements], [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.fakes import (
+    XLSX_COLUMNS,
+    XLSX_HEADER_SKIP_ROWS,
+    synthetic_ledger,
+    write_csv_export,
+    write_ofx_export,
+    write_xlsx_export,
+)
+from src.application.account_manager.xlsx_manual_account_manager import (
+    XlsxManualAccountManager,
+)
+from src.infrastructure.bank_account_transactions_fetchers.statement_backfill import (
+    is_statement_collection,
+    parse_statements,
+    resolve_statement_paths,
+)
+from src.infrastructure.bank_account_transactions_fetchers.statement_transactions_fetcher import (
+    StatementTransactionsFetcher,
+)
+
+
+def statement_fetcher():
+    return StatementTransactionsFetcher(
+        header_skip_rows=XLSX_HEADER_SKIP_ROWS,
+        date_format="%d-%m-%Y",
+        decimal_separator=",",
+        thousands_separator="",
+        columns=XLSX_COLUMNS,
+    )
+
+
+def summary(rows):
+    return [(row["authDate"].date(), row["description"], row["amount"]) for row in rows]
+
+
+class TestStatementBackfill(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.ledger = synthetic_ledger(60)
+        # Three statements whose periods overlap by five movements
+        statements = [
+            ("2020.xlsx", write_xlsx_export, self.ledger[0:25]),
+            ("2021.csv", write_csv_export, self.ledger[20:45]),
+            ("2022.ofx", write_ofx_export, self.ledger[40:60]),
+        ]
+        for name, write, ledger in statements:
+            write(os.path.join(self.tmp_dir.name, name), ledger)
+        with open(os.path.join(self.tmp_dir.name, "notes.txt"), "w") as f:
+            f.write("not a statement")
+
+    def expected(self):
+        return [(r["date"].date(), r["description"], r["amount"]) for r in self.ledger]
+
+    def test_directories_and_globs_are_resolved(self):
+        directory = self.tmp_dir.name
+        self.assertTrue(is_statement_collection(directory))
+        self.assertFalse(is_statement_collection(os.path.join(directory, "2020.xlsx")))
+        self.assertEqual(
+            [os.path.basename(p) for p in resolve_statement_paths(directory)],
+            ["2020.xlsx", "2021.csv", "2022.ofx"],
+        )
+        self.assertEqual(
+            len(resolve_statement_paths(os.path.join(directory, "202[01].*"))), 2
+        )
+        with self.assertRaises(Exception):
+            resolve_statement_paths(os.path.join(directory, "*.qif"))
+
+    def test_overlapping_statements_are_merged_once_in_a_process_pool(self):
+        paths = resolve_statement_paths(self.tmp_dir.name)
+        result = parse_statements(statement_fetcher(), list(reversed(paths)), max_workers=2)
+
+        self.assertEqual(summary(result.rows), self.expected())
+        self.assertEqual(result.duplicates, 10)
+        self.assertEqual(result.files, 3)
+        self.assertEqual(result.closing_balance[0].date(), self.ledger[-1]["date"].date())
+
+    def test_identical_movements_within_a_statement_are_kept(self):
+        repeated = [self.ledger[0], self.ledger[0], self.ledger[1]]
+        first = os.path.join(self.tmp_dir.name, "repeated-a.csv")
+        second = os.path.join(self.tmp_dir.name, "repeated-b.csv")
+        write_csv_export(first, repeated)
+        write_csv_export(second, repeated[1:])
+
+        result = parse_statements(statement_fetcher(), [first, second], max_workers=1)
+        self.assertEqual(len(result.rows), 3)
+        self.assertEqual(result.duplicates, 2)
+
+    def test_manual_account_backfills_from_a_glob(self):
+        account = XlsxManualAccountManager(
+            account_name="Manual",
+            header_skip_rows=XLSX_HEADER_SKIP_ROWS,
+            date_format="%d-%m-%Y",
+            decimal_separator=",",
+            thousands_separator="",
+            columns=XLSX_COLUMNS,
+            remove_transaction_description_prefix=False,
+            taggers=[],
+            prompt_for_file_path=False,
+            file_path=os.path.join(self.tmp_dir.name, "202*"),
+            parse_workers=2,
+        )
+        transactions = account.get_transactions(None, None)
+        self.assertEqual(len(transactions), len(self.ledger))
+        self.assertIsNotNone(account.get_balance())
+
+        previous = account.set_file_path(os.path.join(self.tmp_dir.name, "2022.ofx"))
+        self.assertTrue(previous.endswith("202*"))
+        self.assertEqual(len(account.get_transactions(None, None)), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import io
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from benchmarks.fakes import (
+    XLSX_COLUMNS,
+    XLSX_HEADER_SKIP_ROWS,
+    synthetic_ledger,
+    write_camt053_export,
+    write_csv_export,
+    write_ofx_export,
+    write_xlsx_export,
+)
+from src.infrastructure.bank_account_transactions_fetchers import ofx_transactions_fetcher
+from src.infrastructure.bank_account_transactions_fetchers.statement_source import (
+    detect_statement_format,
+)
+from src.infrastructure.bank_account_transactions_fetchers.statement_transactions_fetcher import (
+    StatementTransactionsFetcher,
+)
+
+WRITERS = {
+    "xlsx": write_xlsx_export,
+    "csv": write_csv_export,
+    "ofx": write_ofx_export,
+    "camt053": write_camt053_export,
+}
+
+
+def statement_fetcher(statement_format="auto"):
+    return StatementTransactionsFetcher(
+        header_skip_rows=XLSX_HEADER_SKIP_ROWS,
+        date_format="%d-%m-%Y",
+        decimal_separator=",",
+        thousands_separator="",
+        columns=XLSX_COLUMNS,
+        statement_format=statement_format,
+    )
+
+
+def summary(rows):
+    return [
+        (row["captureDate"].date(), row["authDate"].date(), row["description"], row["amount"])
+        for row in rows
+    ]
+
+
+class TestStatementFetchers(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.ledger = synthetic_ledger(50)
+        self.paths = dict()
+        for statement_format, write in WRITERS.items():
+            path = os.path.join(self.tmp_dir.name, f"statement.{statement_format}")
+            write(path, self.ledger)
+            self.paths[statement_format] = path
+
+    def read(self, statement_format):
+        with open(self.paths[statement_format], "rb") as f:
+            return f.read()
+
+    def test_formats_are_detected(self):
+        for statement_format in WRITERS:
+            with self.subTest(statement_format):
+                stream = io.BytesIO(self.read(statement_format))
+                self.assertEqual(detect_statement_format(stream), statement_format)
+                self.assertEqual(stream.tell(), 0)
+
+    def test_every_format_gives_the_same_rows(self):
+        expected = [
+            (row["date"].date(), row["date"].date(), row["description"], row["amount"])
+            for row in self.ledger
+        ]
+        fetcher = statement_fetcher()
+        for statement_format in WRITERS:
+            with self.subTest(statement_format):
+                rows = fetcher.getTransactions(file_path=self.paths[statement_format])
+                self.assertEqual(summary(rows), expected)
+
+    def test_date_range_applies_to_every_format(self):
+        date_init, date_end = datetime(2022, 1, 1), datetime(2022, 12, 31)
+        expected = [
+            r for r in self.ledger if date_init.date() <= r["date"].date() <= date_end.date()
+        ]
+        for statement_format in WRITERS:
+            with self.subTest(statement_format):
+                rows = statement_fetcher(statement_format).getTransactions(
+                    date_init=date_init, date_end=date_end, file=self.read(statement_format)
+                )
+                self.assertEqual(len(rows), len(expected))
+
+    def test_statement_closing_balance(self):
+        balance = round(sum(row["amount"] for row in self.ledger), 2)
+        fetcher = statement_fetcher()
+        for statement_format in ("ofx", "camt053"):
+            with self.subTest(statement_format):
+                fetcher.getTransactions(file=self.read(statement_format))
+                date, amount = fetcher.closing_balance
+                self.assertEqual(date.date(), self.ledger[-1]["date"].date())
+                self.assertAlmostEqual(amount, balance, places=2)
+
+    def test_ofx_rows_carry_the_fitid(self):
+        rows = statement_fetcher("ofx").getTransactions(file=self.read("ofx"))
+        self.assertEqual([row["transactionId"] for row in rows[0:3]], ["0", "1", "2"])
+
+    def test_ofx_tags_split_across_chunks(self):
+        with mock.patch.object(ofx_transactions_fetcher, "CHUNK_CHARS", 7):
+            rows = statement_fetcher("ofx").getTransactions(file=self.read("ofx"))
+        self.assertEqual(len(rows), len(self.ledger))
+        self.assertEqual(rows[0]["description"], self.ledger[0]["description"])
+
+    def test_csv_delimiter_is_sniffed(self):
+        tab_separated = self.read("csv").replace(b";", b"\t")
+        semicolon_rows = statement_fetcher("csv").getTransactions(file=self.read("csv"))
+        tab_rows = statement_fetcher("csv").getTransactions(file=tab_separated)
+        self.assertEqual(len(tab_rows), len(self.ledger))
+        self.assertEqual(summary(tab_rows), summary(semicolon_rows))
+
+    def test_unknown_format_is_rejected(self):
+        with self.assertRaises(Exception):
+            statement_fetcher("qif")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from src.infrastructure import tracing
+from src.infrastructure.tracing import Tracer
+
+
+class TestTracer(unittest.TestCase):
+    def test_nested_spans_split_self_time(self):
+        tracer = Tracer()
+
+        with tracer.span("pull", account="bank"):
+            with tracer.span("http"):
+                time.sleep(0.02)
+
+        spans = {span.name: span for span in tracer.spans}
+        self.assertEqual(spans["http"].parent_id, spans["pull"].span_id)
+        self.assertEqual(spans["pull"].attributes, {"account": "bank"})
+        self.assertLess(spans["pull"].self_seconds, spans["http"].duration_seconds)
+        self.assertEqual(tracer.slowest_stages(1)[0].name, "http")
+
+    def test_spans_in_other_threads_are_roots(self):
+        tracer = Tracer()
+
+        def write():
+            with tracer.span("write"):
+                pass
+
+        with tracer.span("push"):
+            worker = threading.Thread(target=write)
+            worker.start()
+            worker.join()
+            with tracer.span("sheets"):
+                pass
+
+        spans = {span.name: span for span in tracer.spans}
+        self.assertEqual(spans["sheets"].parent_id, spans["push"].span_id)
+        self.assertIsNone(spans["write"].parent_id)
+
+    def test_pool_work_wrapped_in_current_span_is_a_child(self):
+        tracer = tracing.reset_tracer()
+
+        def write():
+            with tracer.span("write"):
+                time.sleep(0.02)
+
+        with tracer.span("push"):
+            worker = threading.Thread(target=tracing.in_current_span(write))
+            worker.start()
+            worker.join()
+
+        spans = {span.name: span for span in tracer.spans}
+        self.assertEqual(spans["write"].parent_id, spans["push"].span_id)
+        self.assertLess(spans["push"].self_seconds, 0.02)
+        self.assertEqual(tracer.slowest_stages(1)[0].name, "write")
+
+    def test_only_the_last_spans_are_kept(self):
+        tracer = Tracer(max_spans=10)
+        for _ in range(25):
+            with tracer.span("upload"):
+                pass
+
+        self.assertEqual(len(tracer.spans), 10)
+        self.assertEqual(tracer.dropped_spans, 15)
+        self.assertEqual(tracer.stages()[0].calls, 25)
+
+    def test_failed_span_is_recorded_with_error(self):
+        tracer = Tracer()
+
+        with self.assertRaises(ValueError):
+            with tracer.span("sheets"):
+                raise ValueError("quota")
+
+        self.assertEqual(tracer.spans[0].attributes["error"], "ValueError")
+
+    def test_record_aggregates_calls(self):
+        tracer = Tracer()
+
+        with tracer.span("tagging"):
+            tracer.record("tagger.RegexTagger", 0.5, calls=200)
+            tracer.record("tagger.RegexTagger", 0.25, calls=100)
+
+        stage = tracer.stages()[0]
+        self.assertEqual(stage.name, "tagger.RegexTagger")
+        self.assertEqual(stage.calls, 300)
+        self.assertAlmostEqual(stage.total_seconds, 0.75)
+
+    def test_traced_uses_current_tracer(self):
+        @tracing.traced("fetch")
+        def fetch():
+            return 42
+
+        tracer = tracing.reset_tracer()
+
+        self.assertEqual(fetch(), 42)
+        self.assertEqual([span.name for span in tracer.spans], ["fetch"])
+
+    def test_write_report(self):
+        tracer = Tracer()
+        with tracer.span("run"):
+            pass
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "timing", "report.json")
+            tracer.write_report(path)
+            with open(path) as f:
+                report = json.load(f)
+
+        self.assertEqual(report["stages"][0]["name"], "run")
+        self.assertEqual(report["spans"][0]["calls"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import io
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from openpyxl import Workbook
+
+from src.infrastructure.bank_account_transactions_fetchers.xlsx_transactions_fetcher import (
+    XlsxTransactionsFetcher,
+)
+
+COLUMNS = {
+    "capture_date": "Data Operação",
+    "auth_date": "Data Valor",
+    "description": "Descrição",
+    "debit": "Débito",
+    "credit": "Crédito",
+    "balance": "Saldo",
+}
+
+
+def workbook_bytes(rows, footer=()):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Extrato"])
+    ws.append(list(COLUMNS.values()))
+    for row in rows:
+        ws.append(row)
+    for row in footer:
+        ws.append(row)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def fetcher(footer_skip_rows=0):
+    return XlsxTransactionsFetcher(
+        header_skip_rows=1,
+        date_format="%d-%m-%Y",
+        decimal_separator=",",
+        thousands_separator=" ",
+        columns=COLUMNS,
+        footer_skip_rows=footer_skip_rows,
+    )
+
+
+ROWS = [
+    ["02-01-2024", "02-01-2024", "COMPRA", "10,50", None, "1 000,00"],
+    # Trailing empty cells are not stored by openpyxl
+    ["03-01-2024", "03-01-2024", "SALARIO", None, "2 000,00"],
+]
+
+
+class TestXlsxTransactionsFetcher(unittest.TestCase):
+    def test_bytes_stream_and_path_give_the_same_rows(self):
+        content = workbook_bytes(ROWS)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "movements.xlsx")
+            with open(path, "wb") as f:
+                f.write(content)
+            from_path = fetcher().getTransactions(file_path=path)
+
+        from_bytes = fetcher().getTransactions(file=content)
+        from_stream = fetcher().getTransactions(file=io.BytesIO(content))
+
+        self.assertEqual(from_bytes, from_path)
+        self.assertEqual(from_stream, from_path)
+        self.assertEqual(
+            [(r["authDate"], r["amount"], r["balance"]) for r in from_bytes],
+            [(datetime(2024, 1, 2), -10.5, 1000.0), (datetime(2024, 1, 3), 2000.0, 0.0)],
+        )
+
+    def test_footer_rows_are_skipped_while_streaming(self):
+        content = workbook_bytes(ROWS, footer=[["31-01-2024", None, "Saldo final"]])
+        rows = fetcher(footer_skip_rows=1).getTransactions(file=content)
+        self.assertEqual([r["description"] for r in rows], ["COMPRA", "SALARIO"])
+
+        # Not more data rows than the footer: nothing is skipped
+        content = workbook_bytes(ROWS[:1])
+        rows = fetcher(footer_skip_rows=1).getTransactions(file=content)
+        self.assertEqual([r["description"] for r in rows], ["COMPRA"])
+
+    def test_date_filter_and_missing_source(self):
+        rows = fetcher().getTransactions(
+            date_init=datetime(2024, 1, 3), file=workbook_bytes(ROWS)
+        )
+        self.assertEqual([r["description"] for r in rows], ["SALARIO"])
+        with self.assertRaises(Exception):
+            fetcher().getTransactions()
+
+
+if __name__ == "__main__":
+    unittest.main()
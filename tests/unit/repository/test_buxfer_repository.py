@@ -0,0 +1,157 @@
+"""Tests for the BuxferRepository bulk upload path."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+from src.infrastructure import metrics
+
+from src.repository.buxfer_repository import (
+    ADD_TRANSACTION,
+    BuxferRepository,
+    TransferDefinition,
+    build_transfers_index,
+)
+
+TRANSFER = {
+    "from": {"account_name": "Checking", "description": "To savings", "category": "Transfers"},
+    "to": {"account_name": "Savings", "description": "To savings", "category": "Transfers"},
+}
+
+
+def make_repository(max_workers=1):
+    repository = BuxferRepository.__new__(BuxferRepository)
+    repository.token = "token"
+    repository.max_workers = max_workers
+    repository.accounts_accountsId = {"Checking": 1, "Savings": 2}
+    repository.transfers = [TransferDefinition(TRANSFER)]
+    repository.transfers_index = build_transfers_index(repository.transfers)
+    repository.session = MagicMock()
+    repository.session.post.return_value = MagicMock(status_code=200)
+    return repository
+
+
+def row(account, description, category="Food", trx_type="Debt", amount="-1"):
+    return ["2024-01-01", "2024-01-01", description, account, trx_type, category, "1", amount]
+
+
+class TestTransfersIndex:
+    def test_lookup_by_account_description_category(self):
+        repository = make_repository()
+        definition, is_from, is_to = repository._is_transfer(
+            "Checking", " To savings ", "Transfers"
+        )
+        assert definition is repository.transfers[0]
+        assert (is_from, is_to) == (True, False)
+        assert repository._is_transfer("Savings", "To savings", "Transfers")[1:] == (
+            False,
+            True,
+        )
+
+    def test_unknown_row_is_not_a_transfer(self):
+        repository = make_repository()
+        assert repository._is_transfer("Checking", "Coffee", "Food") == (None, False, False)
+
+
+class TestBatchInsert:
+    def test_only_from_leg_of_transfer_is_posted(self):
+        repository = make_repository()
+        repository.batch_insert(
+            [
+                row("Checking", "To savings", "Transfers"),
+                row("Savings", "To savings", "Transfers", "Income", "1"),
+                row("Checking", "Coffee"),
+            ],
+            check_duplicates=False,
+        )
+        payloads = [call.kwargs["json"] for call in repository.session.post.call_args_list]
+        assert sorted(p["type"] for p in payloads) == ["expense", "transfer"]
+        transfer = next(p for p in payloads if p["type"] == "transfer")
+        assert (transfer["fromAccountId"], transfer["toAccountId"]) == (1, 2)
+
+    def test_concurrent_posting_sends_every_transaction(self):
+        repository = make_repository(max_workers=8)
+        repository.batch_insert(
+            [row("Checking", f"Coffee {i}") for i in range(50)], check_duplicates=False
+        )
+        assert repository.session.post.call_count == 50
+
+
+class TestRetries:
+    def test_posts_are_only_retried_when_not_applied(self):
+        repository = make_repository()
+        repository.max_retries = 3
+        repository._load_session()
+        retry = repository.session.get_adapter(ADD_TRANSACTION).max_retries
+
+        assert retry.is_retry("GET", 502)
+        assert retry.is_retry("POST", 429)
+        # A 502/504 may come after Buxfer added the transaction
+        assert not retry.is_retry("POST", 502)
+        assert not retry.is_retry("POST", 504)
+
+    def test_exhausted_retries_return_the_last_response(self):
+        class BadGateway(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(502)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), BadGateway)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        repository = make_repository()
+        repository.max_retries = 1
+        repository._load_session()
+        before = metrics.HTTP_RETRIES.value(client="buxfer")
+        try:
+            response = repository.session.get(
+                f"http://127.0.0.1:{server.server_port}/accounts"
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert response.status_code == 502
+        # Two attempts, one retry
+        assert metrics.HTTP_RETRIES.value(client="buxfer") - before == 1
+
+
+class TestIterDescriptionCategory:
+    @staticmethod
+    def _page_response(page, page_size=2, total=5):
+        first = (page - 1) * page_size
+        transactions = [
+            {"description": f"trx {i}", "tagNames": [f"cat {i}"]}
+            for i in range(first, min(first + page_size, total))
+        ]
+        body = '{"response": {"numTransactions": "%d", "transactions": %s}}' % (
+            total,
+            str(transactions).replace("'", '"'),
+        )
+        return MagicMock(status_code=200, text=body)
+
+    def test_streams_every_page_in_order(self):
+        repository = make_repository(max_workers=4)
+        repository.session.get.side_effect = lambda url, params: self._page_response(
+            params["page"]
+        )
+        pairs = list(repository.iter_description_category())
+        assert pairs == [(f"trx {i}", f"cat {i}") for i in range(5)]
+        requested_pages = sorted(
+            call.kwargs["params"]["page"] for call in repository.session.get.call_args_list
+        )
+        assert requested_pages == [1, 2, 3]
+
+    def test_feeds_historic_tagger(self):
+        from src.domain.category_taggers.historic_tagger import HistoricTagger
+
+        repository = make_repository()
+        repository.session.get.side_effect = lambda url, params: self._page_response(
+            params["page"]
+        )
+        tagger = HistoricTagger(repository)
+        assert tagger.get_category("trx 3") == "cat 3"
+        assert tagger.get_type("trx 3") == ""
@@ -0,0 +1,150 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from benchmarks.fakes import InMemorySpreadsheet, in_memory_sheet_repository
+from src.application.transactions.expense_fetcher_transaction import (
+    ExpenseFetcherTransaction,
+)
+from src.domain.transactions import (
+    FromListTransaction,
+    NordigenTransaction,
+    number_repeated_transactions,
+)
+from src.infrastructure.bloom_filter import KeyFilter
+
+
+def ledger_row(transaction, account="Main"):
+    return ExpenseFetcherTransaction(
+        transaction, account, "Debt", "Income", "Transfer", "Investment", "%Y/%m/%d"
+    ).to_list()
+
+
+def statement_transaction(description="COMPRA CONTINENTE", amount=-12.5, **kwargs):
+    return FromListTransaction("2024/01/05", "2024/01/05", description, amount, **kwargs)
+
+
+class TestTransactionIds(unittest.TestCase):
+    def test_source_id_is_kept(self):
+        transaction = NordigenTransaction(
+            datetime(2024, 1, 5), datetime(2024, 1, 5), "Coffee", -1.5, "trx-1"
+        )
+        self.assertEqual(transaction.get_transaction_id(), "trx-1")
+        self.assertEqual(ledger_row(transaction)[8], "trx-1")
+
+    def test_content_id_is_deterministic(self):
+        first, second = statement_transaction(), statement_transaction()
+        self.assertEqual(first.get_transaction_id(), second.get_transaction_id())
+        self.assertNotEqual(
+            first.get_transaction_id(),
+            statement_transaction(amount=-12.51).get_transaction_id(),
+        )
+
+
+class TestGoogleSheetRepositoryDuplicates(unittest.TestCase):
+    def setUp(self):
+        self.spreadsheet = InMemorySpreadsheet()
+        self.repository = in_memory_sheet_repository(self.spreadsheet)
+
+    def staged(self):
+        return self.spreadsheet.sheets["Expenses Staging"][1:]
+
+    def test_rows_are_matched_on_account_and_id(self):
+        row = ledger_row(statement_transaction(transaction_id="0012"))
+        self.repository.batch_insert([list(row)])
+        # Written as text so Sheets keeps the leading zeros
+        self.assertEqual(self.staged()[0][8], "'0012")
+
+        renamed = list(row)
+        renamed[2] = "Another description"
+        other_account = ledger_row(
+            statement_transaction(transaction_id="0012"), account="Savings"
+        )
+        self.repository.batch_insert([renamed, other_account])
+        self.assertEqual([r[3] for r in self.staged()], ["Main", "Savings"])
+
+    def test_rows_without_id_fall_back_to_fuzzy_matching(self):
+        legacy = ledger_row(statement_transaction())[:8]
+        self.spreadsheet.sheets["Expenses"].append(legacy)
+
+        self.repository.batch_insert(
+            [
+                ledger_row(statement_transaction("COMPRA CONTINENTE LISBOA")),
+                ledger_row(statement_transaction("PINGO DOCE")),
+            ]
+        )
+        self.assertEqual([r[2] for r in self.staged()], ["PINGO DOCE"])
+
+    def test_edited_description_is_matched_despite_a_new_content_id(self):
+        # Pending, then booked with a longer description (and so a new hash id)
+        self.repository.batch_insert([ledger_row(statement_transaction())])
+        booked = statement_transaction("COMPRA CONTINENTE LISBOA")
+        repeat = statement_transaction("COMPRA CONTINENTE LISBOA")
+        number_repeated_transactions([booked, repeat])
+
+        self.repository.batch_insert([ledger_row(booked)])
+        self.assertEqual(len(self.staged()), 1)
+
+        # A second identical movement is new: the stored row absorbs only one
+        self.repository.batch_insert([ledger_row(booked), ledger_row(repeat)])
+        self.assertEqual(
+            [r[2] for r in self.staged()],
+            ["COMPRA CONTINENTE", "COMPRA CONTINENTE LISBOA"],
+        )
+
+
+class TestGoogleSheetRepositoryKeyFilter(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "ledger.bloom")
+        self.spreadsheet = InMemorySpreadsheet()
+        self.repository = in_memory_sheet_repository(self.spreadsheet)
+        self.repository.key_filter = KeyFilter(self.path)
+        self.spreadsheet.sheets["Expenses"].extend(
+            [
+                ledger_row(statement_transaction(transaction_id="1")),
+                ledger_row(statement_transaction("LEGACY ROW", amount=-3))[:8],
+            ]
+        )
+
+    def staged(self):
+        return [row[2] for row in self.spreadsheet.sheets["Expenses Staging"][1:]]
+
+    def test_ledger_is_read_only_for_possible_duplicates(self):
+        # The first check builds the filter from the ledger. The new rows differ
+        # in amount from the stored ones, so the filter rules them out.
+        self.repository.batch_insert(
+            [ledger_row(statement_transaction("NEW 1", -1, transaction_id="2"))]
+        )
+        reads = self.spreadsheet.requests["get"]
+
+        self.repository.batch_insert(
+            [ledger_row(statement_transaction("NEW 2", -2, transaction_id="3"))]
+        )
+        self.assertEqual(self.spreadsheet.requests["get"], reads)
+
+        self.repository.batch_insert(
+            [
+                ledger_row(statement_transaction("NEW 3", -4, transaction_id="4")),
+                ledger_row(statement_transaction("Renamed", transaction_id="1")),
+                ledger_row(statement_transaction("LEGACY ROW LISBOA", amount=-3)),
+                ledger_row(statement_transaction("NEW 2", -2, transaction_id="3")),
+            ]
+        )
+        self.assertGreater(self.spreadsheet.requests["get"], reads)
+        self.assertEqual(self.staged(), ["NEW 1", "NEW 2", "NEW 3"])
+
+    def test_unchecked_inserts_are_added_to_the_filter(self):
+        self.repository.batch_insert([])
+        row = ledger_row(statement_transaction("NEW", transaction_id="2"))
+        self.repository.batch_insert([list(row)], check_duplicates=False)
+
+        self.repository.key_filter = KeyFilter(self.path)
+        self.repository.batch_insert([list(row)])
+        self.assertEqual(self.staged(), ["NEW"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import pickle
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from src.repository import google_sheets_client
+from src.repository.google_sheets_client import SheetsClient, get_sheets_client
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class FakeCredentials:
+    def __init__(self, expires_in: timedelta):
+        self.refresh_token = "refresh"
+        self.expiry = utcnow() + expires_in
+        self.refreshed = 0
+
+    @property
+    def valid(self):
+        return self.expiry > utcnow()
+
+    def refresh(self, request):
+        self.refreshed += 1
+        self.expiry = utcnow() + timedelta(hours=1)
+
+
+class TestSheetsClient(unittest.TestCase):
+    def setUp(self):
+        google_sheets_client.reset_sheets_clients()
+        self.addCleanup(google_sheets_client.reset_sheets_clients)
+
+    def test_client_is_shared_per_token_cache(self):
+        load_credentials = mock.Mock(return_value=FakeCredentials(timedelta(hours=1)))
+        scopes = ["https://www.googleapis.com/auth/spreadsheets"]
+
+        first = get_sheets_client("token.pickle", scopes, load_credentials)
+        second = get_sheets_client("token.pickle", scopes, load_credentials)
+        other = get_sheets_client("other.pickle", scopes, load_credentials)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(load_credentials.call_count, 2)
+
+    def test_credentials_close_to_expiry_are_refreshed_once_and_saved(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            token_path = os.path.join(tmp_dir, "token.pickle")
+            credentials = FakeCredentials(timedelta(minutes=2))
+            client = SheetsClient(credentials, token_path)
+
+            client.ensure_fresh()
+            client.ensure_fresh()
+
+            self.assertEqual(credentials.refreshed, 1)
+            with open(token_path, "rb") as token:
+                self.assertGreater(pickle.load(token).expiry, utcnow())
+
+    def test_fresh_credentials_are_not_refreshed(self):
+        credentials = FakeCredentials(timedelta(hours=1))
+        SheetsClient(credentials).ensure_fresh()
+        self.assertEqual(credentials.refreshed, 0)
+
+    def test_service_is_built_offline_once_per_thread(self):
+        from google.oauth2.credentials import Credentials
+
+        client = SheetsClient(Credentials(token="token"))
+        resource = client.spreadsheets()
+        self.assertIs(client.spreadsheets(), resource)
+
+        request = client.values().get(spreadsheetId="sheet-id", range="Data!A2:B")
+        self.assertIn("sheets.googleapis.com/v4/spreadsheets/sheet-id", request.uri)
+
+        other_thread = []
+        thread = threading.Thread(
+            target=lambda: other_thread.append(client.spreadsheets())
+        )
+        thread.start()
+        thread.join()
+        self.assertIsNot(other_thread[0], resource)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""Tests for the local outbox and the write-behind repository."""
+
+import os
+import tempfile
+
+import pytest
+
+from src.repository.local_outbox import BALANCES, TRANSACTIONS, LocalOutbox
+from src.repository.write_behind_repository import WriteBehindRepository
+
+
+class FakeRepository:
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.inserted = []
+        self.balances = []
+        self.checks = []
+
+    def batch_insert(self, data, check_duplicates=True):
+        self.checks.append(check_duplicates)
+        if self.failures > 0:
+            self.failures -= 1
+            raise Exception("Sheets unavailable")
+        self.inserted.extend(data)
+
+    def append_balances(self, data):
+        self.balances.extend(data)
+
+    def get_last_transaction_date_for_account(self, account_name):
+        return None
+
+
+@pytest.fixture
+def outbox():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield LocalOutbox(os.path.join(tmpdir, "outbox.sqlite"))
+
+
+ROW = ["2024-01-01", "2024-01-01", "Coffee", "Main", "Debt", "", "1.5", "-1.5"]
+
+
+class TestLocalOutbox:
+    def test_identical_rows_are_all_kept(self, outbox):
+        # Two equal movements in one batch, and a row equal to a flushed one
+        assert outbox.enqueue(TRANSACTIONS, [ROW, ROW]) == 2
+        outbox.mark_flushed([row_id for row_id, _ in outbox.pending(TRANSACTIONS, 10)])
+        assert outbox.enqueue(TRANSACTIONS, [ROW]) == 1
+        assert outbox.pending(TRANSACTIONS, 10)[0][1] == ROW
+
+    def test_rows_failing_max_attempts_are_dead_lettered(self, outbox):
+        outbox.max_attempts = 2
+        outbox.enqueue(TRANSACTIONS, [ROW])
+        ids = [row_id for row_id, _ in outbox.pending(TRANSACTIONS, 10)]
+        assert outbox.record_failure(ids, "bad row") == 0
+        assert outbox.record_failure(ids, "bad row") == 1
+        assert (outbox.pending_count(), outbox.dead_count()) == (0, 1)
+
+        assert outbox.retry_dead() == 1
+        assert (outbox.pending_count(), outbox.dead_count()) == (1, 0)
+
+    def test_mark_flushed_removes_from_pending(self, outbox):
+        outbox.enqueue(TRANSACTIONS, [ROW])
+        (row_id, row), = outbox.pending(TRANSACTIONS, 10)
+        assert row == ROW
+        outbox.mark_flushed([row_id])
+        assert outbox.pending_count() == 0
+
+    def test_rows_survive_reopen(self, outbox):
+        outbox.enqueue(BALANCES, [["2024-01-01", "now", "Main", "10"]])
+        reopened = LocalOutbox(outbox.path)
+        assert reopened.pending_count(BALANCES) == 1
+
+
+class TestWriteBehindRepository:
+    def test_writes_are_queued_until_flush(self, outbox):
+        sink = FakeRepository()
+        repository = WriteBehindRepository(sink, outbox)
+        repository.batch_insert([ROW])
+        repository.append_balances([["2024-01-01", "now", "Main", "10"]])
+        assert sink.inserted == []
+
+        assert repository.flush() is True
+        assert sink.inserted == [ROW]
+        assert len(sink.balances) == 1
+
+    def test_failed_batch_is_retried(self, outbox):
+        sink = FakeRepository(failures=2)
+        repository = WriteBehindRepository(
+            sink, outbox, max_retries=3, retry_backoff_seconds=0
+        )
+        repository.batch_insert([ROW])
+        assert repository.flush() is True
+        assert sink.inserted == [ROW]
+
+    def test_rows_stay_queued_when_retries_are_exhausted(self, outbox):
+        sink = FakeRepository(failures=10)
+        repository = WriteBehindRepository(
+            sink, outbox, max_retries=2, retry_backoff_seconds=0
+        )
+        repository.batch_insert([ROW])
+        assert repository.flush() is False
+        assert repository.pending_count() == 1
+        assert sink.inserted == []
+
+    def test_dead_batch_does_not_block_the_next_ones(self, outbox):
+        sink = FakeRepository(failures=3)
+        outbox.max_attempts = 3
+        repository = WriteBehindRepository(
+            sink, outbox, batch_size=1, max_retries=2, retry_backoff_seconds=0
+        )
+        repository.batch_insert([ROW])
+        repository.batch_insert([["2024-01-02"] + ROW[1:]])
+
+        assert repository.flush() is False
+        assert repository.flush() is True
+        assert sink.inserted == [["2024-01-02"] + ROW[1:]]
+        assert outbox.dead_count(TRANSACTIONS) == 1
+
+    def test_check_duplicates_is_kept_with_the_rows(self, outbox):
+        sink = FakeRepository()
+        repository = WriteBehindRepository(sink, outbox)
+        repository.batch_insert([ROW], check_duplicates=False)
+        repository.batch_insert([ROW])
+
+        assert repository.flush() is True
+        assert sink.inserted == [ROW, ROW]
+        assert sink.checks == [False, True]
+
+    def test_retries_always_check_duplicates(self, outbox):
+        sink = FakeRepository(failures=1)
+        repository = WriteBehindRepository(
+            sink, outbox, max_retries=1, retry_backoff_seconds=0
+        )
+        repository.batch_insert([ROW], check_duplicates=False)
+
+        # Once in this flush and once in the next, as if after a restart
+        assert repository.flush() is False
+        assert repository.flush() is True
+        assert sink.checks == [False, True]
+
+    def test_background_flusher_drains_outbox(self, outbox):
+        sink = FakeRepository()
+        repository = WriteBehindRepository(sink, outbox, flush_interval_seconds=0.01)
+        repository.start()
+        repository.batch_insert([ROW])
+        repository.close(timeout=5)
+        assert sink.inserted == [ROW]
+
+    def test_reads_are_delegated(self, outbox):
+        repository = WriteBehindRepository(FakeRepository(), outbox)
+        assert repository.get_last_transaction_date_for_account("Main") is None
@@ -0,0 +1,96 @@
+import io
+import os
+import pstats
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from unittest.mock import MagicMock
+
+from main import ExpenseFetcherShell
+from src.service.command_profiler import CommandProfiler
+
+
+def hot_path():
+    return sum(i * i for i in range(1000))
+
+
+class TestCommandProfiler(unittest.TestCase):
+    def test_run_accumulates_stats_per_command(self):
+        profiler = CommandProfiler(top=5)
+
+        result, report = profiler.run("pull", hot_path)
+        profiler.run("pull", hot_path)
+
+        self.assertEqual(result, hot_path())
+        self.assertIn("hot_path", report)
+        self.assertEqual(list(profiler.stats), ["pull"])
+        calls = [
+            stats[0]
+            for func, stats in profiler.stats["pull"].stats.items()
+            if func[2] == "hot_path"
+        ]
+        self.assertEqual(calls, [2])
+
+    def test_threads_started_by_the_command_are_profiled(self):
+        def push():
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                return [f.result() for f in [executor.submit(hot_path)] * 2]
+
+        _, report = CommandProfiler(top=50).run("push", push)
+        self.assertIn("hot_path", report)
+
+    def test_threads_outliving_the_command_stop_being_profiled(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        profiler = CommandProfiler()
+
+        profiler.run("push", lambda: executor.submit(hot_path).result())
+        for _ in range(3):
+            executor.submit(hot_path).result()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profiler.dump(tmp_dir)
+        self.assertEqual(profiler.pending, [])
+        calls = [
+            stats[0]
+            for func, stats in profiler.stats["push"].stats.items()
+            if func[2] == "hot_path"
+        ]
+        self.assertEqual(calls, [1])
+
+    def test_dump_writes_one_file_per_command(self):
+        profiler = CommandProfiler()
+        profiler.run("pull", hot_path)
+        profiler.run("push", hot_path)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            written = profiler.dump(os.path.join(tmp_dir, "profiles"))
+
+            self.assertEqual(sorted(written), ["pull", "push"])
+            pstats.Stats(written["pull"])
+
+    def test_enable_rejects_unknown_sort(self):
+        with self.assertRaises(Exception):
+            CommandProfiler().enable(sort="random")
+
+
+class TestShellProfiling(unittest.TestCase):
+    def test_commands_are_profiled_only_when_enabled(self):
+        expense_fetcher = MagicMock()
+        shell = ExpenseFetcherShell(expense_fetcher)
+
+        with redirect_stdout(io.StringIO()) as output:
+            shell.onecmd("sort")
+            shell.onecmd("profile on top=3")
+            shell.onecmd("sort")
+            shell.onecmd("profile off")
+            shell.onecmd("sort")
+
+        self.assertEqual(expense_fetcher.sort_transactions.call_count, 3)
+        self.assertEqual(output.getvalue().count("--- profile: sort ---"), 1)
+        self.assertEqual(list(shell.profiler.stats), ["sort"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+"""Tests for the lazy account and repository proxies."""
+
+from unittest.mock import MagicMock
+
+from src.service.configuration.lazy_proxies import LazyAccountManager, LazyRepository
+
+
+class TestLazyRepository:
+    def test_factory_runs_on_first_use_only(self):
+        repository = MagicMock()
+        factory = MagicMock(return_value=repository)
+        lazy = LazyRepository("googlesheet", factory)
+        factory.assert_not_called()
+
+        lazy.get_last_transaction_date_for_account("Main")
+        lazy.get_transactions()
+        factory.assert_called_once()
+        repository.get_last_transaction_date_for_account.assert_called_once_with("Main")
+
+    def test_close_does_not_connect(self):
+        factory = MagicMock()
+        LazyRepository("googlesheet", factory).close()
+        factory.assert_not_called()
+
+
+class TestLazyAccountManager:
+    def test_account_names_are_forwarded_when_built(self):
+        account_manager = MagicMock()
+        account_manager.get_transactions.return_value = []
+        factory = MagicMock(return_value=account_manager)
+        lazy = LazyAccountManager("Main", factory)
+
+        lazy.set_accounts(["Main", "Savings"])
+        factory.assert_not_called()
+
+        assert lazy.get_transactions(None, None, True) == []
+        account_manager.set_accounts.assert_called_once_with(["Main", "Savings"])
+        account_manager.get_transactions.assert_called_once_with(None, None, True)
+
+    def test_close_only_closes_built_accounts(self):
+        account_manager = MagicMock()
+        lazy = LazyAccountManager("Main", MagicMock(return_value=account_manager))
+        lazy.close()
+        account_manager.close.assert_not_called()
+
+        lazy.get_balance()
+        lazy.close()
+        account_manager.close.assert_called_once()
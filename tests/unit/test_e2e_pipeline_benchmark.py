@@ -0,0 +1,36 @@
+import sys
+import unittest
+from unittest.mock import patch
+
+from benchmarks.e2e_pipeline import main, parse_sizes, run_size
+
+
+class TestEndToEndPipelineBenchmark(unittest.TestCase):
+    def test_parse_sizes(self):
+        self.assertEqual(parse_sizes("1k, 250,2M"), [1_000, 250, 2_000_000])
+
+    def test_full_scale_reaches_a_million_rows(self):
+        with patch.object(sys, "argv", ["e2e_pipeline.py", "--full-scale"]), patch(
+            "benchmarks.e2e_pipeline.run_size", return_value={}
+        ) as run_size_mock, patch("benchmarks.e2e_pipeline.print_result"):
+            main()
+
+        sizes = [call.args[0] for call in run_size_mock.call_args_list]
+        self.assertEqual(sizes, [1_000, 10_000, 100_000, 1_000_000])
+
+    def test_small_run_pulls_dedups_and_pushes(self):
+        result = run_size(rows=40, accounts=1, overlap=0.5, measure_memory=False)
+
+        self.assertEqual(result["staged"], 40)
+        self.assertEqual(result["seeded"], 20)
+        self.assertEqual(result["written"], 20)
+        self.assertEqual(result["errors"], {})
+        self.assertEqual(
+            result["requests"]["gocardless"], {"balances": 1, "transactions": 1}
+        )
+        self.assertEqual(result["requests"]["token"], 2)
+        self.assertIn("duplicate_detection", result["stages"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import pytest
+
+from benchmarks.import_budget import (
+    BUDGETS,
+    HEAVY_MODULES,
+    heavy_modules_imported,
+    measure_import,
+)
+
+# Headroom over the -X importtime budgets in benchmarks/import_budget.py for
+# slow or loaded test machines; the benchmark itself runs them unscaled
+IMPORT_BUDGET_SCALE = 2.0
+
+
+class TestImportBudget:
+    def test_heavy_modules_imported_matches_submodules_only(self):
+        imported = {"google.auth.transport", "googleapiclientx", "yaml", "json"}
+
+        assert heavy_modules_imported(imported, HEAVY_MODULES) == [
+            "google.auth.transport",
+            "yaml",
+        ]
+
+    @pytest.mark.parametrize("budget", BUDGETS, ids=lambda budget: budget.module)
+    def test_entry_point_starts_within_budget(self, budget):
+        elapsed_ms, imported = measure_import(budget.module, runs=1)
+
+        assert heavy_modules_imported(imported, budget.forbidden) == []
+        assert elapsed_ms <= budget.max_ms * IMPORT_BUDGET_SCALE
@@ -0,0 +1,265 @@
+import importlib.util
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+
+import yaml
+
+from benchmarks.fakes import InMemorySpreadsheet, in_memory_sheet_repository
+from src.infrastructure.bloom_filter import KeyFilter
+
+APP_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "tools",
+    "nordigen_onboarding_web",
+    "app.py",
+)
+
+
+def load_app_module():
+    spec = importlib.util.spec_from_file_location("onboarding_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+CONFIG = {
+    "accounts": {"Main": {"type": "xlsx-manual", "columns": {}}},
+    "repositories": {"googlesheet": {"spreadsheet_id": "sheet"}},
+}
+
+
+class TestOnboardingAppCache(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.config_path = os.path.join(self.tmp_dir.name, "config.yaml")
+        self.write_config(CONFIG)
+        self.module.state.config_file = self.config_path
+
+        self.spreadsheet = InMemorySpreadsheet(
+            {
+                "Data": [["Main", "2024-01-02"]],
+                "Expenses": [["header"], self.row("2024-01-02")],
+                "Expenses Staging": [["header"]],
+            }
+        )
+        self.built = 0
+
+        def repository_factory(**repo_config):
+            self.built += 1
+            return in_memory_sheet_repository(self.spreadsheet)
+
+        self.app_cache = self.module.app_cache
+        self.app_cache.repository_factory = repository_factory
+
+    @staticmethod
+    def row(date):
+        return [date, date, "COMPRA", "Main", "", "", "10", "-10"]
+
+    def write_config(self, config):
+        with open(self.config_path, "w") as f:
+            yaml.safe_dump(config, f)
+
+    def test_config_is_parsed_again_only_when_the_file_changes(self):
+        first = self.app_cache.config(self.config_path)
+        first["accounts"].clear()
+        self.assertIn("Main", self.app_cache.config(self.config_path)["accounts"])
+
+        changed = dict(CONFIG, accounts={"Other": {"type": "xlsx-manual"}})
+        self.write_config(changed)
+        self.app_cache.invalidate_config()
+        self.assertIn("Other", self.app_cache.config(self.config_path)["accounts"])
+
+    def test_repository_is_reused_until_its_config_changes(self):
+        config = self.app_cache.config(self.config_path)
+        repository = self.app_cache.repository(config)
+        self.assertIs(self.app_cache.repository(config), repository)
+
+        config["repositories"]["googlesheet"]["spreadsheet_id"] = "other"
+        self.assertIsNot(self.app_cache.repository(config), repository)
+        self.assertEqual(self.built, 2)
+
+    def test_last_sync_reads_the_sheet_once_until_a_push(self):
+        client = self.module.app.test_client()
+        url = "/api/manual/accounts/Main/last_sync"
+
+        self.app_cache.warm()
+        reads = self.spreadsheet.requests["get"]
+        for _ in range(3):
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.get_json()["transactions"]), 1)
+        self.assertEqual(self.spreadsheet.requests["get"], reads)
+
+        repository = self.app_cache.repository(self.app_cache.config(self.config_path))
+        repository.batch_insert([self.row("2024-01-03")], check_duplicates=False)
+        client.get(url)
+        self.assertGreater(self.spreadsheet.requests["get"], reads)
+
+    def test_upload_dedup_sees_rows_written_by_another_process(self):
+        self.app_cache.warm()
+        # e.g. the cron job, after the ledger was cached
+        self.spreadsheet.sheets["Expenses Staging"].append(self.row("2024-01-03"))
+
+        repository = self.app_cache.repository(self.app_cache.config(self.config_path))
+        repository.batch_insert([self.row("2024-01-03")], check_duplicates=True)
+        self.assertEqual(len(self.spreadsheet.sheets["Expenses Staging"]), 2)
+
+
+class FakeXlsxFetcher:
+    """Stands in for StatementTransactionsFetcher; `before_parse` runs inside the job."""
+
+    before_parse = staticmethod(lambda: None)
+
+    def __init__(self, **kwargs):
+        pass
+
+    def getTransactions(self, date_init, date_end, file):
+        self.before_parse()
+        return [
+            {
+                "captureDate": datetime(2024, 1, 5),
+                "authDate": datetime(2024, 1, 5),
+                "description": "COMPRA",
+                "amount": -10.0,
+            }
+        ]
+
+
+class TestOnboardingUploadJobs(unittest.TestCase):
+    def setUp(self):
+        self.module = load_app_module()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        config_path = os.path.join(self.tmp_dir.name, "config.yaml")
+        config = dict(
+            CONFIG,
+            accounts={
+                "Main": {"type": "xlsx-manual", "columns": {}},
+                "Savings": {"type": "xlsx-manual", "columns": {}},
+            },
+        )
+        with open(config_path, "w") as f:
+            yaml.safe_dump(config, f)
+        self.config_path = config_path
+        self.module.state.config_file = config_path
+
+        self.spreadsheet = InMemorySpreadsheet(
+            {"Data": [], "Expenses": [["header"]], "Expenses Staging": [["header"]]}
+        )
+        self.pushed = []
+
+        def repository_factory(**repo_config):
+            repository = in_memory_sheet_repository(self.spreadsheet)
+            repository.batch_insert = lambda rows, check_duplicates: self.pushed.extend(
+                rows
+            )
+            return repository
+
+        self.module.app_cache.repository_factory = repository_factory
+        self.fetcher = type("Fetcher", (FakeXlsxFetcher,), {})
+        self.module.StatementTransactionsFetcher = self.fetcher
+        self.client = self.module.app.test_client()
+
+    def upload(self, account_name):
+        response = self.client.post(
+            f"/api/manual/accounts/{account_name}/upload",
+            data={"file": (io.BytesIO(b"xlsx"), "movements.xlsx")},
+            content_type="multipart/form-data",
+        )
+        self.assertEqual(response.status_code, 202)
+        return response.get_json()
+
+    def wait(self, job):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            data = self.client.get(job["status_url"]).get_json()
+            if data["status"] in ("succeeded", "failed"):
+                return data
+            time.sleep(0.01)
+        self.fail(f"Job {job['job_id']} did not finish")
+
+    def test_upload_returns_a_job_that_pushes_in_the_background(self):
+        job = self.upload("Main")
+        self.assertIn(job["status"], ("queued", "running"))
+
+        result = self.wait(job)
+        self.assertEqual(result["status"], "succeeded", result["error"])
+        self.assertEqual(result["transaction_count"], 1)
+        self.assertEqual([row[3] for row in self.pushed], ["Main"])
+        self.assertEqual(len(self.pushed[0]), 9)
+
+        events = self.client.get(job["events_url"]).get_data(as_text=True)
+        self.assertIn('"status": "succeeded"', events)
+
+    def test_uploads_for_different_accounts_run_at_the_same_time(self):
+        barrier = threading.Barrier(2, timeout=5)
+        self.fetcher.before_parse = staticmethod(barrier.wait)
+
+        jobs = [self.upload("Main"), self.upload("Savings")]
+        results = [self.wait(job) for job in jobs]
+
+        self.assertEqual([r["status"] for r in results], ["succeeded", "succeeded"])
+
+    def test_uploads_use_the_configured_key_filter(self):
+        filter_path = os.path.join(self.tmp_dir.name, "ledger.bloom")
+        with open(self.config_path) as f:
+            config = yaml.safe_load(f)
+        config["repositories"]["googlesheet"]["key_filter"] = {"path": filter_path}
+        with open(self.config_path, "w") as f:
+            yaml.safe_dump(config, f)
+        self.module.app_cache.invalidate_config()
+
+        def repository_factory(**repo_config):
+            repository = in_memory_sheet_repository(self.spreadsheet)
+            repository.key_filter = repo_config["key_filter"]
+            return repository
+
+        self.module.app_cache.repository_factory = repository_factory
+        for _ in range(2):
+            result = self.wait(self.upload("Main"))
+            self.assertEqual(result["status"], "succeeded", result["error"])
+
+        staged = self.spreadsheet.sheets["Expenses Staging"][1:]
+        self.assertEqual([row[2] for row in staged], ["COMPRA"])
+        # Shared with the cron job, which sees the uploaded row without a rebuild
+        self.assertIn(
+            "id|Main|" + staged[0][8].lstrip("'"),
+            KeyFilter(filter_path).load(),
+        )
+
+    def test_metrics_include_the_uploads_pipeline_counters(self):
+        self.module.app_cache.repository_factory = lambda **repo_config: (
+            in_memory_sheet_repository(self.spreadsheet)
+        )
+        result = self.wait(self.upload("Main"))
+        self.assertEqual(result["status"], "succeeded", result["error"])
+
+        body = self.client.get("/metrics").get_data(as_text=True)
+        self.assertIn(
+            "onboarding_expenses_fetcher_transactions_written_total"
+            '{repository="googlesheet",account="Main"}',
+            body,
+        )
+        self.assertIn("onboarding_request_duration_seconds", body)
+        self.assertNotIn("\nexpenses_fetcher_", body)
+
+    def test_failed_job_reports_the_error(self):
+        def fail():
+            raise ValueError("bad workbook")
+
+        self.fetcher.before_parse = staticmethod(fail)
+        result = self.wait(self.upload("Main"))
+        self.assertEqual(result["status"], "failed")
+        self.assertEqual(result["error"], "bad workbook")
+        self.assertEqual(self.client.get("/api/jobs/unknown").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
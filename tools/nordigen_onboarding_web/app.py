@@ -2,17 +2,22 @@
 # Run: python tools/nordigen_onboarding_web/app.py --config-file config/your.yaml --port 8787
 
 import argparse
+import copy
+import io
 import os
 import sys
 import json
 import logging
-import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from urllib.parse import urlencode
 
 import requests
 import yaml
-from flask import Flask, request, jsonify, send_from_directory, redirect
+from flask import Flask, Request, request, jsonify, send_from_directory, redirect, g, Response
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
 log = logging.getLogger(__name__)
@@ -21,13 +26,36 @@ log = logging.getLogger(__name__)
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.repository.google_sheet_repository import GoogleSheetRepository
-from src.infrastructure.bank_account_transactions_fetchers.xlsx_transactions_fetcher import XlsxTransactionsFetcher
+from src.domain.transactions.i_transaction import content_transaction_id
+from src.infrastructure.bank_account_transactions_fetchers.statement_transactions_fetcher import StatementTransactionsFetcher
+from src.infrastructure import metrics
+from src.infrastructure.cache import Cache, MemoryBackend
+from src.infrastructure.bloom_filter import KeyFilter
 
 # Constants
 BASE_URL = "https://bankaccountdata.gocardless.com/api/v2"
 REDIRECT_PATH = "/callback"
 
+MAX_UPLOAD_BYTES = int(os.environ.get("ONBOARDING_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+
+
+class InMemoryUploadRequest(Request):
+    """Keeps uploaded files in memory; werkzeug spools the larger ones to a temp file."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+
 app = Flask(__name__, static_folder="static", static_url_path="/static")
+app.request_class = InMemoryUploadRequest
+# Bounds what InMemoryUploadRequest holds in memory
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+
+REQUEST_DURATION = metrics.get_registry().histogram(
+    "onboarding_request_duration_seconds",
+    "Onboarding web app request duration",
+    ("endpoint", "method", "status"),
+)
 
 
 class WizardState:
@@ -47,11 +75,239 @@ class WizardState:
 state = WizardState()
 
 
+LEDGER_TTL_SECONDS = float(os.environ.get("ONBOARDING_LEDGER_TTL_SECONDS", "600"))
+
+
+class AppCache:
+    """
+    Keeps the parsed config until the config file changes (mtime and size) and
+    one warm GoogleSheetRepository whose reads (ledger, last sync dates) are
+    served from memory. The repository drops its cached reads on every write,
+    so a push invalidates the ledger snapshot; `warm_in_background` reloads it.
+    Duplicate detection reads the ledger from the sheet regardless, as other
+    processes may have written to it since the snapshot.
+    """
+
+    def __init__(self, ledger_ttl_seconds: float = LEDGER_TTL_SECONDS):
+        self.ledger_ttl_seconds = ledger_ttl_seconds
+        self.repository_factory = GoogleSheetRepository
+        self._lock = threading.Lock()
+        self._config = None
+        self._config_stamp = None
+        self._repository = None
+        self._repository_config = None
+
+    def config(self, path):
+        stat = os.stat(path)
+        stamp = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if stamp != self._config_stamp:
+                with open(path, "r") as f:
+                    self._config = yaml.safe_load(f) or {}
+                self._config_stamp = stamp
+                log.info(f"Loaded config {path}")
+            # Handlers edit and write back what they get; keep the cached one intact
+            return copy.deepcopy(self._config)
+
+    def invalidate_config(self):
+        with self._lock:
+            self._config_stamp = None
+
+    def repository(self, config):
+        repo_config = dict(config.get("repositories", {}).get("googlesheet") or {})
+        if not repo_config:
+            raise ValueError("No googlesheet repository configured")
+        # Options handled by the configuration parser, not by the repository
+        repo_config.pop("write_behind", None)
+        repo_config.pop("cache", None)
+        with self._lock:
+            if self._repository is None or repo_config != self._repository_config:
+                options = dict(repo_config)
+                if options.get("key_filter"):
+                    # The same file as the cron job's: uploads add their keys to it
+                    options["key_filter"] = KeyFilter.from_config(options["key_filter"])
+                else:
+                    options.pop("key_filter", None)
+                repository = self.repository_factory(**options)
+                repository.cache = Cache(
+                    "onboarding_googlesheet", MemoryBackend(), self.ledger_ttl_seconds
+                )
+                self._repository = repository
+                self._repository_config = repo_config
+            return self._repository
+
+    def warm(self):
+        """Build the repository and load the ledger and last sync dates."""
+        repository = self.repository(self.config(state.config_file))
+        repository.get_transactions()
+        repository.get_data(f"{repository.metadata_sheet_name}!A2:B")
+
+    def warm_in_background(self):
+        def run():
+            try:
+                self.warm()
+            except Exception as e:
+                log.warning(f"Could not warm the Google Sheets cache: {e}")
+
+        threading.Thread(target=run, name="warm-ledger", daemon=True).start()
+
+
+app_cache = AppCache()
+
+
+UPLOAD_WORKERS = int(os.environ.get("ONBOARDING_UPLOAD_WORKERS", "4"))
+FINISHED_JOBS_KEPT = 100
+
+
+class UploadJob:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    def __init__(self, account_name, filename):
+        self.id = uuid.uuid4().hex
+        self.account_name = account_name
+        self.filename = filename
+        self.status = self.QUEUED
+        self.stage = None
+        self.message = None
+        self.transaction_count = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        # Bumped on every change, lets event streams wait for the next one
+        self.version = 0
+
+    @property
+    def finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "account_name": self.account_name,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "message": self.message,
+            "transaction_count": self.transaction_count,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class UploadJobQueue:
+    """
+    In-process worker pool for uploads plus the table of their jobs.
+
+    Uploads for different accounts run in parallel; uploads for the same
+    account run one after the other, so each duplicate check sees the rows the
+    previous one pushed. Only the last FINISHED_JOBS_KEPT finished jobs are kept.
+    """
+
+    def __init__(self, max_workers=UPLOAD_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._jobs = dict()
+        self._account_locks = dict()
+        self._changed = threading.Condition()
+
+    def submit(self, account_name, filename, work):
+        """Queue `work(job)` and return the job at once."""
+        job = UploadJob(account_name, filename)
+        with self._changed:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="upload"
+                )
+            self._jobs[job.id] = job
+            account_lock = self._account_locks.setdefault(account_name, threading.Lock())
+            self._prune()
+        self._executor.submit(self._run, job, account_lock, work)
+        return job
+
+    def _run(self, job, account_lock, work):
+        with account_lock:
+            self.update(job, status=UploadJob.RUNNING)
+            try:
+                result = work(job) or {}
+            except Exception as e:
+                log.exception(f"Upload job {job.id} for {job.account_name} failed")
+                self.update(job, status=UploadJob.FAILED, error=str(e), finished_at=time.time())
+            else:
+                self.update(job, status=UploadJob.SUCCEEDED, finished_at=time.time(), **result)
+
+    def update(self, job, **fields):
+        with self._changed:
+            for name, value in fields.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._changed.notify_all()
+
+    def get(self, job_id):
+        with self._changed:
+            return self._jobs.get(job_id)
+
+    def list(self, account_name=None):
+        with self._changed:
+            jobs = [job for job in self._jobs.values() if account_name in (None, job.account_name)]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def wait(self, job, version, timeout):
+        """Block until `job` changes past `version` or `timeout`; return the job dict and version."""
+        with self._changed:
+            self._changed.wait_for(lambda: job.version != version, timeout=timeout)
+            return job.to_dict(), job.version
+
+    def _prune(self):
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished),
+            key=lambda job: job.finished_at,
+        )
+        for job in finished[: max(0, len(finished) - FINISHED_JOBS_KEPT)]:
+            del self._jobs[job.id]
+
+
+upload_jobs = UploadJobQueue()
+
+
 def load_config():
     if not state.config_file:
         raise ValueError("Wizard not initialized with config_file")
-    with open(state.config_file, "r") as f:
-        return yaml.safe_load(f) or {}
+    return app_cache.config(state.config_file)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request_duration(response):
+    started = g.pop("request_started", None)
+    if started is not None and request.endpoint != "metrics_endpoint":
+        REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            endpoint=request.endpoint or "unknown",
+            method=request.method,
+            status=str(response.status_code),
+        )
+    return response
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """
+    Prometheus scrape target: this app's metrics plus the textfiles the cron
+    runner and re-auth poller write into METRICS_TEXTFILE_DIR. The pipeline
+    metrics updated by uploads (e.g. transactions written and deduplicated)
+    are served as onboarding_expenses_fetcher_*, apart from the cron job's.
+    """
+    body = metrics.get_registry().render(name_prefix="onboarding_")
+    body += metrics.read_textfiles(os.environ.get("METRICS_TEXTFILE_DIR"))
+    return Response(body, mimetype=None, content_type=metrics.CONTENT_TYPE)
 
 
 @app.route("/")
@@ -314,6 +570,7 @@ def api_config_write():
         return jsonify({"error": "Wizard not initialized with config_file"}), 400
     with open(state.config_file, "w") as f:
         f.write(preview)
+    app_cache.invalidate_config()
     return jsonify({"ok": True, "path": state.config_file})
 
 
@@ -349,6 +606,7 @@ def setup_google_sheets():
 
     with open(state.config_file, "w") as f:
         yaml.safe_dump(config, f)
+    app_cache.invalidate_config()
 
     return jsonify({"ok": True, "path": state.config_file})
 
@@ -379,6 +637,7 @@ def import_accounts():
 
     with open(state.config_file, "w") as f:
         yaml.safe_dump(config, f)
+    app_cache.invalidate_config()
 
     return jsonify({"ok": True, "accounts_added": account_ids})
 
@@ -388,12 +647,8 @@ def import_accounts():
 # =============================================================================
 
 def get_google_sheet_repository():
-    """Build GoogleSheetRepository from config."""
-    config = load_config()
-    repo_config = config.get("repositories", {}).get("googlesheet")
-    if not repo_config:
-        raise ValueError("No googlesheet repository configured")
-    return GoogleSheetRepository(**repo_config)
+    """The warm GoogleSheetRepository for the current config."""
+    return app_cache.repository(load_config())
 
 
 @app.route("/manual")
@@ -450,8 +705,8 @@ def api_manual_account_last_sync(account_name):
 
         log.info(f"Searching for account_name={account_name}, last_date_str={last_date_str}, total_transactions={len(all_transactions)}")
 
-        # Schema from Expenses sheet: [DateCapture, DateAuth, Description, Account, Type, Category, ?, Amount]
-        # Indexes:                        0           1          2          3       4       5      6    7
+        # Schema from Expenses sheet: [DateCapture, DateAuth, Description, Account, Type, Category, AbsAmount, Amount, Id]
+        # Indexes:                        0           1          2          3       4       5        6         7     8
         transactions_on_date = []
         for t in all_transactions:
             if len(t) > 3 and t[3] == account_name:
@@ -479,7 +734,7 @@ def api_manual_account_last_sync(account_name):
 
 @app.route("/api/manual/accounts/<account_name>/upload", methods=["POST"])
 def api_manual_account_upload(account_name):
-    """Upload and process XLSX file for a manual account."""
+    """Queue an XLSX file of a manual account for processing; returns the job at once."""
     if not state.config_file:
         return jsonify({"error": "Wizard not initialized with config_file"}), 400
 
@@ -500,75 +755,142 @@ def api_manual_account_upload(account_name):
     if account_config.get("type") != "xlsx-manual":
         return jsonify({"error": f"Account '{account_name}' is not an xlsx-manual type"}), 400
 
+    # Read into memory: the request stream is gone once the request returns
+    content = file.read()
+
+    job = upload_jobs.submit(
+        account_name,
+        file.filename,
+        lambda job: process_upload(job, account_name, account_config, content),
+    )
+    return jsonify({
+        **job.to_dict(),
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events",
+    }), 202
+
+
+def process_upload(job, account_name, account_config, content):
+    """Parse the uploaded XLSX bytes and push its new transactions; runs on an upload worker."""
+    # Parse the statement (XLSX, CSV, OFX or CAMT.053) using existing fetchers
+    fetcher = StatementTransactionsFetcher(
+        header_skip_rows=account_config.get("header_skip_rows", 8),
+        date_format=account_config.get("date_format", "%d-%m-%Y"),
+        decimal_separator=account_config.get("decimal_separator", ","),
+        thousands_separator=account_config.get("thousands_separator", " "),
+        columns=account_config.get("columns", {}),
+        sheet_name=account_config.get("sheet_name"),
+        footer_skip_rows=account_config.get("footer_skip_rows", 0),
+        statement_format=account_config.get("format", "auto"),
+        delimiter=account_config.get("delimiter"),
+        encoding=account_config.get("encoding"),
+    )
+
+    # Get last sync date to filter new transactions
+    upload_jobs.update(job, stage="last_sync")
+    repo = get_google_sheet_repository()
+    last_date = repo.get_last_transaction_date_for_account(account_name)
+
+    # Fetch transactions from the file (filter by date if we have a last sync)
+    upload_jobs.update(job, stage="parsing")
+    raw_transactions = fetcher.getTransactions(
+        date_init=last_date,
+        date_end=None,
+        file=content,
+    )
+
+    if not raw_transactions:
+        return {
+            "message": "No new transactions found in file",
+            "transaction_count": 0,
+        }
+
+    # Convert to the format expected by GoogleSheetRepository
+    # Schema: [capture_date, auth_date, description, account, type, category, abs_amount, amount, id]
+    transactions_to_push = []
+    repeats = {}
+    for row in raw_transactions:
+        capture = row["captureDate"].strftime("%Y/%m/%d") if row["captureDate"] else ""
+        auth = row["authDate"].strftime("%Y/%m/%d") if row["authDate"] else capture
+        # Same id the CLI gives the row (see number_repeated_transactions), so
+        # either path sees the other's pushes
+        transaction_id = row.get("transactionId")
+        if not transaction_id:
+            transaction_id = content_transaction_id(
+                row["captureDate"], row["authDate"], row["description"], row["amount"]
+            )
+            repeats[transaction_id] = repeats.get(transaction_id, 0) + 1
+            if repeats[transaction_id] > 1:
+                transaction_id = f"{transaction_id}-{repeats[transaction_id]}"
+        transactions_to_push.append([
+            capture,
+            auth,
+            row["description"],
+            account_name,
+            "",  # type - to be filled later
+            "",  # category - to be filled later
+            str(abs(row["amount"])),
+            str(row["amount"]),
+            transaction_id,
+        ])
+
+    # Push to Google Sheets
+    upload_jobs.update(job, stage="pushing", transaction_count=len(transactions_to_push))
     try:
-        # Save uploaded file to temp location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-            file.save(tmp.name)
-            tmp_path = tmp.name
-
-        # Parse XLSX using existing fetcher
-        fetcher = XlsxTransactionsFetcher(
-            header_skip_rows=account_config.get("header_skip_rows", 8),
-            date_format=account_config.get("date_format", "%d-%m-%Y"),
-            decimal_separator=account_config.get("decimal_separator", ","),
-            thousands_separator=account_config.get("thousands_separator", " "),
-            columns=account_config["columns"],
-            sheet_name=account_config.get("sheet_name"),
-            footer_skip_rows=account_config.get("footer_skip_rows", 0),
-        )
+        repo.batch_insert(transactions_to_push, check_duplicates=True)
+    finally:
+        # The write dropped the ledger snapshot; reload it for the next request
+        app_cache.warm_in_background()
 
-        # Get last sync date to filter new transactions
-        repo = get_google_sheet_repository()
-        last_date = repo.get_last_transaction_date_for_account(account_name)
+    return {
+        "message": f"Successfully processed {len(transactions_to_push)} transactions",
+        "transaction_count": len(transactions_to_push),
+    }
 
-        # Fetch transactions from the file (filter by date if we have a last sync)
-        raw_transactions = fetcher.getTransactions(
-            date_init=last_date,
-            date_end=None,
-            file_path=tmp_path,
-        )
 
-        # Clean up temp file
-        os.unlink(tmp_path)
+# =============================================================================
+# Upload Job Routes
+# =============================================================================
+
+SSE_KEEPALIVE_SECONDS = 15
 
-        if not raw_transactions:
-            return jsonify({
-                "success": True,
-                "message": "No new transactions found in file",
-                "transaction_count": 0,
-            })
 
-        # Convert to the format expected by GoogleSheetRepository
-        # Schema: [capture_date, auth_date, description, category, account, balance, currency, amount]
-        transactions_to_push = []
-        for row in raw_transactions:
-            capture = row["captureDate"].strftime("%Y/%m/%d") if row["captureDate"] else ""
-            auth = row["authDate"].strftime("%Y/%m/%d") if row["authDate"] else capture
-            transactions_to_push.append([
-                capture,
-                auth,
-                row["description"],
-                "",  # category - to be filled later
-                account_name,
-                row.get("balance", ""),
-                "EUR",  # currency - default
-                row["amount"],
-            ])
-
-        # Push to Google Sheets
-        repo.batch_insert(transactions_to_push, check_duplicates=True)
+@app.route("/api/jobs", methods=["GET"])
+def api_jobs():
+    """Recent upload jobs, newest first; `?account=` filters by account."""
+    jobs = upload_jobs.list(request.args.get("account"))
+    return jsonify([job.to_dict() for job in jobs])
 
-        return jsonify({
-            "success": True,
-            "message": f"Successfully processed {len(transactions_to_push)} transactions",
-            "transaction_count": len(transactions_to_push),
-        })
 
-    except Exception as e:
-        # Clean up temp file if it exists
-        if 'tmp_path' in locals() and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
-        return jsonify({"error": str(e)}), 500
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job(job_id):
+    """Poll an upload job."""
+    job = upload_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def api_job_events(job_id):
+    """Server-sent events with the job state on every change, until it finishes."""
+    job = upload_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found"}), 404
+
+    def events():
+        version = None
+        while True:
+            data, new_version = upload_jobs.wait(job, version, SSE_KEEPALIVE_SECONDS)
+            if new_version == version:
+                yield ": keepalive\n\n"
+                continue
+            version = new_version
+            yield f"data: {json.dumps(data)}\n\n"
+            if data["status"] in (UploadJob.SUCCEEDED, UploadJob.FAILED):
+                return
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 def main():
@@ -580,6 +902,7 @@ def main():
 
     state.config_file = args.config_file
     state.country = args.country
+    app_cache.warm_in_background()
 
     app.run(host="0.0.0.0", port=args.port, debug=False)
 